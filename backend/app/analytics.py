@@ -0,0 +1,190 @@
+"""Statistiques détaillées d'un joueur (GET /players/{id}/analytics).
+
+Tout est calculé par SQLite, agrégats et fonctions de fenêtre sur matches /
+match_players : seules quelques dizaines de lignes de résultat remontent en Python,
+quelle que soit la longueur de l'historique.
+
+Le résultat est gardé en cache par joueur, associé à une version de ses matchs
+(nombre, dernier ID, dernière modification) : il n'est recalculé que si le joueur
+a joué, ou si l'un de ses matchs a été corrigé ou supprimé. Les matchs de l'archive
+froide n'y figurent pas (statistiques depuis `archived_until`).
+"""
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session, aliased
+
+from backend.app import models
+from backend.app.archive import archived_until
+from backend.app.database import tenant_of
+
+
+def _rate(part, total) -> float:
+    return round(part / total * 100, 2) if total else 0.0
+
+
+def _round(value) -> Optional[float]:
+    return round(value, 2) if value is not None else None
+
+
+def player_matches(db: Session, player_id: int):
+    """Sous-requête : un match du joueur par ligne, avec son camp et le résultat (won 0/1)"""
+    won = case((models.MatchPlayer.side == models.Match.winner_side, 1), else_=0)
+    return (
+        db.query(
+            models.Match.id.label("match_id"), models.Match.format, models.Match.played_at,
+            models.Match.balls_remaining, models.Match.foul_black, models.MatchPlayer.side,
+            won.label("won")
+        )
+        .join(models.Match, models.Match.id == models.MatchPlayer.match_id)
+        .filter(models.MatchPlayer.player_id == player_id)
+        .subquery()
+    )
+
+
+def analytics_version(db: Session, player_id: int) -> tuple:
+    """Change dès que le joueur joue ou qu'un de ses matchs est modifié ou supprimé"""
+    row = (
+        db.query(func.count(models.Match.id), func.max(models.Match.id), func.max(models.Match.updated_at))
+        .join(models.MatchPlayer, models.MatchPlayer.match_id == models.Match.id)
+        .filter(models.MatchPlayer.player_id == player_id)
+        .one()
+    )
+    return tuple(row) + (archived_until(db),)
+
+
+def _aggregates(pm) -> tuple:
+    return (
+        func.count().label("games"),
+        func.coalesce(func.sum(pm.c.won), 0).label("wins"),
+        # Billes restantes du perdant : marge de victoire, ou retard à la défaite
+        func.avg(case((pm.c.won == 1, pm.c.balls_remaining))).label("avg_balls_won"),
+        func.avg(case((pm.c.won == 0, pm.c.balls_remaining))).label("avg_balls_lost"),
+        func.sum(case((and_(pm.c.won == 0, pm.c.foul_black), 1), else_=0)).label("foul_black_losses"),
+    )
+
+
+def _summary(row) -> dict:
+    games, wins = row.games, row.wins or 0
+    return {
+        "games": games,
+        "wins": wins,
+        "losses": games - wins,
+        "win_rate": _rate(wins, games),
+        "avg_balls_remaining_won": _round(row.avg_balls_won),
+        "avg_balls_remaining_lost": _round(row.avg_balls_lost),
+        "foul_black_losses": row.foul_black_losses or 0,
+        "foul_black_rate": _rate(row.foul_black_losses or 0, games),
+    }
+
+
+def compute_player_analytics(db: Session, player_id: int, last: int = 10, min_games: int = 3,
+                             opponents: int = 3) -> dict:
+    pm = player_matches(db, player_id)
+    aggregates = _aggregates(pm)
+
+    overall = db.query(*aggregates).select_from(pm).one()
+    by_format = db.query(pm.c.format, *aggregates).group_by(pm.c.format).order_by(pm.c.format)
+    by_side = db.query(pm.c.side, *aggregates).group_by(pm.c.side).order_by(pm.c.side)
+
+    # Adversaires : une ligne par adversaire rencontré (au moins min_games fois),
+    # classés par taux de victoire du joueur contre lui, dans les deux sens
+    opponent = aliased(models.MatchPlayer)
+    versus = (
+        db.query(
+            opponent.player_id.label("opponent_id"),
+            func.count().label("games"),
+            func.sum(pm.c.won).label("wins"),
+        )
+        .select_from(pm)
+        .join(opponent, and_(opponent.match_id == pm.c.match_id, opponent.side != pm.c.side))
+        .group_by(opponent.player_id)
+        .having(func.count() >= min_games)
+        .subquery()
+    )
+    win_rate = versus.c.wins * 1.0 / versus.c.games
+    ranked = db.query(
+        versus,
+        func.row_number().over(order_by=(win_rate.desc(), versus.c.games.desc(), versus.c.opponent_id)).label("best"),
+        func.row_number().over(order_by=(win_rate.asc(), versus.c.games.desc(), versus.c.opponent_id)).label("worst"),
+    ).subquery()
+    opponent_rows = (
+        db.query(ranked, models.Player.name)
+        .join(models.Player, models.Player.id == ranked.c.opponent_id)
+        .filter(or_(ranked.c.best <= opponents, ranked.c.worst <= opponents))
+        .all()
+    )
+
+    def opponent_entry(row) -> dict:
+        return {
+            "player_id": row.opponent_id, "name": row.name, "games": row.games, "wins": row.wins,
+            "losses": row.games - row.wins, "win_rate": _rate(row.wins, row.games),
+        }
+
+    # Forme : les `last` derniers matchs, et la série en cours (gaps and islands)
+    recent = db.query(
+        pm,
+        func.row_number().over(order_by=(pm.c.played_at.desc(), pm.c.match_id.desc())).label("rn"),
+        func.first_value(pm.c.won).over(order_by=(pm.c.played_at.desc(), pm.c.match_id.desc())).label("latest"),
+    ).subquery()
+    form = db.query(recent).filter(recent.c.rn <= last).order_by(recent.c.rn).all()
+    streak_end = db.query(func.min(recent.c.rn)).filter(recent.c.won != recent.c.latest).scalar()
+    streak = (streak_end - 1) if streak_end else overall.games
+    if form and not form[0].won:
+        streak = -streak
+    form_wins = sum(r.won for r in form)
+
+    until = archived_until(db)
+    return {
+        "player_id": player_id,
+        "since": until[0] if until else None,
+        "overall": _summary(overall),
+        "by_format": {row.format: _summary(row) for row in by_format},
+        "by_side": {row.side: _summary(row) for row in by_side},
+        "opponents": {
+            "min_games": min_games,
+            "best": [opponent_entry(r) for r in sorted(opponent_rows, key=lambda r: r.best) if r.best <= opponents],
+            "worst": [opponent_entry(r) for r in sorted(opponent_rows, key=lambda r: r.worst) if r.worst <= opponents],
+        },
+        "form": {
+            "games": len(form),
+            "wins": form_wins,
+            "win_rate": _rate(form_wins, len(form)),
+            "current_streak": streak,
+            "results": [
+                {"match_id": r.match_id, "played_at": r.played_at, "format": r.format, "won": bool(r.won)}
+                for r in form
+            ],
+        },
+    }
+
+
+class AnalyticsCache:
+    """Statistiques par (club, joueur, paramètres), LRU borné, associées à analytics_version"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, player_id: int, last: int = 10, min_games: int = 3) -> dict:
+        key = (tenant_of(db), player_id, last, min_games)
+        version = analytics_version(db, player_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        result = compute_player_analytics(db, player_id, last, min_games)
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,212 @@
+"""Archive froide des anciens matchs.
+
+Les matchs antérieurs à une date de coupure quittent la base pour des partitions
+mensuelles compressées (`data/archive/matches-AAAA-MM.jsonl.gz`, un match JSON par
+ligne, triés par date). Deux choses restent en base pour que rien ne change côté
+classements :
+
+- un point de reprise (ArchiveCheckpoint) : l'état complet des ratings juste après
+  le dernier match archivé, au format binaire de snapshot.py. Les rejeux (recalcul,
+  édition, trajectoires) repartent de lui au lieu de relire l'archive ;
+- les agrégats head-to-head des matchs archivés (ArchivedHeadToHead).
+
+La période archivée est figée : on n'y ajoute, modifie ni supprime plus de match,
+et un changement des paramètres ELO ne s'applique qu'aux matchs postérieurs.
+"""
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import database_file, tenant_of
+from backend.app.elo import ReplayEloCalculator
+from backend.app.snapshot import RatingSnapshot, decode_snapshot
+
+ARCHIVE_DIRNAME = "archive"
+
+
+def archive_dir(db: Session) -> str:
+    """Les partitions vivent à côté du fichier SQLite de la session"""
+    return os.path.join(os.path.dirname(database_file(db)), ARCHIVE_DIRNAME)
+
+
+def partition_name(played_at: datetime) -> str:
+    return f"matches-{played_at:%Y-%m}.jsonl.gz"
+
+
+def match_record(m: models.Match) -> dict:
+    """Ligne d'archive d'un match (participants par ID)"""
+    return {
+        "id": m.id,
+        "format": m.format,
+        "played_at": m.played_at,
+        "balls_remaining": m.balls_remaining,
+        "winner_side": m.winner_side,
+        "foul_black": bool(m.foul_black),
+        "ranked": bool(m.ranked),
+        "client_uuid": m.client_uuid,
+        "team_id_a": m.team_id_a,
+        "team_id_b": m.team_id_b,
+        "players_a": sorted(mp.player_id for mp in m.players if mp.side == "A"),
+        "players_b": sorted(mp.player_id for mp in m.players if mp.side == "B"),
+        "created_at": m.created_at.isoformat() if m.created_at else None,
+    }
+
+
+def read_partition(path: str) -> List[dict]:
+    records = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            record["played_at"] = datetime.fromisoformat(record["played_at"])
+            records.append(record)
+    return records
+
+
+def write_partition(path: str, records: List[dict]):
+    """Écrit une partition complète dans un fichier temporaire puis la renomme"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9) as f:
+            for record in records:
+                line = dict(record, played_at=record["played_at"].isoformat())
+                f.write((json.dumps(line, separators=(",", ":")) + "\n").encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+
+def merge_into_partitions(directory: str, records: List[dict]) -> List[str]:
+    """Ajoute des matchs à leurs partitions mensuelles (idempotent : dédoublonné par ID)"""
+    os.makedirs(directory, exist_ok=True)
+    by_partition: Dict[str, List[dict]] = {}
+    for record in records:
+        by_partition.setdefault(partition_name(record["played_at"]), []).append(record)
+
+    for name, new_records in by_partition.items():
+        path = os.path.join(directory, name)
+        merged = {r["id"]: r for r in (read_partition(path) if os.path.exists(path) else [])}
+        merged.update((r["id"], r) for r in new_records)
+        write_partition(path, sorted(merged.values(), key=lambda r: (r["played_at"], r["id"])))
+    return sorted(by_partition)
+
+
+def side_key(player_ids) -> str:
+    return "-".join(str(pid) for pid in sorted(player_ids))
+
+
+def latest_checkpoint(db: Session) -> Optional[models.ArchiveCheckpoint]:
+    return db.query(models.ArchiveCheckpoint).order_by(models.ArchiveCheckpoint.id.desc()).first()
+
+
+def archived_until(db: Session) -> Optional[Tuple[datetime, int]]:
+    """(played_at, id) du dernier match archivé, None si rien n'est archivé"""
+    row = (
+        db.query(models.ArchiveCheckpoint.archived_until, models.ArchiveCheckpoint.last_match_id)
+        .order_by(models.ArchiveCheckpoint.id.desc())
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+def load_checkpoint(db: Session) -> Optional[RatingSnapshot]:
+    row = latest_checkpoint(db)
+    return decode_snapshot(row.ratings, min_version=1) if row else None
+
+
+def restore_checkpoint(db: Session, checkpoint: RatingSnapshot, elo_calc: ReplayEloCalculator):
+    """Charge le point de reprise dans un rejeu, sans les joueurs/équipes supprimés depuis"""
+    checkpoint.restore_into(elo_calc)
+    player_ids = {pid for (pid,) in db.query(models.Player.id)}
+    team_ids = {tid for (tid,) in db.query(models.Team.id)}
+    for key in [k for k in elo_calc.ratings if k[0] not in player_ids]:
+        del elo_calc.ratings[key]
+    for key in [k for k in elo_calc.team_ratings if k[0] not in team_ids]:
+        del elo_calc.team_ratings[key]
+
+
+class ArchiveReader:
+    """Lecture des partitions, du plus récent au plus ancien, pour /history.
+
+    Les partitions décompressées les plus récemment lues restent en mémoire (LRU),
+    et les effectifs par filtre sont mémorisés jusqu'au prochain archivage.
+    """
+
+    def __init__(self, max_partitions: int = 4, max_counts: int = 256):
+        self.max_partitions = max_partitions
+        self.max_counts = max_counts
+        self._partitions: "OrderedDict[Tuple[str, float], List[dict]]" = OrderedDict()
+        self._counts: "OrderedDict[tuple, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, path: str) -> List[dict]:
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            if key in self._partitions:
+                self._partitions.move_to_end(key)
+                return self._partitions[key]
+        records = read_partition(path)
+        with self._lock:
+            self._partitions[key] = records
+            while len(self._partitions) > self.max_partitions:
+                self._partitions.popitem(last=False)
+        return records
+
+    def iter_matches(self, db: Session, format: Optional[str] = None, player_id: Optional[int] = None,
+                     team_id: Optional[int] = None) -> Iterator[dict]:
+        """Matchs archivés filtrés, du plus récent au plus ancien"""
+        until = archived_until(db)
+        directory = archive_dir(db)
+        if until is None or not os.path.isdir(directory):
+            return
+        names = sorted((n for n in os.listdir(directory) if n.endswith(".jsonl.gz")), reverse=True)
+        for name in names:
+            for record in reversed(self._load(os.path.join(directory, name))):
+                # Ignore ce qu'un archivage interrompu aurait écrit sans le valider en base
+                if (record["played_at"], record["id"]) > until:
+                    continue
+                if format and record["format"] != format:
+                    continue
+                if player_id and player_id not in record["players_a"] + record["players_b"]:
+                    continue
+                if team_id and team_id not in (record["team_id_a"], record["team_id_b"]):
+                    continue
+                yield record
+
+    def count(self, db: Session, format: Optional[str] = None, player_id: Optional[int] = None,
+              team_id: Optional[int] = None) -> int:
+        checkpoint = latest_checkpoint(db)
+        if checkpoint is None:
+            return 0
+        if not (format or player_id or team_id):
+            return checkpoint.match_count
+        key = (tenant_of(db), checkpoint.id, format, player_id, team_id)
+        with self._lock:
+            if key in self._counts:
+                self._counts.move_to_end(key)
+                return self._counts[key]
+        total = sum(1 for _ in self.iter_matches(db, format, player_id, team_id))
+        with self._lock:
+            self._counts[key] = total
+            while len(self._counts) > self.max_counts:
+                self._counts.popitem(last=False)
+        return total
+
+    def page(self, db: Session, offset: int, limit: int, format: Optional[str] = None,
+             player_id: Optional[int] = None, team_id: Optional[int] = None) -> List[dict]:
+        records = []
+        for i, record in enumerate(self.iter_matches(db, format, player_id, team_id)):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                records.append(record)
+        return records
+
+
+archive_reader = ArchiveReader()
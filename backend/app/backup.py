@@ -0,0 +1,382 @@
+"""Sauvegarde à chaud et restauration des données d'un club.
+
+- Sauvegarde : API de sauvegarde incrémentale de SQLite, par paquets de pages avec
+  une courte pause entre deux paquets, pour ne jamais affamer l'écrivain. Le fichier
+  est écrit à côté puis renommé ; les partitions de l'archive froide sont copiées avec.
+- Export : JSON produit au fil de l'eau (même format que l'ancien /admin/export),
+  sans charger toute la base en mémoire.
+- Import : relit un export élément par élément et l'insère par lots ; les ratings
+  ne sont pas relus mais recalculés une seule fois à la fin (voir main.import_data).
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from backend.app import models
+from backend.app.archive import ARCHIVE_DIRNAME, archive_dir, archive_reader, archived_until
+from backend.app.database import database_file
+
+BACKUP_DIRNAME = "backups"
+BACKUP_PAGES = 512       # Pages copiées par étape (2 Mo avec des pages de 4 Ko)
+BACKUP_PAUSE = 0.005     # Pause entre deux étapes : les écrivains passent
+INSERT_BATCH = 500
+
+
+def backup_dir(db: Session) -> str:
+    return os.path.join(os.path.dirname(database_file(db)), BACKUP_DIRNAME)
+
+
+def backup_path(db: Session, when: Optional[datetime] = None) -> str:
+    when = when or datetime.now()
+    return os.path.join(backup_dir(db), f"billiard-{when:%Y-%m-%d-%H%M%S}.db")
+
+
+def online_backup(source: str, destination: str, pages: int = BACKUP_PAGES, pause: float = BACKUP_PAUSE,
+                  progress: Optional[Callable[[int, int], None]] = None):
+    """Copie cohérente d'une base SQLite en service, étape par étape.
+
+    Entre deux étapes le verrou de lecture est relâché ; si la base est modifiée
+    entre-temps, SQLite reprend la copie des pages concernées.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    tmp_path = f"{destination}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    def step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+        time.sleep(pause)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(tmp_path)
+    try:
+        src.backup(dst, pages=pages, progress=step)
+        # Copie autonome : pas de fichier -wal à côté de la sauvegarde
+        dst.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+        src.close()
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, destination)
+
+
+def copy_archive(db: Session, destination_dir: str) -> int:
+    """Copie les partitions d'archive nouvelles ou modifiées ; renvoie leur nombre"""
+    source_dir = archive_dir(db)
+    if not os.path.isdir(source_dir):
+        return 0
+    target_dir = os.path.join(destination_dir, ARCHIVE_DIRNAME)
+    os.makedirs(target_dir, exist_ok=True)
+    copied = 0
+    for name in os.listdir(source_dir):
+        if not name.endswith(".jsonl.gz"):
+            continue
+        src, dst = os.path.join(source_dir, name), os.path.join(target_dir, name)
+        stat = os.stat(src)
+        if os.path.exists(dst) and os.stat(dst).st_mtime >= stat.st_mtime and os.stat(dst).st_size == stat.st_size:
+            continue
+        shutil.copy2(src, dst)
+        copied += 1
+    return copied
+
+
+def backup_database(db: Session, destination: Optional[str] = None,
+                    progress: Optional[Callable[[int, int], None]] = None) -> str:
+    destination = destination or backup_path(db)
+    online_backup(database_file(db), destination, progress=progress)
+    copy_archive(db, os.path.dirname(destination))
+    return destination
+
+
+def prune_backups(directory: str, keep_days: int = 30) -> int:
+    """Supprime les sauvegardes de plus de `keep_days` jours"""
+    if not os.path.isdir(directory):
+        return 0
+    limit = time.time() - timedelta(days=keep_days).total_seconds()
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith("billiard-") and name.endswith(".db") and os.path.getmtime(path) < limit:
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def restore_backup(backup_file: str, database: str, progress: Optional[Callable[[int, int], None]] = None):
+    """Remplace une base par une sauvegarde (service arrêté de préférence)"""
+    src = sqlite3.connect(f"file:{os.path.abspath(backup_file)}?mode=ro", uri=True)
+    dst = sqlite3.connect(database)
+    try:
+        src.backup(dst, pages=BACKUP_PAGES,
+                   progress=(lambda status, remaining, total: progress(total - remaining, total)) if progress else None)
+    finally:
+        dst.close()
+        src.close()
+
+
+# Export JSON au fil de l'eau
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt else None
+
+
+def _rating_dict(r, **key) -> dict:
+    return dict(
+        key, format=r.format, rating=r.rating, games=r.games, wins=r.wins,
+        losses=r.losses, streak=r.streak, last_played=_iso(r.last_played)
+    )
+
+
+def _iter_matches(db: Session, batch: int = INSERT_BATCH) -> Iterator[models.Match]:
+    """Matchs par lots (pagination sur l'id), participants chargés par lot"""
+    last_id = 0
+    while True:
+        matches = (
+            db.query(models.Match)
+            .options(selectinload(models.Match.players))
+            .filter(models.Match.id > last_id)
+            .order_by(models.Match.id)
+            .limit(batch)
+            .all()
+        )
+        if not matches:
+            return
+        yield from matches
+        last_id = matches[-1].id
+        db.expunge_all()
+
+
+def export_chunks(db: Session) -> Iterator[str]:
+    """Export complet en JSON, produit morceau par morceau"""
+    def section(name: str, items: Iterator[dict]) -> Iterator[str]:
+        yield f', "{name}": ['
+        for i, item in enumerate(items):
+            yield ("," if i else "") + json.dumps(item)
+        yield "]"
+
+    yield '{"export_date": ' + json.dumps(datetime.utcnow().isoformat())
+    yield from section("players", (
+        {"id": p.id, "name": p.name, "is_guest": p.is_guest, "created_at": _iso(p.created_at)}
+        for p in db.query(models.Player).order_by(models.Player.id).yield_per(INSERT_BATCH)
+    ))
+    yield from section("matches", (
+        {
+            "id": m.id, "format": m.format, "played_at": m.played_at.isoformat(),
+            "balls_remaining": m.balls_remaining, "winner_side": m.winner_side,
+            "foul_black": m.foul_black, "ranked": m.ranked,
+            "players_a": [mp.player_id for mp in m.players if mp.side == "A"],
+            "players_b": [mp.player_id for mp in m.players if mp.side == "B"],
+            "team_id_a": m.team_id_a, "team_id_b": m.team_id_b, "client_uuid": m.client_uuid,
+        }
+        for m in _iter_matches(db)
+    ))
+    yield from section("ratings", (
+        _rating_dict(r, player_id=r.player_id)
+        for r in db.query(models.Rating).yield_per(INSERT_BATCH)
+    ))
+    yield from section("teams", (
+        {
+            "id": t.id, "key": t.key, "name": t.name, "created_at": _iso(t.created_at),
+            "members": [tm.player_id for tm in t.members]
+        }
+        for t in db.query(models.Team).options(selectinload(models.Team.members)).order_by(models.Team.id)
+    ))
+    yield from section("team_ratings", (
+        _rating_dict(tr, team_id=tr.team_id)
+        for tr in db.query(models.TeamRating).yield_per(INSERT_BATCH)
+    ))
+    # Saisons et classements figés des saisons closes (ceux de la saison active sont recalculés)
+    yield from section("seasons", (
+        {
+            "id": s.id, "name": s.name, "starts_at": s.starts_at.isoformat(), "ends_at": s.ends_at.isoformat(),
+            "closed_at": _iso(s.closed_at), "created_at": _iso(s.created_at),
+        }
+        for s in db.query(models.Season).order_by(models.Season.id)
+    ))
+    yield from section("season_standings", (
+        _rating_dict(st, season_id=st.season_id, entity_type=st.entity_type, rank=st.rank, entity_id=st.entity_id)
+        for st in db.query(models.SeasonStanding).yield_per(INSERT_BATCH)
+    ))
+    settings = {s.key: s.value for s in db.query(models.Setting).all()}
+    until = archived_until(db)
+    # Matchs archivés : dans les partitions de data/archive/, pas dans cet export
+    archive = {
+        "archived_until": _iso(until[0]) if until else None,
+        "archived_matches": archive_reader.count(db),
+    }
+    yield ', "settings": ' + json.dumps(settings) + ', "archive": ' + json.dumps(archive) + "}"
+
+
+# Import d'un export, au fil de l'eau
+
+def iter_export(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Any]]:
+    """Parcourt un export JSON sans le charger en entier.
+
+    Produit (section, élément) pour chaque élément des listes de premier niveau
+    (players, matches...), et (clé, valeur) pour les autres clés.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        data = f.read(chunk_size)
+        if not data:
+            eof = True
+            return False
+        buf, pos = buf[pos:] + data, 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                raise ValueError("Export JSON tronqué")
+
+    def expect(char: str):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"Export JSON invalide : '{char}' attendu")
+        pos += 1
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                result, end = decoder.raw_decode(buf, pos)
+                # Un nombre en fin de tampon peut être incomplet
+                if end == len(buf) and not eof and fill():
+                    continue
+                pos = end
+                return result
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        key = value()
+        expect(":")
+        if peek() == "[":
+            pos += 1
+            if peek() == "]":
+                pos += 1
+            else:
+                while True:
+                    yield key, value()
+                    if peek() == ",":
+                        pos += 1
+                        continue
+                    expect("]")
+                    break
+        else:
+            yield key, value()
+        if peek() == ",":
+            pos += 1
+            continue
+        expect("}")
+        return
+
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def import_export(db: Session, f: TextIO, progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+    """Remplace les données du club par celles d'un export (sans commit, ni ratings).
+
+    Les IDs d'origine sont conservés. Les sections ratings/team_ratings sont
+    ignorées : l'appelant recalcule les ratings (et ceux de la saison active) une
+    fois l'import terminé. Les classements figés des saisons closes sont repris tels quels.
+    """
+    for model in (models.MatchPlayer, models.Match, models.TeamMember, models.TeamRating,
+                  models.Team, models.Rating, models.Player, models.ArchivedHeadToHead,
+                  models.ArchiveCheckpoint, models.SeasonStanding, models.SeasonRating, models.Season):
+        db.query(model).delete(synchronize_session=False)
+
+    pending: Dict[Any, List[dict]] = {}
+    counts = {"players": 0, "teams": 0, "matches": 0, "seasons": 0, "settings": 0}
+    done = 0
+
+    def add(model, row: dict):
+        rows = pending.setdefault(model, [])
+        rows.append(row)
+        if len(rows) >= INSERT_BATCH:
+            flush(model)
+
+    def flush(model):
+        rows = pending.pop(model, None)
+        if rows:
+            db.execute(insert(model.__table__), rows)
+
+    for section, item in iter_export(f):
+        if section == "players":
+            add(models.Player, {
+                "id": item["id"], "name": item["name"], "is_guest": bool(item.get("is_guest")),
+                "created_at": _parse_dt(item.get("created_at")) or datetime.utcnow()
+            })
+        elif section == "teams":
+            add(models.Team, {
+                "id": item["id"], "key": item["key"], "name": item["name"],
+                "created_at": _parse_dt(item.get("created_at")) or datetime.utcnow()
+            })
+            for player_id in item.get("members", []):
+                add(models.TeamMember, {"team_id": item["id"], "player_id": player_id})
+        elif section == "matches":
+            now = datetime.utcnow()
+            add(models.Match, {
+                "id": item["id"], "format": item["format"], "played_at": _parse_dt(item["played_at"]),
+                "balls_remaining": item["balls_remaining"], "winner_side": item["winner_side"],
+                "foul_black": bool(item.get("foul_black")), "ranked": bool(item.get("ranked", True)),
+                "team_id_a": item.get("team_id_a"), "team_id_b": item.get("team_id_b"),
+                "client_uuid": item.get("client_uuid"), "created_at": now, "updated_at": now,
+            })
+            for side, key in (("A", "players_a"), ("B", "players_b")):
+                for player_id in item.get(key, []):
+                    add(models.MatchPlayer, {"match_id": item["id"], "player_id": player_id, "side": side})
+        elif section == "seasons":
+            add(models.Season, {
+                "id": item["id"], "name": item["name"], "starts_at": _parse_dt(item["starts_at"]),
+                "ends_at": _parse_dt(item["ends_at"]), "closed_at": _parse_dt(item.get("closed_at")),
+                "created_at": _parse_dt(item.get("created_at")) or datetime.utcnow()
+            })
+        elif section == "season_standings":
+            add(models.SeasonStanding, dict(item, last_played=_parse_dt(item.get("last_played"))))
+        elif section == "settings":
+            for key, setting_value in item.items():
+                db.merge(models.Setting(key=key, value=str(setting_value)))
+                counts["settings"] += 1
+            continue
+        elif section == "archive":
+            if item and item.get("archived_matches"):
+                raise ValueError("Export d'un club avec archive froide : restaurer une sauvegarde .db")
+            continue
+        else:
+            continue  # export_date, ratings et team_ratings (recalculés)
+        if section in counts:
+            counts[section] += 1
+        done += 1
+        if progress and done % 1000 == 0:
+            progress(done, 0)
+
+    for model in list(pending):
+        flush(model)
+    return counts
@@ -0,0 +1,365 @@
+"""Administration en ligne de commande, sans serveur web ni jeton admin.
+
+N'importe que la base et le calcul des ratings (pas FastAPI) : démarrage rapide,
+adapté à cron sur le Pi. Les opérations lourdes passent par les chemins en masse
+(rejeu en mémoire puis remplacement d'un bloc, import par lots) et affichent leur
+progression sur stderr.
+
+Usage : python -m backend.app.cli [--club ID] <commande> [options]
+
+    rebuild [--full]              recalcul des ELO (--full : sans l'instantané binaire)
+    export [--output FICHIER]     export JSON (sortie standard par défaut)
+    import FICHIER                remplace les données par un export JSON
+    backup [--output] [--keep-days N]
+    restore FICHIER               restaure une sauvegarde .db (service arrêté)
+    archive --before DATE         archive froide des matchs antérieurs (--vacuum ensuite)
+    vacuum                        compacte la base (VACUUM) puis ANALYZE
+    analyze                       statistiques de l'optimiseur (ANALYZE, PRAGMA optimize)
+    settings [cle=valeur ...]     affiche ou modifie les paramètres (--rebuild ensuite)
+    delete-player ID              supprime un joueur et ses matchs, puis recalcule
+    benchmark [--repeat N]        mesure rejeu et classement sur les données du club
+    simulate --set cle=valeur     rejoue l'historique avec d'autres paramètres, sans rien écrire
+    intervals [--replicates N]    intervalles de confiance des ratings (bootstrap, --workers N)
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.archive import load_checkpoint, restore_checkpoint
+from backend.app.backup import backup_database, export_chunks, prune_backups, restore_backup
+from backend.app.database import DEFAULT_TENANT, database_file, tenants
+from backend.app.elo import EloCalculator, ReplayEloCalculator, rating_display, settings_cache
+from backend.app.ratings import (
+    DEFAULT_SETTINGS, archive_old_matches, delete_player_data, import_data, load_replay_matches, rebuild_ratings,
+    start_replay
+)
+from backend.app.snapshot import snapshot_path
+from backend.app.uncertainty import REPLICATES, compute_intervals
+
+# Formats de classement : (type d'entité, format stocké)
+LEADERBOARDS = {
+    "1v1": ("player", "1v1"), "2v2": ("team", "2v2"), "2v2_individual": ("player", "2v2"),
+    "3v3": ("player", "3v3"), "1v2": ("player", "1v2"), "2v3": ("player", "2v3"),
+}
+
+
+def log(message: str):
+    print(f"[cli] {message}", file=sys.stderr, flush=True)
+
+
+def progress_printer(label: str) -> Callable[[int, int], None]:
+    """progress(fait, total) : ligne réécrite sur un terminal, paliers de 10 % sinon (cron)"""
+    interactive = sys.stderr.isatty()
+    state = {"last": -1, "start": time.monotonic()}
+
+    def progress(done: int, total: int):
+        percent = done * 100 // total if total else 100
+        if interactive:
+            end = "\n" if done >= total else ""
+            print(f"\r[cli] {label} : {done}/{total} ({percent} %)", end=end, file=sys.stderr, flush=True)
+        elif percent // 10 != state["last"] // 10 or done >= total:
+            log(f"{label} : {done}/{total} ({percent} %, {time.monotonic() - state['start']:.1f}s)")
+        state["last"] = percent
+
+    return progress
+
+
+def parse_assignments(pairs: List[str]) -> Dict[str, str]:
+    """['k_base=32', ...] -> {'k_base': '32'}, limité aux paramètres ELO connus"""
+    values = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or key not in DEFAULT_SETTINGS:
+            raise SystemExit(f"Paramètre invalide : {pair!r} (connus : {', '.join(DEFAULT_SETTINGS)})")
+        try:
+            float(value)
+        except ValueError:
+            raise SystemExit(f"Valeur non numérique pour {key} : {value!r}")
+        values[key] = value
+    return values
+
+
+def cmd_rebuild(db: Session, args):
+    if args.full and os.path.exists(snapshot_path(db)):
+        os.remove(snapshot_path(db))
+    start = time.monotonic()
+    rebuild_ratings(db, progress=progress_printer("rejeu"))
+    log(f"ratings recalculés en {time.monotonic() - start:.1f}s")
+
+
+def cmd_export(db: Session, args):
+    if not args.output:
+        for chunk in export_chunks(db):
+            sys.stdout.write(chunk)
+        return
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for chunk in export_chunks(db):
+            f.write(chunk)
+    os.replace(tmp_path, args.output)
+    log(f"export écrit : {args.output} ({os.path.getsize(args.output) / 1024:.0f} Ko)")
+
+
+def cmd_import(db: Session, args):
+    with open(args.file, encoding="utf-8") as f:
+        counts = import_data(db, f, progress=progress_printer("import"))
+    log(f"import terminé : {counts}")
+
+
+def cmd_backup(db: Session, args):
+    path = backup_database(db, args.output, progress=progress_printer("sauvegarde"))
+    removed = prune_backups(os.path.dirname(path), args.keep_days)
+    log(f"sauvegarde créée : {path} ({removed} ancienne(s) supprimée(s))")
+
+
+def cmd_restore(db: Session, args):
+    target = database_file(db)
+    db.close()
+    restore_backup(args.file, target, progress=progress_printer("restauration"))
+    log(f"{target} restaurée depuis {args.file}")
+
+
+def cmd_archive(db: Session, args):
+    try:
+        before = datetime.fromisoformat(args.before)
+    except ValueError:
+        raise SystemExit(f"Date invalide : {args.before!r} (AAAA-MM-JJ)")
+    result = archive_old_matches(db, before, progress=progress_printer("archivage"))
+    log(f"{result['archived']} match(s) archivé(s) dans {', '.join(result['partitions']) or '-'}")
+    if args.vacuum and result["archived"]:
+        # Rend au système l'espace libéré sur la carte SD
+        cmd_vacuum(db, args)
+
+
+def _file_size(path: str) -> float:
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p)) / 1024 / 1024
+
+
+def cmd_vacuum(db: Session, args):
+    path = database_file(db)
+    before = _file_size(path)
+    db.close()
+    with db.get_bind().connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("ANALYZE")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    log(f"base compactée : {before:.1f} Mo -> {_file_size(path):.1f} Mo")
+
+
+def cmd_analyze(db: Session, args):
+    db.close()
+    with db.get_bind().connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        conn.exec_driver_sql("PRAGMA optimize")
+    log("statistiques de l'optimiseur à jour")
+
+
+def cmd_settings(db: Session, args):
+    values = parse_assignments(args.values)
+    for key, value in values.items():
+        setting = db.get(models.Setting, key)
+        if setting:
+            setting.value = value
+        else:
+            db.add(models.Setting(key=key, value=value))
+    db.commit()
+    settings_cache.invalidate()
+    current = {s.key: s.value for s in db.query(models.Setting) if s.key in DEFAULT_SETTINGS}
+    for key in DEFAULT_SETTINGS:
+        print(f"{key:22} {current.get(key, DEFAULT_SETTINGS[key])}")
+    if values and args.rebuild:
+        cmd_rebuild(db, argparse.Namespace(full=False))
+    elif values:
+        log("paramètres modifiés : lancer `rebuild` pour les appliquer à l'historique")
+
+
+def cmd_delete_player(db: Session, args):
+    player = db.get(models.Player, args.player_id)
+    if player is None:
+        raise SystemExit(f"Joueur introuvable : {args.player_id}")
+    name = player.name
+    deleted = delete_player_data(db, args.player_id)
+    log(f"joueur {name!r} supprimé avec {deleted} match(s)")
+    cmd_rebuild(db, argparse.Namespace(full=False))
+
+
+def _median(func: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def cmd_benchmark(db: Session, args):
+    """Mesures en lecture seule : rien n'est écrit en base"""
+    matches = load_replay_matches(db)
+    log(f"{len(matches)} match(s) classé(s) en base")
+
+    def full_replay():
+        elo_calc = ReplayEloCalculator(db)
+        checkpoint = load_checkpoint(db)
+        if checkpoint is not None:
+            restore_checkpoint(db, checkpoint, elo_calc)
+        for m in matches:
+            m.apply(elo_calc)
+
+    def snapshot_replay():
+        elo_calc, snap = start_replay(db)
+        for m in load_replay_matches(db, after=snap.order_key if snap else None):
+            m.apply(elo_calc)
+
+    decay, target, at = rating_display(db)
+    rating = decay.column(models.Rating, target, at)
+
+    def leaderboard():
+        db.query(models.Rating.player_id, rating).filter(models.Rating.format == "1v1").order_by(rating.desc()).limit(50).all()
+
+    results = [
+        ("chargement de l'historique", _median(lambda: load_replay_matches(db), args.repeat)),
+        ("rejeu complet en mémoire", _median(full_replay, args.repeat)),
+        ("rejeu depuis l'instantané", _median(snapshot_replay, args.repeat)),
+        ("classement 1v1 (50 premiers)", _median(leaderboard, args.repeat)),
+    ]
+    for label, seconds in results:
+        print(f"  {label:32} {seconds * 1000:9.1f} ms")
+    full = results[1][1]
+    if matches and full > 0:
+        print(f"  {'débit du rejeu':32} {len(matches) / full:9.0f} matchs/s")
+
+
+def cmd_simulate(db: Session, args):
+    """Rejoue l'historique avec des paramètres modifiés et compare au classement actuel"""
+    overrides = parse_assignments(args.set)
+    kind, fmt = LEADERBOARDS[args.format]
+    settings = dict(settings_cache.get(db), **overrides)
+
+    elo_calc = ReplayEloCalculator(db, settings)
+    checkpoint = load_checkpoint(db)
+    if checkpoint is not None:
+        # La période archivée reste calculée avec les anciens paramètres
+        restore_checkpoint(db, checkpoint, elo_calc)
+        log("matchs archivés non rejoués : le point de reprise de l'archive est conservé")
+    matches = load_replay_matches(db)
+    progress = progress_printer("simulation")
+    for done, m in enumerate(matches, 1):
+        m.apply(elo_calc)
+        if done % 100 == 0 or done == len(matches):
+            progress(done, len(matches))
+
+    if kind == "team":
+        current = dict(db.query(models.TeamRating.team_id, models.TeamRating.rating).filter_by(format=fmt))
+        simulated = {tid: tr.rating for (tid, f), tr in elo_calc.team_ratings.items() if f == fmt}
+        names = dict(db.query(models.Team.id, models.Team.name))
+    else:
+        current = dict(db.query(models.Rating.player_id, models.Rating.rating).filter_by(format=fmt))
+        simulated = {pid: r.rating for (pid, f), r in elo_calc.ratings.items() if f == fmt}
+        names = dict(db.query(models.Player.id, models.Player.name))
+
+    current_rank = {eid: i for i, eid in enumerate(sorted(current, key=current.get, reverse=True), 1)}
+    ranking = sorted(simulated, key=simulated.get, reverse=True)
+    print(f"Classement {args.format} simulé ({', '.join(f'{k}={v}' for k, v in overrides.items()) or 'paramètres actuels'})")
+    print(f"  {'rang':>4}  {'évol':>4}  {'nom':28} {'actuel':>8} {'simulé':>8} {'écart':>7}")
+    for rank, entity_id in enumerate(ranking[:args.top], 1):
+        before = current_rank.get(entity_id)
+        move = f"{before - rank:+d}" if before is not None else "new"
+        now, was = simulated[entity_id], current.get(entity_id)
+        print(f"  {rank:4d}  {move:>4}  {names.get(entity_id, '?')[:28]:28} "
+              f"{was if was is not None else float('nan'):8.1f} {now:8.1f} {now - (was or now):+7.1f}")
+
+
+def cmd_intervals(db: Session, args):
+    start = time.monotonic()
+    result = compute_intervals(
+        db, args.replicates, workers=args.workers, progress=progress_printer("bootstrap"), force=args.force
+    )
+    if result["status"] == "unchanged":
+        log("intervalles à jour : aucun match ni paramètre modifié depuis le dernier calcul")
+    else:
+        log(f"{result['intervals']} intervalle(s) estimé(s) en {time.monotonic() - start:.1f}s")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend.app.cli", description=__doc__.splitlines()[0])
+    parser.add_argument("--club", default=DEFAULT_TENANT, help="identifiant du club")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild", help="recalculer tous les ELO")
+    rebuild.add_argument("--full", action="store_true", help="ignorer l'instantané binaire")
+    rebuild.set_defaults(func=cmd_rebuild)
+
+    export = commands.add_parser("export", help="export JSON")
+    export.add_argument("--output", "-o", help="fichier de destination (défaut : sortie standard)")
+    export.set_defaults(func=cmd_export)
+
+    import_cmd = commands.add_parser("import", help="remplacer les données par un export JSON")
+    import_cmd.add_argument("file")
+    import_cmd.set_defaults(func=cmd_import)
+
+    backup = commands.add_parser("backup", help="sauvegarde à chaud dans data/backups/")
+    backup.add_argument("--output", help="fichier de destination")
+    backup.add_argument("--keep-days", type=int, default=30, help="rétention des sauvegardes")
+    backup.set_defaults(func=cmd_backup)
+
+    restore = commands.add_parser("restore", help="restaurer une sauvegarde .db (service arrêté)")
+    restore.add_argument("file")
+    restore.set_defaults(func=cmd_restore)
+
+    archive = commands.add_parser("archive", help="archiver les matchs antérieurs à une date")
+    archive.add_argument("--before", required=True, help="date de coupure AAAA-MM-JJ (exclue)")
+    archive.add_argument("--vacuum", action="store_true", help="compacter la base ensuite (VACUUM)")
+    archive.set_defaults(func=cmd_archive)
+
+    commands.add_parser("vacuum", help="compacter la base puis ANALYZE").set_defaults(func=cmd_vacuum)
+    commands.add_parser("analyze", help="mettre à jour les statistiques").set_defaults(func=cmd_analyze)
+
+    settings = commands.add_parser("settings", help="afficher ou modifier les paramètres ELO")
+    settings.add_argument("values", nargs="*", metavar="cle=valeur")
+    settings.add_argument("--rebuild", action="store_true", help="recalculer les ELO ensuite")
+    settings.set_defaults(func=cmd_settings)
+
+    delete = commands.add_parser("delete-player", help="supprimer un joueur et ses matchs")
+    delete.add_argument("player_id", type=int)
+    delete.set_defaults(func=cmd_delete_player)
+
+    benchmark = commands.add_parser("benchmark", help="mesurer rejeu et classement (lecture seule)")
+    benchmark.add_argument("--repeat", type=int, default=3)
+    benchmark.set_defaults(func=cmd_benchmark)
+
+    simulate = commands.add_parser("simulate", help="rejouer avec d'autres paramètres, sans écrire")
+    simulate.add_argument("--set", action="append", default=[], metavar="cle=valeur")
+    simulate.add_argument("--format", choices=sorted(LEADERBOARDS), default="1v1")
+    simulate.add_argument("--top", type=int, default=20)
+    simulate.set_defaults(func=cmd_simulate)
+
+    intervals = commands.add_parser("intervals", help="estimer l'incertitude des ratings (bootstrap)")
+    intervals.add_argument("--replicates", type=int, default=REPLICATES)
+    intervals.add_argument("--workers", type=int, help="processus du pool (défaut : nombre de cœurs)")
+    intervals.add_argument("--force", action="store_true", help="recalculer même sans nouveau match")
+    intervals.set_defaults(func=cmd_intervals)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    try:
+        factory = tenants.session_factory(args.club)
+    except KeyError:
+        raise SystemExit(f"Club inconnu : {args.club}")
+    db = factory()
+    try:
+        args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,197 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Callable, List
 import os
+import re
+import threading
+import time
 
-DATABASE_URL = "sqlite:///./data/billiard.db"
+DATABASE_PATH = "./data/billiard.db"
+DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 os.makedirs("data", exist_ok=True)
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    echo=False
-)
+# Pools séparés : en WAL, les lecteurs (routes GET) avancent en parallèle de
+# l'écrivain au lieu de se disputer les mêmes connexions. Côté écriture, SQLite
+# n'accepte qu'un écrivain à la fois : un petit pool suffit.
+READ_POOL_SIZE = 8
+WRITE_POOL_SIZE = 2
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Multi-club : chaque club (tenant) a sa propre base SQLite dans data/tenants/<id>/.
+# Le club par défaut garde data/billiard.db (installation mono-club inchangée).
+DEFAULT_TENANT = "default"
+TENANTS_DIR = os.path.join("data", "tenants")
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+
+# Club de la requête en cours (posé par le middleware, lu par get_db)
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL : les lecteurs gardent un instantané cohérent pendant qu'un écrivain travaille
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+def _set_read_only_pragmas(dbapi_connection, connection_record):
+    # query_only : garde-fou en plus de mode=ro, toute écriture échoue immédiatement
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=1")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+def make_engine(path: str, read_only: bool = False):
+    """Moteur d'écriture, ou de lecture seule (URI SQLite mode=ro) pour une base"""
+    if read_only:
+        url = f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true"
+        pool_size, on_connect = READ_POOL_SIZE, _set_read_only_pragmas
+    else:
+        url = f"sqlite:///{path}"
+        pool_size, on_connect = WRITE_POOL_SIZE, _set_sqlite_pragmas
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        echo=False
+    )
+    event.listen(engine, "connect", on_connect)
+    return engine
+
+def make_sessionmaker(engine, tenant: str) -> sessionmaker:
+    # session.info["tenant"] permet aux caches en mémoire de séparer les clubs
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine, info={"tenant": tenant})
+
+engine = make_engine(DATABASE_PATH)
+SessionLocal = make_sessionmaker(engine, DEFAULT_TENANT)
+read_engine = make_engine(DATABASE_PATH, read_only=True)
+ReadSessionLocal = make_sessionmaker(read_engine, DEFAULT_TENANT)
 Base = declarative_base()
 
+def tenant_of(db: Session) -> str:
+    """Club auquel appartient une session"""
+    return db.info.get("tenant", DEFAULT_TENANT)
+
+def database_file(db: Session) -> str:
+    """Chemin absolu du fichier SQLite d'une session (écriture ou lecture seule)"""
+    database = db.get_bind().url.database or ""
+    if database.startswith("file:"):
+        database = database[len("file:"):]
+    return os.path.abspath(database)
+
+
+class _TenantDatabase:
+    def __init__(self, tenant: str, engine, session_factory: sessionmaker,
+                 read_engine, read_session_factory: sessionmaker):
+        self.tenant = tenant
+        self.engine = engine
+        self.session_factory = session_factory
+        self.read_engine = read_engine
+        self.read_session_factory = read_session_factory
+        self.last_used = time.monotonic()
+        self.prepared = False
+        self.lock = threading.Lock()
+
+
+class TenantRegistry:
+    """Moteurs SQLite des clubs, ouverts à la première requête.
+
+    Au plus `max_open` bases restent ouvertes (LRU) et celles inutilisées depuis
+    `idle_seconds` sont fermées au passage suivant ; la base du club par défaut
+    reste toujours ouverte. Les fonctions enregistrées via `on_open` (migrations,
+    paramètres par défaut) sont exécutées à chaque ouverture d'une base.
+    """
+
+    def __init__(self, max_open: int = 16, idle_seconds: float = 600):
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self._open: "OrderedDict[str, _TenantDatabase]" = OrderedDict()
+        self._open[DEFAULT_TENANT] = _TenantDatabase(
+            DEFAULT_TENANT, engine, SessionLocal, read_engine, ReadSessionLocal
+        )
+        self._hooks: List[Callable] = []
+        self._lock = threading.Lock()
+
+    def on_open(self, func: Callable):
+        """Décorateur : func(tenant, engine, session_factory) à l'ouverture d'une base"""
+        self._hooks.append(func)
+        return func
+
+    @staticmethod
+    def database_path(tenant: str) -> str:
+        return os.path.join(TENANTS_DIR, tenant, "billiard.db")
+
+    def exists(self, tenant: str) -> bool:
+        """Un club existe si son répertoire a été créé (voir `create`)"""
+        if tenant == DEFAULT_TENANT:
+            return True
+        return bool(TENANT_ID_PATTERN.match(tenant)) and os.path.isdir(os.path.join(TENANTS_DIR, tenant))
+
+    def create(self, tenant: str):
+        if not TENANT_ID_PATTERN.match(tenant):
+            raise ValueError(f"Identifiant de club invalide : {tenant!r}")
+        os.makedirs(os.path.join(TENANTS_DIR, tenant), exist_ok=True)
+
+    def session_factory(self, tenant: str, read_only: bool = False) -> sessionmaker:
+        """Fabrique de sessions du club (base ouverte et préparée au besoin)"""
+        with self._lock:
+            entry = self._open.get(tenant)
+            if entry is None:
+                if not self.exists(tenant):
+                    raise KeyError(tenant)
+                path = self.database_path(tenant)
+                tenant_engine = make_engine(path)
+                tenant_read_engine = make_engine(path, read_only=True)
+                entry = _TenantDatabase(
+                    tenant, tenant_engine, make_sessionmaker(tenant_engine, tenant),
+                    tenant_read_engine, make_sessionmaker(tenant_read_engine, tenant)
+                )
+                self._open[tenant] = entry
+            entry.last_used = time.monotonic()
+            self._open.move_to_end(tenant)
+            self._evict()
+
+        # Préparation hors du verrou global : l'ouverture d'un club ne bloque pas les autres.
+        # Elle passe par l'écrivain, qui crée le fichier que le lecteur ouvre ensuite en mode=ro.
+        with entry.lock:
+            if not entry.prepared:
+                for hook in self._hooks:
+                    hook(tenant, entry.engine, entry.session_factory)
+                entry.prepared = True
+        return entry.read_session_factory if read_only else entry.session_factory
+
+    def _evict(self):
+        now = time.monotonic()
+        for tenant, entry in list(self._open.items()):
+            if tenant == DEFAULT_TENANT:
+                continue
+            idle = now - entry.last_used > self.idle_seconds
+            if idle or len(self._open) > self.max_open:
+                del self._open[tenant]
+                # Les connexions encore empruntées sont fermées à leur restitution
+                entry.engine.dispose()
+                entry.read_engine.dispose()
+
+    def open_tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._open)
+
+
+tenants = TenantRegistry()
+
 def get_db():
-    db = SessionLocal()
+    db = tenants.session_factory(current_tenant.get())()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    """Session en lecture seule (pool de lecteurs), pour les routes qui n'écrivent pas"""
+    db = tenants.session_factory(current_tenant.get(), read_only=True)()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,11 +1,25 @@
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Dict, List
+from sqlalchemy import event, func
 from sqlalchemy.orm import Session
-from backend.app.models import Rating, TeamRating, Setting
-from datetime import datetime, timezone
+from sqlalchemy.pool import Pool
+from backend.app.models import Rating, TeamRating, Setting, Season, SeasonRating
+from datetime import datetime, timedelta, timezone
 from backend.app import models
+from backend.app.database import tenant_of
+from backend.app.identity import identity_cache
 import math
+import threading
+import time
 
 
+# Clé de session.info où sont notés les ratings modifiés, reportés au commit (rank_index)
+RATING_CHANGES_KEY = "rating_changes"
+
+# Colonnes recopiées d'un rating calculé vers la base (recalculs complets ou partiels)
+RATING_FIELDS = ("rating", "games", "wins", "losses", "streak", "last_played")
+# Sommes courantes de synergie, propres aux TeamRating
+SYNERGY_FIELDS = ("synergy_games", "synergy_wins", "synergy_expected")
+
 def _inc(x, by=1):
     return (x or 0) + by
 
@@ -31,7 +45,8 @@ def _ensure_team_rating(db, team_id: int, fmt: str, initial: float):
     if not tr:
         tr = models.TeamRating(
             team_id=team_id, format=fmt, rating=initial,
-            games=0, wins=0, losses=0, streak=0
+            games=0, wins=0, losses=0, streak=0,
+            synergy_games=0, synergy_wins=0, synergy_expected=0.0
         )
         db.add(tr)
         db.flush()
@@ -42,14 +57,165 @@ def _ensure_team_rating(db, team_id: int, fmt: str, initial: float):
         tr.streak = 0 if tr.streak is None else tr.streak
     return tr
 
+def _add_synergy(tr, score: float, expected: float):
+    """Cumule un match dans les sommes de synergie d'une équipe"""
+    tr.synergy_games = _inc(tr.synergy_games)
+    tr.synergy_wins = _inc(tr.synergy_wins, int(score))
+    tr.synergy_expected = (tr.synergy_expected or 0.0) + expected
+
+class SettingsCache:
+    """Paramètres ELO par club, pour ne pas relire la table à chaque calcul.
+
+    Invalidé explicitement quand les paramètres changent dans ce processus ; le
+    délai `ttl` borne le retard sur une modification faite par un autre worker.
+    """
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, Dict[str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> Dict[str, str]:
+        tenant = tenant_of(db)
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+        settings = {s.key: s.value for s in db.query(Setting).all()}
+        with self._lock:
+            self._entries[tenant] = (time.monotonic(), settings)
+        return settings
+
+    def invalidate(self, tenant: Optional[str] = None):
+        with self._lock:
+            if tenant is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(tenant, None)
+
+
+settings_cache = SettingsCache()
+
+def naive_utc(dt: datetime) -> datetime:
+    """Dates comparables à celles relues de SQLite (UTC sans fuseau)"""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+def decay_factor(days: Optional[float], grace_days: float, half_life_days: float) -> float:
+    """Part de l'écart au rating initial conservée après `days` jours d'inactivité"""
+    if days is None or half_life_days <= 0 or days <= grace_days:
+        return 1.0
+    return 0.5 ** ((days - grace_days) / half_life_days)
+
+@event.listens_for(Pool, "connect")
+def _register_decay_function(dbapi_connection, connection_record):
+    # decay_factor(jours, grâce, demi-vie) utilisable dans les requêtes de classement
+    dbapi_connection.create_function("decay_factor", 3, decay_factor, deterministic=True)
+
+class InactivityDecay:
+    """Décroissance d'inactivité : au-delà de `grace_days` sans match, l'écart au rating
+    initial diminue de moitié tous les `half_life_days` jours (0 = désactivée).
+
+    Rien n'est réécrit en base tant que le joueur ne rejoue pas : les lectures
+    (classements, profil) calculent le rating affiché à partir de `rating` et
+    `last_played`, et le match suivant applique la décroissance avant le calcul ELO.
+    L'affichage est évalué au début du jour UTC (`reference()`) : classements et index
+    de rang restent stables toute la journée.
+    """
+
+    def __init__(self, grace_days: float = 60, half_life_days: float = 0):
+        self.grace_days = grace_days
+        self.half_life_days = half_life_days
+
+    @property
+    def enabled(self) -> bool:
+        return self.half_life_days > 0
+
+    @property
+    def key(self) -> tuple:
+        return (self.grace_days, self.half_life_days) if self.enabled else ()
+
+    @staticmethod
+    def reference() -> datetime:
+        now = datetime.now(timezone.utc)
+        return datetime(now.year, now.month, now.day)
+
+    def apply(self, rating: float, last_played: Optional[datetime], at: datetime, target: float) -> float:
+        if not self.enabled or last_played is None:
+            return rating
+        days = (naive_utc(at) - naive_utc(last_played)) / timedelta(days=1)
+        return target + (rating - target) * decay_factor(days, self.grace_days, self.half_life_days)
+
+    def column(self, model, target: float, at: datetime):
+        """Expression SQL du rating affiché d'un modèle Rating / TeamRating"""
+        if not self.enabled:
+            return model.rating
+        days = func.julianday(at) - func.julianday(model.last_played)
+        return target + (model.rating - target) * func.decay_factor(days, self.grace_days, self.half_life_days)
+
+def inactivity_decay(settings: Dict[str, str]) -> InactivityDecay:
+    return InactivityDecay(
+        float(settings.get('decay_grace_days', '60')),
+        float(settings.get('decay_half_life_days', '0')),
+    )
+
+def rating_display(db: Session, kind: str = "player") -> Tuple[InactivityDecay, float, datetime]:
+    """(décroissance, rating cible, date de référence) pour afficher les ratings d'un type d'entité"""
+    settings = settings_cache.get(db)
+    target = float(settings.get('team_2v2_seed' if kind == "team" else 'initial_rating', '1000'))
+    return inactivity_decay(settings), target, InactivityDecay.reference()
+
+def active_season(db: Session) -> Optional[Season]:
+    """Saison ouverte (non close), None hors saison"""
+    return db.query(Season).filter(Season.closed_at.is_(None)).first()
+
+def in_season(season: Season, played_at: Optional[datetime]) -> bool:
+    at = naive_utc(played_at or datetime.now(timezone.utc))
+    return season.starts_at <= at < season.ends_at
+
 class EloCalculator:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, settings: Optional[Dict[str, str]] = None):
+        """`settings` remplace les paramètres du club (simulation, voir cli.py)"""
         self.db = db
-        self._load_settings()
+        self._load_settings(settings)
+        self._season_calc = None  # Calculateur de la saison active, chargé au premier match
+
+    def _get_rating(self, player_id: int, fmt: str) -> Rating:
+        """Rating individuel à mettre à jour (créé si absent)"""
+        return _ensure_rating(self.db, player_id, fmt, self.INITIAL_RATING)
+
+    def _get_team_rating(self, team_id: int, fmt: str) -> TeamRating:
+        """Rating d'équipe à mettre à jour (créé si absent)"""
+        return _ensure_team_rating(self.db, team_id, fmt, self.TEAM_2V2_SEED)
+
+    def _rating_changed(self, r):
+        """Note un rating modifié, pour les index en mémoire mis à jour au commit"""
+        kind, entity_id = ("team", r.team_id) if isinstance(r, TeamRating) else ("player", r.player_id)
+        self.db.info.setdefault(RATING_CHANGES_KEY, {})[(kind, r.format, entity_id)] = (r.rating, r.last_played)
+
+    def _get_team_players(self, team_id: int) -> List[int]:
+        """IDs des membres d'une équipe (clé de l'équipe en cache, sinon team_members)"""
+        members = identity_cache.get(self.db).team_members(team_id)
+        if members is not None:
+            return members
+        from backend.app.models import TeamMember
+        return [m.player_id for m in self.db.query(TeamMember).filter_by(team_id=team_id).all()]
+
+    def _add_synergy(self, tr, score: float, expected: float):
+        _add_synergy(tr, score, expected)
+
+    def season_calculator(self, played_at: Optional[datetime]) -> Optional["SeasonEloCalculator"]:
+        """Calculateur des ratings de la saison active si le match en fait partie"""
+        if self._season_calc is None:
+            season = active_season(self.db)
+            self._season_calc = SeasonEloCalculator(self.db, season) if season else False
+        if self._season_calc and in_season(self._season_calc.season, played_at):
+            return self._season_calc
+        return None
     
-    def _load_settings(self):
+    def _load_settings(self, settings: Optional[Dict[str, str]] = None):
         """Charge les paramètres depuis la base de données"""
-        settings = {s.key: s.value for s in self.db.query(Setting).all()}
+        if settings is None:
+            settings = settings_cache.get(self.db)
 
         self.K_BASE = float(settings.get('k_base', '24'))
         self.ALPHA = float(settings.get('alpha', '0.5'))  # Pour margin of victory
@@ -59,6 +225,25 @@ class EloCalculator:
         self.TEAM_2V2_SEED = float(settings.get('team_2v2_seed', '1000'))
         self.WIN_BONUS = float(settings.get('win_bonus', '1'))
         self.INFLATION = float(settings.get('inflation', '2.0'))  # Inflation par match
+        self.decay = inactivity_decay(settings)  # Décroissance d'inactivité
+
+    def _rating_at(self, player_id: int, fmt: str, now: datetime) -> Rating:
+        """Rating individuel d'un joueur qui joue à `now`, décroissance d'inactivité appliquée"""
+        r = self._get_rating(player_id, fmt)
+        self._materialize_decay(r, self.INITIAL_RATING, now)
+        return r
+
+    def _team_rating_at(self, team_id: int, fmt: str, now: datetime) -> TeamRating:
+        tr = self._get_team_rating(team_id, fmt)
+        self._materialize_decay(tr, self.TEAM_2V2_SEED, now)
+        return tr
+
+    def _materialize_decay(self, r, target: float, now: datetime):
+        # last_played passe à `now` tout de suite : une seconde lecture dans le même
+        # match ne réapplique pas la décroissance
+        if self.decay.enabled and r.last_played is not None and naive_utc(now) > naive_utc(r.last_played):
+            r.rating = self.decay.apply(r.rating, r.last_played, now, target)
+            r.last_played = now
     
     def calculate_expected_score(self, rating_a: float, rating_b: float) -> float:
         """Calcule le score attendu selon la formule ELO standard"""
@@ -86,13 +271,17 @@ class EloCalculator:
         player_a_id: int, 
         player_b_id: int, 
         winner_id: int,
-        balls_remaining: int
+        balls_remaining: int,
+        played_at: Optional[datetime] = None
     ) -> Tuple[float, float]:
         """Met à jour les ratings ELO pour un match 1v1"""
 
-        # Ratings garantis (compteurs à 0 si nouveaux / NULL corrigés)
-        rating_a = _ensure_rating(self.db, player_a_id, '1v1', self.INITIAL_RATING)
-        rating_b = _ensure_rating(self.db, player_b_id, '1v1', self.INITIAL_RATING)
+        # Date du match si connue (rejeu), sinon horodatage UTC courant
+        now = played_at or datetime.now(timezone.utc)
+
+        # Ratings garantis (compteurs à 0 si nouveaux / NULL corrigés), décroissance appliquée
+        rating_a = self._rating_at(player_a_id, '1v1', now)
+        rating_b = self._rating_at(player_b_id, '1v1', now)
 
         # Calculs ELO
         old_rating_a = rating_a.rating
@@ -128,8 +317,6 @@ class EloCalculator:
         rating_a.rating = old_rating_a + delta_a
         rating_b.rating = old_rating_b + delta_b
 
-        # Horodatage UTC moderne (évite le warning d’utcnow())
-        now = datetime.now(timezone.utc)
         rating_a.last_played = now
         rating_b.last_played = now
 
@@ -147,6 +334,9 @@ class EloCalculator:
             rating_a.streak = min(-1, (rating_a.streak or 0) - 1) if (rating_a.streak or 0) <= 0 else -1
             rating_b.streak = max(1, (rating_b.streak or 0) + 1) if (rating_b.streak or 0) >= 0 else 1
 
+        self._rating_changed(rating_a)
+        self._rating_changed(rating_b)
+
         return delta_a, delta_b
 
     
@@ -155,13 +345,16 @@ class EloCalculator:
         team_a_id: int,
         team_b_id: int,
         winner_team_id: int,
-        balls_remaining: int
+        balls_remaining: int,
+        played_at: Optional[datetime] = None
     ) -> Tuple[float, float]:
         """Met à jour les ratings ELO pour un match 2v2 (par équipe ET par joueur individuel)"""
 
-        # Ratings d'équipe garantis
-        rating_a = _ensure_team_rating(self.db, team_a_id, '2v2', self.TEAM_2V2_SEED)
-        rating_b = _ensure_team_rating(self.db, team_b_id, '2v2', self.TEAM_2V2_SEED)
+        now = played_at or datetime.now(timezone.utc)
+
+        # Ratings d'équipe garantis, décroissance d'inactivité appliquée
+        rating_a = self._team_rating_at(team_a_id, '2v2', now)
+        rating_b = self._team_rating_at(team_b_id, '2v2', now)
 
         old_rating_a = rating_a.rating
         old_rating_b = rating_b.rating
@@ -192,7 +385,6 @@ class EloCalculator:
         rating_a.rating = old_rating_a + delta_a
         rating_b.rating = old_rating_b + delta_b
 
-        now = datetime.now(timezone.utc)
         rating_a.last_played = now
         rating_b.last_played = now
 
@@ -209,14 +401,22 @@ class EloCalculator:
             rating_a.streak = min(-1, (rating_a.streak or 0) - 1) if (rating_a.streak or 0) <= 0 else -1
             rating_b.streak = max(1, (rating_b.streak or 0) + 1) if (rating_b.streak or 0) >= 0 else 1
 
+        self._rating_changed(rating_a)
+        self._rating_changed(rating_b)
+
         # NOUVEAU : Mettre à jour les ratings INDIVIDUELS des joueurs pour le format 2v2
         # Récupérer les membres des équipes
-        from backend.app.models import TeamMember
-        members_a = self.db.query(TeamMember).filter_by(team_id=team_a_id).all()
-        members_b = self.db.query(TeamMember).filter_by(team_id=team_b_id).all()
-
-        players_a = [m.player_id for m in members_a]
-        players_b = [m.player_id for m in members_b]
+        players_a = self._get_team_players(team_a_id)
+        players_b = self._get_team_players(team_b_id)
+
+        # Synergie : ce que prédisaient les ratings 2v2 individuels des membres (moyenne
+        # de chaque paire, avant ce match), comparé au résultat de l'équipe
+        if players_a and players_b:
+            individual_a = sum(self._rating_at(pid, '2v2', now).rating for pid in players_a) / len(players_a)
+            individual_b = sum(self._rating_at(pid, '2v2', now).rating for pid in players_b) / len(players_b)
+            predicted_a = self.calculate_expected_score(individual_a, individual_b)
+            self._add_synergy(rating_a, score_a, predicted_a)
+            self._add_synergy(rating_b, score_b, 1 - predicted_a)
 
         # Mettre à jour les ratings individuels des joueurs de l'équipe A
         for player_id in players_a:
@@ -237,7 +437,7 @@ class EloCalculator:
         now: datetime
     ):
         """Met à jour le rating individuel d'un joueur pour un format d'équipe"""
-        rating = _ensure_rating(self.db, player_id, fmt, self.INITIAL_RATING)
+        rating = self._rating_at(player_id, fmt, now)
 
         rating.rating += delta
         rating.last_played = now
@@ -250,21 +450,26 @@ class EloCalculator:
             rating.losses = _inc(rating.losses)
             rating.streak = min(-1, (rating.streak or 0) - 1) if (rating.streak or 0) <= 0 else -1
 
+        self._rating_changed(rating)
+
     def update_team_ratings(
         self,
         players_a: list,
         players_b: list,
         winner_side: str,
         balls_remaining: int,
-        fmt: str
+        fmt: str,
+        played_at: Optional[datetime] = None
     ) -> Tuple[float, float]:
         """Met à jour les ratings ELO pour un match d'équipe (3v3, 1v2, 2v3, etc.)
 
         Calcule le rating moyen de chaque côté, puis applique le delta à chaque joueur.
         """
+        now = played_at or datetime.now(timezone.utc)
+
         # Calculer le rating moyen de chaque côté
-        ratings_a = [_ensure_rating(self.db, pid, fmt, self.INITIAL_RATING) for pid in players_a]
-        ratings_b = [_ensure_rating(self.db, pid, fmt, self.INITIAL_RATING) for pid in players_b]
+        ratings_a = [self._rating_at(pid, fmt, now) for pid in players_a]
+        ratings_b = [self._rating_at(pid, fmt, now) for pid in players_b]
 
         avg_rating_a = sum(r.rating for r in ratings_a) / len(ratings_a)
         avg_rating_b = sum(r.rating for r in ratings_b) / len(ratings_b)
@@ -292,8 +497,6 @@ class EloCalculator:
         delta_a += self.INFLATION
         delta_b += self.INFLATION
 
-        now = datetime.now(timezone.utc)
-
         # Appliquer le delta à chaque joueur du côté A
         for player_id in players_a:
             self._update_individual_team_rating(player_id, fmt, delta_a, score_a == 1.0, now)
@@ -314,19 +517,25 @@ class EloCalculator:
         sorted_ids = sorted(player_ids)
         team_key = f"{sorted_ids[0]}-{sorted_ids[1]}"
         
-        from backend.app.models import Team, TeamMember, Player
-        
-        # Rechercher l'équipe existante
+        from backend.app.models import Team, TeamMember
+
+        # Équipe connue : cache d'identité, sans requête
+        identities = identity_cache.get(self.db)
+        team_id = identities.team_ids.get(team_key)
+        if team_id is not None:
+            return team_id
+
+        # Équipe inconnue du cache : peut-être créée entre-temps par un autre worker
         team = self.db.query(Team).filter_by(key=team_key).first()
         
         if not team:
             # Créer la nouvelle équipe
-            players = self.db.query(Player).filter(Player.id.in_(player_ids)).all()
-            if len(players) != 2:
+            names = [identities.player_name(pid) for pid in sorted_ids]
+            if None in names:
                 return None
             
             # Nom automatique
-            team_name = f"{players[0].name} + {players[1].name}"
+            team_name = f"{names[0]} + {names[1]}"
             
             team = Team(key=team_key, name=team_name)
             self.db.add(team)
@@ -336,5 +545,129 @@ class EloCalculator:
             for player_id in player_ids:
                 member = TeamMember(team_id=team.id, player_id=player_id)
                 self.db.add(member)
+            identity_cache.bump(self.db)
         
-        return team.id
\ No newline at end of file
+        return team.id
+
+
+class ReplayEloCalculator(EloCalculator):
+    """Rejoue l'historique entièrement en mémoire.
+
+    Les ratings sont des objets transients jamais ajoutés à la session : la base
+    n'est pas touchée pendant le rejeu, le résultat est appliqué d'un bloc ensuite.
+    Sans session (`db=None`, rejeu dans un autre processus, voir uncertainty.py),
+    paramètres et membres des équipes sont fournis et les matchs 2v2 portent leurs équipes.
+    """
+
+    def __init__(self, db: Optional[Session], settings: Optional[Dict[str, str]] = None,
+                 team_players: Optional[Dict[int, List[int]]] = None):
+        super().__init__(db, settings)
+        from backend.app.models import Team, TeamMember
+
+        self.ratings: Dict[Tuple[int, str], Rating] = {}
+        self.team_ratings: Dict[Tuple[int, str], TeamRating] = {}
+        if team_players is not None:
+            self.team_ids: Dict[str, int] = {}
+            self.team_players = team_players
+            return
+        self.team_ids = dict(self.db.query(Team.key, Team.id).all())
+        self.team_players: Dict[int, List[int]] = {}
+        for team_id, player_id in self.db.query(TeamMember.team_id, TeamMember.player_id).all():
+            self.team_players.setdefault(team_id, []).append(player_id)
+
+    def _get_rating(self, player_id: int, fmt: str) -> Rating:
+        r = self.ratings.get((player_id, fmt))
+        if r is None:
+            r = Rating(
+                player_id=player_id, format=fmt, rating=self.INITIAL_RATING,
+                games=0, wins=0, losses=0, streak=0
+            )
+            self.ratings[(player_id, fmt)] = r
+        return r
+
+    def _get_team_rating(self, team_id: int, fmt: str) -> TeamRating:
+        tr = self.team_ratings.get((team_id, fmt))
+        if tr is None:
+            tr = TeamRating(
+                team_id=team_id, format=fmt, rating=self.TEAM_2V2_SEED,
+                games=0, wins=0, losses=0, streak=0,
+                synergy_games=0, synergy_wins=0, synergy_expected=0.0
+            )
+            self.team_ratings[(team_id, fmt)] = tr
+        return tr
+
+    def _rating_changed(self, r):
+        # Rejeu en mémoire : rien à reporter, l'appelant invalide les index après le swap
+        pass
+
+    def season_calculator(self, played_at: Optional[datetime]) -> None:
+        # Les ratings de saison sont rejoués à part (ratings.refresh_season_ratings)
+        return None
+
+    def _get_team_players(self, team_id: int) -> List[int]:
+        if team_id not in self.team_players:
+            self.team_players[team_id] = super()._get_team_players(team_id)
+        return self.team_players[team_id]
+
+    def get_or_create_team(self, player_ids: list) -> Optional[int]:
+        if len(player_ids) != 2:
+            return None
+        sorted_ids = sorted(player_ids)
+        team_key = f"{sorted_ids[0]}-{sorted_ids[1]}"
+        if team_key not in self.team_ids:
+            # Équipe inconnue (cas rare) : création réelle en base
+            self.team_ids[team_key] = super().get_or_create_team(player_ids)
+        return self.team_ids[team_key]
+
+    def rating_rows(self) -> List[dict]:
+        """Ratings individuels calculés, prêts pour une insertion en masse"""
+        return [_rating_row(r, player_id=r.player_id) for r in self.ratings.values()]
+
+    def team_rating_rows(self) -> List[dict]:
+        """Ratings d'équipe calculés, prêts pour une insertion en masse"""
+        return [
+            _rating_row(tr, team_id=tr.team_id, **{f: getattr(tr, f) for f in SYNERGY_FIELDS})
+            for tr in self.team_ratings.values()
+        ]
+
+
+def _rating_row(r, **key) -> dict:
+    return dict(key, format=r.format, **{f: getattr(r, f) for f in RATING_FIELDS})
+
+
+class SeasonEloCalculator(EloCalculator):
+    """Ratings de la saison active : mêmes formules, chaque entité repart du rating initial.
+
+    Les lignes sont dans season_ratings, sans sommes de synergie. Rien n'est reporté
+    dans rank_index : le classement de saison est lu directement par idx_season_ratings_board.
+    """
+
+    def __init__(self, db: Session, season: Season):
+        super().__init__(db)
+        self.season = season
+
+    def _season_rating(self, kind: str, entity_id: int, fmt: str, initial: float) -> SeasonRating:
+        r = self.db.get(SeasonRating, (self.season.id, kind, fmt, entity_id))
+        if r is None:
+            r = SeasonRating(
+                season_id=self.season.id, entity_type=kind, format=fmt, entity_id=entity_id,
+                rating=initial, games=0, wins=0, losses=0, streak=0
+            )
+            self.db.add(r)
+            self.db.flush()
+        return r
+
+    def _get_rating(self, player_id: int, fmt: str) -> SeasonRating:
+        return self._season_rating("player", player_id, fmt, self.INITIAL_RATING)
+
+    def _get_team_rating(self, team_id: int, fmt: str) -> SeasonRating:
+        return self._season_rating("team", team_id, fmt, self.TEAM_2V2_SEED)
+
+    def _rating_changed(self, r):
+        pass
+
+    def _add_synergy(self, tr, score: float, expected: float):
+        pass
+
+    def season_calculator(self, played_at: Optional[datetime]) -> None:
+        return None
@@ -0,0 +1,79 @@
+"""Validation de cache HTTP (ETag faibles) pour les listes souvent rechargées.
+
+L'ETag est calculé à partir d'une version des données (quelques agrégats peu
+coûteux) et des paramètres de la requête, avant de construire la réponse : un
+téléphone qui recharge /players ou /history sans changement reçoit un 304 vide.
+Il est « faible » (W/) car le corps peut être compressé ou non selon le client.
+
+`FragmentCache` garde des morceaux de JSON déjà encodés, chacun associé à la version
+de ses données : une réponse composée (GET /bootstrap) est assemblée par simple
+concaténation, seuls les morceaux dont la version a changé étant reconstruits.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Comparaison faible avec If-None-Match (liste d'ETags ou *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(tag) == _opaque(etag) for tag in header.split(","))
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    # no-cache : le navigateur garde la réponse mais la revalide à chaque chargement
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def not_modified(etag: str) -> Response:
+    return with_etag(Response(status_code=304), etag)
+
+
+class FragmentCache:
+    """Fragments JSON encodés par orjson, par clé, LRU borné"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable, build: Callable[[], object]) -> bytes:
+        """Fragment de `key` à cette version ; `build()` n'est appelé que s'il a changé"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        # Mêmes options que ORJSONResponse : mêmes octets que la route dédiée
+        fragment = orjson.dumps(build(), option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        with self._lock:
+            self._entries[key] = (version, fragment)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+
+fragment_cache = FragmentCache()
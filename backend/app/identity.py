@@ -0,0 +1,158 @@
+"""Cache d'identité des joueurs et des équipes, partagé par tout le processus.
+
+Noms, statut invité et clés d'équipe ne changent presque jamais : plutôt que de les
+relire à chaque match enregistré, à chaque classement et à chaque page d'historique,
+chaque club garde en mémoire id -> joueur, id -> équipe et clé "a-b" -> id d'équipe.
+
+La cohérence entre workers passe par une ligne de version (table `cache_versions`) :
+toute création ou suppression de joueur ou d'équipe l'incrémente dans sa propre
+transaction (`bump`), et le cache est rechargé dès que la version lue diffère de la
+sienne. Une lecture de cette ligne (clé primaire) par transaction remplace les requêtes
+de noms ; la version sert aussi d'empreinte pour les ETag de /players et /history.
+
+Une transaction qui vient d'incrémenter la version voit des données non validées :
+ce qu'elle charge reste dans sa session et n'est jamais publié dans le cache partagé,
+sinon une annulation laisserait sous le même numéro (réutilisé par l'écrivain suivant)
+des identités qui n'ont jamais existé.
+"""
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import tenant_of
+
+# Lignes de cache_versions
+IDENTITY = "identity"
+RATING_INTERVALS = "rating_intervals"  # empreinte des données couvertes (voir uncertainty.py)
+RATINGS = "ratings"  # incrémentée à chaque écriture de ratings (voir rank_index.py)
+# Incrémentée quand un id peut désigner une autre entité (import, suppression de joueur)
+RATINGS_EPOCH = "ratings_epoch"
+RATING_INTERVALS_EPOCH = "rating_intervals_epoch"  # époque des ratings couverte par les intervalles
+SESSION_KEY = "identities"
+BUMPED_KEY = "identities_bumped"
+
+
+# Mêmes clés, même ordre que schemas.Player / schemas.TeamSimple
+def player_dict(name: str, is_guest: bool, player_id: int, created_at) -> dict:
+    return {"name": name, "is_guest": is_guest, "id": player_id, "created_at": created_at}
+
+
+def team_dict(name: str, team_id: int, key: str, created_at) -> dict:
+    return {"name": name, "id": team_id, "key": key, "created_at": created_at}
+
+
+class Identities:
+    """Vue figée des joueurs et équipes d'un club à une version donnée (lecture seule)"""
+
+    def __init__(self, version: int, players: Dict[int, dict], teams: Dict[int, dict]):
+        self.version = version
+        self.players = players
+        self.teams = teams
+        self.team_ids: Dict[str, int] = {team["key"]: team_id for team_id, team in teams.items()}
+        self.sorted_players = sorted(players.values(), key=lambda p: p["name"])
+
+    def player_name(self, player_id: int) -> Optional[str]:
+        player = self.players.get(player_id)
+        return player["name"] if player else None
+
+    def team_name(self, team_id: int) -> Optional[str]:
+        team = self.teams.get(team_id)
+        return team["name"] if team else None
+
+    def team_members(self, team_id: int) -> Optional[list]:
+        """Membres d'après la clé canonique de l'équipe"""
+        team = self.teams.get(team_id)
+        return [int(pid) for pid in team["key"].split("-")] if team else None
+
+    def player_dicts(self, player_ids: Iterable[int]) -> Dict[int, dict]:
+        return {pid: self.players[pid] for pid in player_ids if pid in self.players}
+
+    def team_dicts(self, team_ids: Iterable[int]) -> Dict[int, dict]:
+        return {tid: self.teams[tid] for tid in team_ids if tid in self.teams}
+
+
+def read_version(db: Session, name: str = IDENTITY) -> int:
+    return db.query(models.CacheVersion.version).filter_by(name=name).scalar() or 0
+
+
+def write_version(db: Session, name: str, version: int):
+    """Fixe une version (sans commit), pour les caches versionnés par empreinte"""
+    db.execute(
+        insert(models.CacheVersion)
+        .values(name=name, version=version)
+        .on_conflict_do_update(index_elements=[models.CacheVersion.name], set_={"version": version})
+    )
+
+
+def bump_version(db: Session, name: str) -> int:
+    """Incrémente une version (sans commit) et renvoie la nouvelle valeur"""
+    # Incrément atomique : deux workers ne peuvent pas écrire la même version, et
+    # la relecture voit la nôtre puisque la transaction tient le verrou d'écriture
+    db.execute(
+        insert(models.CacheVersion)
+        .values(name=name, version=1)
+        .on_conflict_do_update(
+            index_elements=[models.CacheVersion.name],
+            set_={"version": models.CacheVersion.version + 1}
+        )
+    )
+    return read_version(db, name)
+
+
+class IdentityCache:
+    """Identités par club, associées à la version lue dans `cache_versions`"""
+
+    def __init__(self):
+        self._entries: Dict[str, Identities] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> Identities:
+        """Identités à jour ; la version n'est relue qu'une fois par transaction"""
+        identities = db.info.get(SESSION_KEY)
+        if identities is not None:
+            return identities
+
+        key = tenant_of(db)
+        version = read_version(db)
+        with self._lock:
+            identities = self._entries.get(key)
+        if identities is None or identities.version != version:
+            identities = self._load(db, version)
+            if not db.info.get(BUMPED_KEY):
+                with self._lock:
+                    self._entries[key] = identities
+        db.info[SESSION_KEY] = identities
+        return identities
+
+    @staticmethod
+    def _load(db: Session, version: int) -> Identities:
+        players = {
+            row[2]: player_dict(*row)
+            for row in db.query(models.Player.name, models.Player.is_guest, models.Player.id, models.Player.created_at)
+        }
+        teams = {
+            row[1]: team_dict(*row)
+            for row in db.query(models.Team.name, models.Team.id, models.Team.key, models.Team.created_at)
+        }
+        return Identities(version, players, teams)
+
+    def bump(self, db: Session):
+        """À appeler dans la transaction qui crée ou supprime un joueur ou une équipe"""
+        bump_version(db, IDENTITY)
+        db.info.pop(SESSION_KEY, None)
+        db.info[BUMPED_KEY] = True
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_session_identities(session):
+    # Transaction suivante : version relue (modifiée par un autre worker, ou annulée)
+    session.info.pop(SESSION_KEY, None)
+    session.info.pop(BUMPED_KEY, None)
@@ -0,0 +1,126 @@
+import itertools
+import queue
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from backend.app.database import DEFAULT_TENANT
+
+
+class Job:
+    """Tâche de fond (ex : recalcul des ELO) avec sa progression"""
+
+    def __init__(self, job_id: int, kind: str, tenant: str = DEFAULT_TENANT, params: Tuple[Hashable, ...] = ()):
+        self.id = job_id
+        self.kind = kind
+        self.tenant = tenant  # Club dont la base est traitée
+        self.params = params  # Paramètres de la demande (fusion des seules demandes identiques)
+        self.status = "pending"  # 'pending', 'running', 'done', 'failed'
+        self.requests = 1  # Nombre de demandes fusionnées dans cette tâche
+        self.done = 0
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def set_progress(self, done: int, total: int):
+        self.done = done
+        self.total = total
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimation linéaire du temps restant à partir du rythme observé"""
+        if self.status != "running" or not self.started_at or not self.total or not self.done:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return round(elapsed / self.done * (self.total - self.done), 2)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "requests": self.requests,
+            "done": self.done,
+            "total": self.total,
+            "eta_seconds": self.eta_seconds(),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    """Exécute les tâches lourdes dans un thread unique, hors des requêtes HTTP.
+
+    Les demandes d'un même type (et d'un même club) arrivant pendant qu'une tâche attend encore son
+    tour sont fusionnées avec elle : trois suppressions rapides donnent un seul
+    recalcul. Seules les demandes aux paramètres identiques (`params`) sont
+    fusionnées, et jamais celles soumises avec `coalesce=False` (import d'un fichier).
+    Une demande arrivant pendant l'exécution crée une nouvelle tâche, puisque les
+    données ont pu changer après son démarrage.
+    """
+
+    def __init__(self, max_history: int = 100):
+        self.max_history = max_history
+        self._jobs: Dict[int, Job] = {}
+        self._pending: Dict[Tuple[str, str, tuple], Job] = {}
+        self._ids = itertools.count(1)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, kind: str, func: Callable[[Job], None], tenant: str = DEFAULT_TENANT,
+               params: Tuple[Hashable, ...] = (), coalesce: bool = True) -> Job:
+        """Met une tâche en file, ou renvoie celle du même type et des mêmes paramètres
+        déjà en attente (la fonction soumise est alors abandonnée)"""
+        with self._lock:
+            pending = self._pending.get((tenant, kind, params)) if coalesce else None
+            if pending:
+                pending.requests += 1
+                return pending
+
+            job = Job(next(self._ids), kind, tenant, params)
+            self._jobs[job.id] = job
+            if coalesce:
+                self._pending[(tenant, kind, params)] = job
+            self._prune()
+            self._queue.put((job, func))
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._work, name="job-runner", daemon=True)
+                self._thread.start()
+            return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job in finished[:max(0, len(self._jobs) - self.max_history)]:
+            del self._jobs[job.id]
+
+    def _work(self):
+        while True:
+            job, func = self._queue.get()
+            with self._lock:
+                key = (job.tenant, job.kind, job.params)
+                if self._pending.get(key) is job:
+                    del self._pending[key]
+                job.status = "running"
+                job.started_at = datetime.utcnow()
+            try:
+                func(job)
+                job.status = "done"
+            except Exception as exc:
+                job.status = "failed"
+                job.error = str(exc)
+                traceback.print_exc()
+            finally:
+                job.finished_at = datetime.utcnow()
+                self._queue.task_done()
+
+
+job_runner = JobRunner()
@@ -1,20 +1,44 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Body
+from fastapi import FastAPI, Depends, HTTPException, Request, status, Body, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy import func
 from datetime import datetime, timedelta
 from typing import List, Optional
 import hashlib
+import os
 import secrets
 import json
+import tempfile
 
-from backend.app import models, schemas
-from backend.app.database import SessionLocal, engine, get_db, Base
-from backend.app.elo import EloCalculator
+import orjson
 
-# Créer les tables
-Base.metadata.create_all(bind=engine)
+from backend.app import models, schemas
+from backend.app.analytics import analytics_cache
+from backend.app.archive import archive_reader, archived_until, side_key
+from backend.app.backup import backup_database, export_chunks, prune_backups
+from backend.app.database import DEFAULT_TENANT, Base, current_tenant, get_db, get_read_db, tenant_of, tenants
+from backend.app.elo import EloCalculator, active_season, naive_utc, rating_display, settings_cache
+from backend.app.http_cache import etag_matches, fragment_cache, not_modified, weak_etag, with_etag
+from backend.app.identity import identity_cache
+from backend.app.jobs import Job, job_runner
+from backend.app.matchmaking import best_splits
+from backend.app.predictions import win_matrix_cache
+from backend.app.rank_index import rank_index
+from backend.app.ratings import (
+    ReplayMatch, apply_match_ratings, archive_old_matches, delete_player_data, history_signature,
+    import_data, player_rating_series, ratings_signature, rebuild_ratings, recompute_after_edit
+)
+from backend.app.seasons import close_season, create_season, find_season, season_dict, season_leaderboard
+from backend.app.serialization import (
+    LEADERBOARD_FIELDS, MATCH_FIELDS, json_response, leaderboard_dict, parse_fields, project
+)
+from backend.app.synergy import synergy_cache
+from backend.app.trend import lttb, trend_cache
+from backend.app.uncertainty import REPLICATES, compute_intervals, interval_fields, load_intervals
 
 app = FastAPI(title="Billiard Tracker API", version="1.0.0")
 
@@ -27,13 +51,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Sessions admin (simple, en mémoire pour ce POC)
+# Compression des réponses JSON au-delà de 1 Ko (Wi-Fi du bar : les grosses listes d'abord)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Multi-club : le club est donné par le préfixe /clubs/<id>/... ou l'en-tête X-Club
+@app.middleware("http")
+async def resolve_tenant(request: Request, call_next):
+    tenant = request.headers.get("x-club", DEFAULT_TENANT)
+    path = request.scope["path"]
+    if path.startswith("/clubs/"):
+        tenant, _, rest = path[len("/clubs/"):].partition("/")
+        request.scope["path"] = "/" + rest
+        request.scope["raw_path"] = request.scope["path"].encode()
+
+    if not tenants.exists(tenant):
+        return JSONResponse(status_code=404, content={"detail": "Club inconnu"})
+    token = current_tenant.set(tenant)
+    try:
+        return await call_next(request)
+    finally:
+        current_tenant.reset(token)
+
+@app.on_event("startup")
+def migrate_schema():
+    tenants.session_factory(DEFAULT_TENANT)
+
+# Sessions admin (simple, en mémoire pour ce POC), chacune liée à un club
 admin_sessions = {}
 
 def check_admin(token: str = None):
-    """Vérifie si le token admin est valide"""
+    """Vérifie si le token admin est valide pour le club de la requête"""
     if not token or token not in admin_sessions:
         raise HTTPException(status_code=401, detail="Non autorisé")
+    if admin_sessions[token]['tenant'] != current_tenant.get():
+        raise HTTPException(status_code=401, detail="Non autorisé")
     
     # Vérifier expiration (30 minutes)
     if datetime.utcnow() > admin_sessions[token]['expires']:
@@ -42,55 +93,52 @@ def check_admin(token: str = None):
     
     return admin_sessions[token]
 
-def rebuild_ratings(db: Session):
-    """Recalcule tous les ELO depuis l'historique après une suppression/modification."""
-    # 1) Remise à zéro des ratings individuels et d'équipes
-    db.query(models.Rating).delete()
-    db.query(models.TeamRating).delete()
-    db.commit()
+# Nombre de joueurs attendus par côté pour chaque format
+FORMAT_PLAYERS = {
+    "1v1": (1, 1),
+    "2v2": (2, 2),
+    "3v3": (3, 3),
+    "1v2": (1, 2),
+    "2v3": (2, 3)
+}
 
-    # 2) Rejouer les matchs classés par date
-    matches = (
-        db.query(models.Match)
-        .order_by(models.Match.played_at.asc(), models.Match.id.asc())
-        .all()
-    )
-    elo_calc = EloCalculator(db)
+def validate_match_players(fmt: str, players_a: list, players_b: list):
+    """Vérifie le nombre de joueurs de chaque côté selon le format"""
+    expected_a, expected_b = FORMAT_PLAYERS.get(fmt, (0, 0))
 
-    for m in matches:
-        if not m.ranked:
-            continue
+    if len(players_a) != expected_a or len(players_b) != expected_b:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format {fmt} requiert {expected_a} joueur(s) côté A et {expected_b} côté B"
+        )
+    if len(set(players_a)) != len(players_a) or len(set(players_b)) != len(players_b):
+        raise HTTPException(status_code=400, detail="Un joueur ne peut pas figurer deux fois dans une équipe")
+    if set(players_a) & set(players_b):
+        raise HTTPException(status_code=400, detail="Un joueur ne peut pas jouer des deux côtés")
+
+def ensure_not_archived(db: Session, played_at: Optional[datetime]):
+    """Refuse un match daté dans la période archivée, figée (voir archive.py)"""
+    until = archived_until(db)
+    if until is not None and played_at is not None and played_at <= until[0]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Période archivée jusqu'au {until[0]:%Y-%m-%d} : aucun match ne peut y être ajouté ou déplacé"
+        )
 
-        # récupérer les joueurs par côté
-        players_a = [mp.player_id for mp in m.players if mp.side == "A"]
-        players_b = [mp.player_id for mp in m.players if mp.side == "B"]
+def enqueue_rebuild() -> Job:
+    """Planifie un recalcul des ELO du club courant en tâche de fond (fusionné avec celui en attente)"""
+    def run(job: Job):
+        db = tenants.session_factory(job.tenant)()
+        try:
+            rebuild_ratings(db, progress=job.set_progress)
+        finally:
+            db.close()
 
-        if m.format == "1v1" and len(players_a) == 1 and len(players_b) == 1:
-            winner_id = players_a[0] if m.winner_side == "A" else players_b[0]
-            elo_calc.update_1v1_ratings(
-                players_a[0], players_b[0],
-                winner_id,
-                m.balls_remaining
-            )
-        elif m.format == "2v2" and len(players_a) == 2 and len(players_b) == 2:
-            # retrouver/créer les équipes comme lors de la création
-            team_a_id = elo_calc.get_or_create_team(players_a)
-            team_b_id = elo_calc.get_or_create_team(players_b)
-            winner_team_id = team_a_id if m.winner_side == "A" else team_b_id
-            elo_calc.update_2v2_ratings(
-                team_a_id, team_b_id, winner_team_id, m.balls_remaining
-            )
-        elif m.format in ("3v3", "1v2", "2v3"):
-            # Mise à jour des ratings individuels pour les autres formats d'équipe
-            elo_calc.update_team_ratings(
-                players_a,
-                players_b,
-                m.winner_side,
-                m.balls_remaining,
-                m.format
-            )
+    return job_runner.submit("rebuild_ratings", run, tenant=current_tenant.get())
 
-    db.commit()
+def match_to_response(db: Session, match: models.Match) -> dict:
+    """Réponse API d'un match (joueurs et équipes tirés du cache d'identité)"""
+    return match_dicts(db, [tuple(getattr(match, column.key) for column in MATCH_COLUMNS)])[0]
 
 # Routes principales
 
@@ -108,50 +156,42 @@ def create_player(player: schemas.PlayerCreate, db: Session = Depends(get_db)):
     
     db_player = models.Player(**player.model_dump())
     db.add(db_player)
+    db.flush()
+    identity_cache.bump(db)
     db.commit()
     db.refresh(db_player)
     return db_player
 
 @app.get("/players", response_model=List[schemas.Player])
 def get_players(
+    request: Request,
     include_guests: bool = True,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Récupérer tous les joueurs"""
-    query = db.query(models.Player)
+    """Récupérer tous les joueurs (ETag : 304 si la liste n'a pas changé)"""
+    etag = weak_etag("players", tenant_of(db), include_guests, *players_signature(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    players = identity_cache.get(db).sorted_players
     if not include_guests:
-        query = query.filter_by(is_guest=False)
-    return query.order_by(models.Player.name).all()
+        players = [p for p in players if not p["is_guest"]]
+    return with_etag(json_response(players), etag)
+
+def players_signature(db: Session) -> tuple:
+    """Empreinte des joueurs et équipes : version du cache d'identité (voir identity.py)"""
+    return (identity_cache.get(db).version,)
 
 @app.get("/players/{player_id}", response_model=schemas.Player)
-def get_player(player_id: int, db: Session = Depends(get_db)):
+def get_player(player_id: int, db: Session = Depends(get_read_db)):
     """Récupérer un joueur spécifique"""
-    player = db.query(models.Player).filter_by(id=player_id).first()
+    player = identity_cache.get(db).players.get(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Joueur non trouvé")
     return player
 
-@app.post("/matches", response_model=schemas.MatchResponse)
-def create_match(match_data: schemas.MatchCreate, db: Session = Depends(get_db)):
-    """Créer un nouveau match"""
-    
-    # Validation du format et du nombre de joueurs
-    format_players = {
-        "1v1": (1, 1),
-        "2v2": (2, 2),
-        "3v3": (3, 3),
-        "1v2": (1, 2),
-        "2v3": (2, 3)
-    }
-    
-    expected_a, expected_b = format_players.get(match_data.format, (0, 0))
-
-    if len(match_data.players_a) != expected_a or len(match_data.players_b) != expected_b:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Format {match_data.format} requiert {expected_a} joueur(s) côté A et {expected_b} côté B"
-        )
-    
+def insert_match(db: Session, elo_calc: EloCalculator, match_data: schemas.MatchCreate) -> models.Match:
+    """Insère un match et ses participants (sans commit ni mise à jour ELO)"""
     # Date par défaut = maintenant
     played_at = match_data.played_at or datetime.utcnow()
     
@@ -162,17 +202,14 @@ def create_match(match_data: schemas.MatchCreate, db: Session = Depends(get_db))
         balls_remaining=match_data.balls_remaining,
         winner_side=match_data.winner_side,
         foul_black=match_data.foul_black,
-        ranked=match_data.ranked
+        ranked=match_data.ranked,
+        client_uuid=match_data.client_uuid
     )
     
     # Gestion spéciale pour 2v2 : créer/trouver les équipes
-    elo_calc = EloCalculator(db)
-    
     if match_data.format == "2v2":
-        team_a_id = elo_calc.get_or_create_team(match_data.players_a)
-        team_b_id = elo_calc.get_or_create_team(match_data.players_b)
-        db_match.team_id_a = team_a_id
-        db_match.team_id_b = team_b_id
+        db_match.team_id_a = elo_calc.get_or_create_team(match_data.players_a)
+        db_match.team_id_b = elo_calc.get_or_create_team(match_data.players_b)
     
     db.add(db_match)
     db.flush()  # Pour obtenir l'ID
@@ -186,76 +223,163 @@ def create_match(match_data: schemas.MatchCreate, db: Session = Depends(get_db))
         mp = models.MatchPlayer(match_id=db_match.id, player_id=player_id, side="B")
         db.add(mp)
     
-    # Mise à jour ELO si match classé
-    if match_data.ranked:
-        if match_data.format == "1v1":
-            # Déterminer le gagnant
-            winner_id = match_data.players_a[0] if match_data.winner_side == "A" else match_data.players_b[0]
-            elo_calc.update_1v1_ratings(
-                match_data.players_a[0],
-                match_data.players_b[0],
-                winner_id,
-                match_data.balls_remaining
-            )
-        elif match_data.format == "2v2":
-            winner_team_id = team_a_id if match_data.winner_side == "A" else team_b_id
-            elo_calc.update_2v2_ratings(
-                team_a_id,
-                team_b_id,
-                winner_team_id,
-                match_data.balls_remaining
-            )
-        elif match_data.format in ("3v3", "1v2", "2v3"):
-            # Mise à jour des ratings individuels pour les autres formats d'équipe
-            elo_calc.update_team_ratings(
+    return db_match
+
+@app.post("/matches", response_model=schemas.MatchResponse)
+def create_match(match_data: schemas.MatchCreate, db: Session = Depends(get_db)):
+    """Créer un nouveau match"""
+    
+    # Validation du format et du nombre de joueurs
+    validate_match_players(match_data.format, match_data.players_a, match_data.players_b)
+    if match_data.played_at:
+        match_data.played_at = naive_utc(match_data.played_at)
+    
+    # Soumission rejouée (file offline) : renvoyer le match déjà enregistré
+    if match_data.client_uuid:
+        existing = db.query(models.Match).filter_by(client_uuid=match_data.client_uuid).first()
+        if existing:
+            return match_to_response(db, existing)
+    ensure_not_archived(db, match_data.played_at)
+    
+    elo_calc = EloCalculator(db)
+    try:
+        db_match = insert_match(db, elo_calc, match_data)
+
+        # Mise à jour ELO si match classé
+        if match_data.ranked:
+            apply_match_ratings(
+                elo_calc,
+                match_data.format,
                 match_data.players_a,
                 match_data.players_b,
                 match_data.winner_side,
                 match_data.balls_remaining,
-                match_data.format
+                db_match.team_id_a,
+                db_match.team_id_b,
+                db_match.played_at
             )
-    
-    db.commit()
+        db.commit()
+    except IntegrityError:
+        # Course entre deux envois du même client_uuid : l'autre a gagné
+        db.rollback()
+        if match_data.client_uuid:
+            existing = db.query(models.Match).filter_by(client_uuid=match_data.client_uuid).first()
+            if existing:
+                return match_to_response(db, existing)
+        raise HTTPException(status_code=400, detail="Match incohérent avec les données enregistrées")
     db.refresh(db_match)
     
-    # Préparer la réponse
-    players_a = db.query(models.Player).filter(models.Player.id.in_(match_data.players_a)).all()
-    players_b = db.query(models.Player).filter(models.Player.id.in_(match_data.players_b)).all()
-    
-    response = schemas.MatchResponse(
-        id=db_match.id,
-        format=db_match.format,
-        played_at=db_match.played_at,
-        balls_remaining=db_match.balls_remaining,
-        winner_side=db_match.winner_side,
-        foul_black=db_match.foul_black,
-        ranked=db_match.ranked,
-        players_a=players_a,
-        players_b=players_b
+    return match_to_response(db, db_match)
+
+@app.post("/matches/batch", response_model=schemas.MatchBatchResponse)
+def create_matches_batch(batch: schemas.MatchBatchCreate, db: Session = Depends(get_db)):
+    """Enregistrer un lot de matchs offline, idempotent par client_uuid.
+
+    Les matchs déjà appliqués sont ignorés, les autres insérés dans une seule
+    transaction par ordre de `played_at`. Les ELO sont mis à jour une seule fois :
+    incrémentalement si tous les matchs sont postérieurs à l'historique de leur
+    format, sinon par un unique recalcul en tâche de fond (au lieu d'un par match) ;
+    la réponse porte alors `ratings_stale` : les classements n'incluent pas encore
+    le lot tant que la tâche `rebuild_job_id` n'est pas terminée.
+    """
+    for match_data in batch.matches:
+        validate_match_players(match_data.format, match_data.players_a, match_data.players_b)
+        # Dates du service worker possiblement avec fuseau : comparables à la base dès l'entrée
+        if match_data.played_at:
+            match_data.played_at = naive_utc(match_data.played_at)
+
+    # Dédoublonnage : dans le lot, puis contre la base
+    pending = {}
+    for match_data in batch.matches:
+        pending.setdefault(match_data.client_uuid, match_data)
+
+    existing = dict(
+        db.query(models.Match.client_uuid, models.Match.id)
+        .filter(models.Match.client_uuid.in_(list(pending)))
+        .all()
+    )
+    results = [
+        schemas.MatchBatchItem(client_uuid=uuid, match_id=match_id, status="duplicate")
+        for uuid, match_id in existing.items()
+    ]
+
+    now = datetime.utcnow()
+    to_insert = sorted(
+        (m for uuid, m in pending.items() if uuid not in existing),
+        key=lambda m: m.played_at or now
+    )
+    if to_insert:
+        ensure_not_archived(db, to_insert[0].played_at)
+
+    # Dernière date jouée par format avant insertion : en deçà, le match est antidaté
+    latest_by_format = dict(
+        db.query(models.Match.format, func.max(models.Match.played_at))
+        .group_by(models.Match.format)
+        .all()
+    )
+    backdated = any(
+        m.ranked and latest_by_format.get(m.format.value) is not None
+        and (m.played_at or now) < latest_by_format[m.format.value]
+        for m in to_insert
+    )
+
+    elo_calc = EloCalculator(db)
+    try:
+        for match_data in to_insert:
+            # Le flush de l'insertion échoue déjà si un envoi concurrent a écrit le même client_uuid
+            db_match = insert_match(db, elo_calc, match_data)
+            if match_data.ranked and not backdated:
+                apply_match_ratings(
+                    elo_calc,
+                    match_data.format,
+                    match_data.players_a,
+                    match_data.players_b,
+                    match_data.winner_side,
+                    match_data.balls_remaining,
+                    db_match.team_id_a,
+                    db_match.team_id_b,
+                    db_match.played_at
+                )
+            results.append(schemas.MatchBatchItem(
+                client_uuid=match_data.client_uuid, match_id=db_match.id, status="created"
+            ))
+        db.commit()
+    except IntegrityError:
+        # Un envoi concurrent du même lot a été appliqué entre-temps : le client réessaiera
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Lot déjà en cours d'application, réessayer")
+
+    rebuild_job = enqueue_rebuild() if to_insert and backdated else None
+
+    return schemas.MatchBatchResponse(
+        created=len(to_insert),
+        duplicates=len(existing),
+        rebuild_job_id=rebuild_job.id if rebuild_job else None,
+        ratings_stale=rebuild_job is not None,
+        results=results
     )
-    
-    if db_match.team_id_a:
-        response.team_a = db.query(models.Team).filter_by(id=db_match.team_id_a).first()
-    if db_match.team_id_b:
-        response.team_b = db.query(models.Team).filter_by(id=db_match.team_id_b).first()
-    
-    return response
 
 @app.get("/players/{player_id}/summary")
-def get_player_summary(player_id: int, db: Session = Depends(get_db)):
-    player = db.query(models.Player).filter_by(id=player_id).first()
+def get_player_summary(player_id: int, db: Session = Depends(get_read_db)):
+    player = identity_cache.get(db).players.get(player_id)
     if not player:
         raise HTTPException(status_code=404, detail="Joueur non trouvé")
 
-    # Récupérer tous les ratings du joueur (tous les formats)
+    # Récupérer tous les ratings du joueur (tous les formats), tels qu'affichés
     all_ratings = db.query(models.Rating).filter_by(player_id=player_id).all()
-    ratings_by_format = {r.format: schemas.RatingResponse.from_orm(r) for r in all_ratings}
+    decay, target, at = rating_display(db)
+    ratings_by_format = {
+        r.format: schemas.RatingResponse.from_orm(r).model_copy(
+            update={"rating": decay.apply(r.rating, r.last_played, at, target)}
+        )
+        for r in all_ratings
+    }
 
     # Calculer le rating global
     total_games = sum((r.games or 0) for r in all_ratings)
     total_wins = sum((r.wins or 0) for r in all_ratings)
     total_losses = sum((r.losses or 0) for r in all_ratings)
-    weighted_rating_sum = sum(r.rating * (r.games or 0) for r in all_ratings)
+    weighted_rating_sum = sum(r.rating * (r.games or 0) for r in ratings_by_format.values())
     global_rating = weighted_rating_sum / total_games if total_games > 0 else 1000.0
     global_win_rate = (total_wins / total_games * 100) if total_games > 0 else 0
 
@@ -268,38 +392,26 @@ def get_player_summary(player_id: int, db: Session = Depends(get_db)):
     )
 
     # Derniers matchs (tous formats)
-    recent_links = (
-        db.query(models.MatchPlayer)
+    recent_rows = (
+        db.query(*MATCH_COLUMNS)
+        .join(models.MatchPlayer, models.MatchPlayer.match_id == models.Match.id)
         .filter(models.MatchPlayer.player_id == player_id)
+        .order_by(models.Match.played_at.desc())
+        .limit(20)
         .all()
     )
-    match_ids = [ml.match_id for ml in recent_links]
-    recent_matches = []
-    if match_ids:
-        matches = (
-            db.query(models.Match)
-            .filter(models.Match.id.in_(match_ids))
-            .order_by(models.Match.played_at.desc())
-            .limit(20)
-            .all()
-        )
-        for m in matches:
-            players_a = [mp.player for mp in m.players if mp.side == "A"]
-            players_b = [mp.player for mp in m.players if mp.side == "B"]
-            recent_matches.append(
-                schemas.MatchResponse(
-                    id=m.id, format=m.format, played_at=m.played_at,
-                    balls_remaining=m.balls_remaining, winner_side=m.winner_side,
-                    foul_black=m.foul_black, ranked=m.ranked,
-                    players_a=players_a, players_b=players_b,
-                    team_a=m.team_a if m.team_id_a else None,
-                    team_b=m.team_b if m.team_id_b else None
-                )
-            )
+    recent_matches = match_dicts(db, recent_rows) if recent_rows else []
+
+    # Rang et percentile par format (index de rang, O(log n))
+    ranks = {
+        fmt: rank_index.position(db, "player", fmt, player_id)
+        for fmt in ratings_by_format
+    }
 
     return {
-        "player": schemas.Player.from_orm(player),
+        "player": player,
         "rating_1v1": ratings_by_format.get("1v1"),
+        "ranks": ranks,
         "ratings": ratings_by_format,  # Tous les ratings par format
         "global_stats": {
             "rating": round(global_rating, 2),
@@ -312,158 +424,251 @@ def get_player_summary(player_id: int, db: Session = Depends(get_db)):
         "recent_matches": recent_matches
     }
 
+def rank_target(format: str) -> Optional[tuple]:
+    """(type d'entité, format stocké) d'un classement, None pour le classement global"""
+    if format == "2v2":
+        return "team", "2v2"
+    if format == "2v2_individual":
+        return "player", "2v2"
+    if format in FORMAT_PLAYERS:
+        return "player", format
+    return None
+
+def leaderboard_around(db: Session, format: str, entity_id: int, k: int) -> List[dict]:
+    """Les k entités au-dessus et au-dessous d'une entité, via l'index de rang"""
+    target = rank_target(format)
+    if target is None:
+        raise HTTPException(status_code=400, detail="Paramètre around non disponible pour ce classement")
+    kind, fmt = target
+
+    window = rank_index.neighbours(db, kind, fmt, entity_id, k)
+    if not window:
+        raise HTTPException(status_code=404, detail="Entité non classée dans ce format")
+
+    ids = [eid for _, eid, _ in window]
+    model, entity, key = (
+        (models.TeamRating, models.Team, models.TeamRating.team_id) if kind == "team"
+        else (models.Rating, models.Player, models.Rating.player_id)
+    )
+    rows = (
+        db.query(key, entity.name, *rating_columns(model, displayed_rating(db, model)))
+        .join(entity, entity.id == key)
+        .filter(model.format == fmt, key.in_(ids))
+    )
+    by_id = {row[0]: row[1:] for row in rows}
+    intervals = load_intervals(db, kind, fmt, by_id)
+
+    return [
+        leaderboard_dict(
+            rank, by_id[eid][0], eid, kind, *by_id[eid][1:], interval_fields(by_id[eid][1], intervals.get(eid))
+        )
+        for rank, eid, _ in window if eid in by_id
+    ]
+
+@app.get("/players/{player_id}/trend")
+def get_player_trend(
+    player_id: int,
+    format: str = "1v1",
+    points: int = Query(60, ge=2, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """Évolution du rating d'un joueur, réduite à `points` points (LTTB)"""
+    if format not in FORMAT_PLAYERS:
+        raise HTTPException(status_code=400, detail="Format inconnu")
+    if not db.query(models.Player.id).filter_by(id=player_id).first():
+        raise HTTPException(status_code=404, detail="Joueur non trouvé")
+
+    rating = db.get(models.Rating, (player_id, format))
+    version = (rating.games, rating.rating, rating.last_played) if rating else None
+
+    key = (tenant_of(db), player_id, format)
+    series = trend_cache.get(key, version)
+    if series is None:
+        series = player_rating_series(db, player_id, format) if rating else []
+        trend_cache.put(key, version, series)
+
+    return {
+        "player_id": player_id,
+        "format": format,
+        "total_points": len(series),
+        "points": [
+            {"played_at": played_at, "rating": round(value, 2), "match_id": match_id}
+            for played_at, value, match_id in lttb(series, points)
+        ]
+    }
+
+@app.get("/players/{player_id}/analytics")
+def get_player_analytics(
+    player_id: int,
+    last: int = Query(10, ge=1, le=100),
+    min_games: int = Query(3, ge=1),
+    db: Session = Depends(get_read_db)
+):
+    """Statistiques détaillées : par format et par camp, billes restantes, fautes sur
+    la noire, meilleurs et pires adversaires, forme sur les `last` derniers matchs"""
+    if not db.query(models.Player.id).filter_by(id=player_id).first():
+        raise HTTPException(status_code=404, detail="Joueur non trouvé")
+    return analytics_cache.get(db, player_id, last, min_games)
+
+def rating_columns(model, rating=None) -> tuple:
+    """Colonnes d'un rating dans l'ordre des arguments de leaderboard_dict
+    (`rating` : expression du rating affiché, voir displayed_rating)"""
+    rating = model.rating if rating is None else rating
+    return (rating, model.games, model.wins, model.losses, model.streak, model.last_played)
+
+def displayed_rating(db: Session, model):
+    """Rating affiché, décroissance d'inactivité comprise, calculé par la requête"""
+    decay, target, at = rating_display(db, "team" if model is models.TeamRating else "player")
+    return decay.column(model, target, at)
+
 @app.get("/leaderboard/{format}")
 def get_leaderboard(
     format: str,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    around: Optional[int] = None,
+    k: int = Query(5, ge=0, le=50),
+    fields: Optional[str] = None,
+    season: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Récupérer le classement pour un format donné"""
+    """Récupérer le classement pour un format donné.
+
+    Avec `around=<id>` (joueur, ou équipe en 2v2), renvoie seulement les k rangs
+    au-dessus et au-dessous de cette entité. `fields=entity_name,rating` restreint
+    les champs renvoyés (voir serialization.py). `season=<id>` (ou `current`) donne
+    le classement d'une saison, figé si elle est close (voir seasons.py).
+    """
+    projection = parse_fields(fields, LEADERBOARD_FIELDS)
+    if season is not None:
+        return json_response(project(season_entries(db, season, format, limit, around), projection))
+    if around is not None:
+        return json_response(project(leaderboard_around(db, format, around, k), projection))
+    return json_response(project(leaderboard_entries(db, format, limit), projection))
+
+def season_entries(db: Session, season: str, format: str, limit: int, around: Optional[int]) -> List[dict]:
+    found = find_season(db, season)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Saison non trouvée")
+    target = rank_target(format)
+    if target is None or around is not None:
+        raise HTTPException(status_code=400, detail="Classement de saison non disponible pour ce format")
+    return season_leaderboard(db, found, *target, limit)
+
+def leaderboard_entries(db: Session, format: str, limit: int = 50) -> List[dict]:
+    """Les `limit` premiers d'un classement (liste vide pour un format inconnu)"""
     leaderboard = []
-    
-    if format == "1v1":
-        # Classement individuel
-        ratings = db.query(models.Rating).filter_by(format="1v1").order_by(models.Rating.rating.desc()).limit(limit).all()
-        
-        for idx, rating in enumerate(ratings, 1):
-            player = rating.player
-            win_rate = (rating.wins / rating.games * 100) if rating.games > 0 else 0
-            
-            leaderboard.append(schemas.LeaderboardEntry(
-                rank=idx,
-                entity_name=player.name,
-                entity_id=player.id,
-                entity_type="player",
-                rating=rating.rating,
-                games=rating.games,
-                wins=rating.wins,
-                losses=rating.losses,
-                win_rate=win_rate,
-                streak=rating.streak,
-                last_played=rating.last_played
-            ))
-    
-    elif format == "2v2":
+
+    if format == "2v2":
         # Classement par équipe
-        ratings = db.query(models.TeamRating).filter_by(format="2v2").order_by(models.TeamRating.rating.desc()).limit(limit).all()
-
-        for idx, rating in enumerate(ratings, 1):
-            team = rating.team
-            win_rate = (rating.wins / rating.games * 100) if rating.games > 0 else 0
-
-            leaderboard.append(schemas.LeaderboardEntry(
-                rank=idx,
-                entity_name=team.name,
-                entity_id=team.id,
-                entity_type="team",
-                rating=rating.rating,
-                games=rating.games,
-                wins=rating.wins,
-                losses=rating.losses,
-                win_rate=win_rate,
-                streak=rating.streak,
-                last_played=rating.last_played
-            ))
+        rating = displayed_rating(db, models.TeamRating)
+        rows = (
+            db.query(models.TeamRating.team_id, *rating_columns(models.TeamRating, rating))
+            .filter(models.TeamRating.format == "2v2")
+            .order_by(rating.desc())
+            .limit(limit)
+            .all()
+        )
+        identities = identity_cache.get(db)
+        names = {r[0]: identities.team_name(r[0]) for r in rows if r[0] in identities.teams}
+        intervals = load_intervals(db, "team", "2v2", names)
+        leaderboard = [
+            leaderboard_dict(
+                idx, names[row[0]], row[0], "team", *row[1:], interval_fields(row[1], intervals.get(row[0]))
+            )
+            for idx, row in enumerate((r for r in rows if r[0] in names), 1)
+        ]
 
-    elif format in ("3v3", "1v2", "2v3", "2v2_individual"):
-        # Classement individuel pour les formats d'équipe
+    elif format in ("1v1", "3v3", "1v2", "2v3", "2v2_individual"):
+        # Classement individuel (y compris pour les formats d'équipe)
         target_format = "2v2" if format == "2v2_individual" else format
-        ratings = db.query(models.Rating).filter_by(format=target_format).order_by(models.Rating.rating.desc()).limit(limit).all()
-
-        for idx, rating in enumerate(ratings, 1):
-            player = rating.player
-            win_rate = (rating.wins / rating.games * 100) if rating.games > 0 else 0
-
-            leaderboard.append(schemas.LeaderboardEntry(
-                rank=idx,
-                entity_name=player.name,
-                entity_id=player.id,
-                entity_type="player",
-                rating=rating.rating,
-                games=rating.games,
-                wins=rating.wins,
-                losses=rating.losses,
-                win_rate=win_rate,
-                streak=rating.streak,
-                last_played=rating.last_played
-            ))
+        rating = displayed_rating(db, models.Rating)
+        rows = (
+            db.query(models.Rating.player_id, *rating_columns(models.Rating, rating))
+            .filter(models.Rating.format == target_format)
+            .order_by(rating.desc())
+            .limit(limit)
+            .all()
+        )
+        identities = identity_cache.get(db)
+        names = {r[0]: identities.player_name(r[0]) for r in rows if r[0] in identities.players}
+        intervals = load_intervals(db, "player", target_format, names)
+        leaderboard = [
+            leaderboard_dict(
+                idx, names[row[0]], row[0], "player", *row[1:], interval_fields(row[1], intervals.get(row[0]))
+            )
+            for idx, row in enumerate((r for r in rows if r[0] in names), 1)
+        ]
 
     elif format == "global":
         # Classement global agrégé : combine tous les formats
-        from sqlalchemy import func
-
-        # Récupérer tous les ratings de tous les joueurs
-        all_ratings = db.query(models.Rating).all()
-
-        # Agréger par joueur
+        decay, target, at = rating_display(db)
         player_stats = {}
-        for rating in all_ratings:
-            player_id = rating.player_id
-            if player_id not in player_stats:
-                player_stats[player_id] = {
-                    'total_games': 0,
-                    'total_wins': 0,
-                    'total_losses': 0,
-                    'weighted_rating_sum': 0.0,
-                    'last_played': None
-                }
-
-            stats = player_stats[player_id]
-            stats['total_games'] += rating.games or 0
-            stats['total_wins'] += rating.wins or 0
-            stats['total_losses'] += rating.losses or 0
+        for player_id, rating, games, wins, losses, last_played in db.query(
+            models.Rating.player_id, models.Rating.rating, models.Rating.games,
+            models.Rating.wins, models.Rating.losses, models.Rating.last_played
+        ):
+            rating = decay.apply(rating, last_played, at, target)
+            stats = player_stats.setdefault(player_id, [0, 0, 0, 0.0, None])
+            stats[0] += games or 0
+            stats[1] += wins or 0
+            stats[2] += losses or 0
             # Rating pondéré par le nombre de parties
-            stats['weighted_rating_sum'] += rating.rating * (rating.games or 0)
-
+            stats[3] += rating * (games or 0)
             # Dernière partie jouée (prend la plus récente)
-            if rating.last_played:
-                if stats['last_played'] is None or rating.last_played > stats['last_played']:
-                    stats['last_played'] = rating.last_played
-
-        # Calculer le rating global et créer les entrées du leaderboard
-        for player_id, stats in player_stats.items():
-            if stats['total_games'] > 0:
-                # Rating global = moyenne pondérée
-                global_rating = stats['weighted_rating_sum'] / stats['total_games']
-                win_rate = (stats['total_wins'] / stats['total_games'] * 100) if stats['total_games'] > 0 else 0
-
-                player = db.query(models.Player).filter_by(id=player_id).first()
-                if player:
-                    leaderboard.append(schemas.LeaderboardEntry(
-                        rank=0,  # Sera mis à jour après le tri
-                        entity_name=player.name,
-                        entity_id=player.id,
-                        entity_type="player",
-                        rating=global_rating,
-                        games=stats['total_games'],
-                        wins=stats['total_wins'],
-                        losses=stats['total_losses'],
-                        win_rate=win_rate,
-                        streak=0,  # Pas de streak pour le classement global
-                        last_played=stats['last_played']
-                    ))
-
-        # Trier par rating décroissant
-        leaderboard.sort(key=lambda x: x.rating, reverse=True)
-
-        # Mettre à jour les rangs et limiter
-        for idx, entry in enumerate(leaderboard[:limit], 1):
-            entry.rank = idx
-
-        leaderboard = leaderboard[:limit]
-    
+            if last_played and (stats[4] is None or last_played > stats[4]):
+                stats[4] = last_played
+
+        names = {pid: p["name"] for pid, p in identity_cache.get(db).players.items()}
+        # Rating global = moyenne pondérée ; pas de streak pour le classement global
+        entries = [
+            (total_rating / games, player_id, games, wins, losses, last_played)
+            for player_id, (games, wins, losses, total_rating, last_played) in player_stats.items()
+            if games > 0 and player_id in names
+        ]
+        entries.sort(key=lambda e: e[0], reverse=True)
+        leaderboard = [
+            leaderboard_dict(idx, names[player_id], player_id, "player", rating, games, wins, losses, 0, last_played)
+            for idx, (rating, player_id, games, wins, losses, last_played) in enumerate(entries[:limit], 1)
+        ]
+
     return leaderboard
 
+@app.get("/seasons", response_model=List[schemas.Season])
+def list_seasons(db: Session = Depends(get_read_db)):
+    """Saisons, de la plus récente à la plus ancienne"""
+    return [season_dict(s) for s in db.query(models.Season).order_by(models.Season.starts_at.desc())]
+
 @app.get("/history")
 def get_match_history(
+    request: Request,
     format: Optional[str] = None,
     player_id: Optional[int] = None,
     team_id: Optional[int] = None,
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    """Récupérer l'historique des matchs avec filtres"""
+    """Récupérer l'historique des matchs avec filtres.
+
+    `fields=id,played_at,players_a.name,players_b.name` restreint les champs renvoyés.
+    ETag : 304 si ni l'historique, ni l'archive, ni les joueurs n'ont changé.
+    """
+    projection = parse_fields(fields, MATCH_FIELDS)
+    etag = weak_etag("history", tenant_of(db), format, player_id, team_id, limit, offset, fields, *history_version(db))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    page = history_page(db, format, player_id, team_id, limit, offset)
+    return with_etag(json_response({"total": page["total"], "matches": project(page["matches"], projection)}), etag)
+
+def history_version(db: Session) -> tuple:
+    """Version d'une page d'historique : matchs en base, archive et joueurs"""
+    return (*history_signature(db), archived_until(db), *players_signature(db))
+
+def history_page(db: Session, format: Optional[str] = None, player_id: Optional[int] = None,
+                 team_id: Optional[int] = None, limit: int = 20, offset: int = 0) -> dict:
+    """Page d'historique, les plus récents d'abord, prolongée dans l'archive froide"""
     query = db.query(models.Match)
     
     if format:
@@ -476,42 +681,137 @@ def get_match_history(
         query = query.filter((models.Match.team_id_a == team_id) | (models.Match.team_id_b == team_id))
     
     total = query.count()
-    matches = query.order_by(models.Match.played_at.desc()).offset(offset).limit(limit).all()
-    
-    results = []
-    for match in matches:
-        # Récupérer les joueurs
-        players_a = [mp.player for mp in match.players if mp.side == "A"]
-        players_b = [mp.player for mp in match.players if mp.side == "B"]
-        
-        result = schemas.MatchResponse(
-            id=match.id,
-            format=match.format,
-            played_at=match.played_at,
-            balls_remaining=match.balls_remaining,
-            winner_side=match.winner_side,
-            foul_black=match.foul_black,
-            ranked=match.ranked,
-            players_a=players_a,
-            players_b=players_b
+    rows = (
+        query.with_entities(*MATCH_COLUMNS)
+        .order_by(models.Match.played_at.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    results = match_dicts(db, rows)
+
+    # Au-delà des matchs en base (tous postérieurs), lecture dans l'archive froide
+    archived_total = archive_reader.count(db, format, player_id, team_id)
+    if archived_total and offset + limit > total:
+        records = archive_reader.page(
+            db, max(0, offset - total), limit - len(results), format, player_id, team_id
         )
-        
-        if match.team_id_a:
-            result.team_a = match.team_a
-        if match.team_id_b:
-            result.team_b = match.team_b
-        
-        results.append(result)
+        results.extend(archived_match_dicts(db, records))
     
+    return {"total": total + archived_total, "matches": results}
+
+MATCH_COLUMNS = (
+    models.Match.id, models.Match.format, models.Match.played_at, models.Match.balls_remaining,
+    models.Match.winner_side, models.Match.foul_black, models.Match.ranked,
+    models.Match.team_id_a, models.Match.team_id_b,
+)
+
+def player_dicts(db: Session, player_ids) -> dict:
+    return identity_cache.get(db).player_dicts(player_ids)
+
+def team_dicts(db: Session, team_ids) -> dict:
+    return identity_cache.get(db).team_dicts(team_ids)
+
+def match_dict(row, players_a: list, players_b: list, teams: dict) -> dict:
+    """Dict aux clés de schemas.MatchResponse à partir d'une ligne MATCH_COLUMNS"""
+    match_id, format, played_at, balls_remaining, winner_side, foul_black, ranked, team_id_a, team_id_b = row
     return {
-        "total": total,
-        "matches": results
+        "id": match_id,
+        "format": format,
+        "played_at": played_at,
+        "balls_remaining": balls_remaining,
+        "winner_side": winner_side,
+        "foul_black": foul_black,
+        "ranked": ranked,
+        "players_a": players_a,
+        "players_b": players_b,
+        "team_a": teams.get(team_id_a),
+        "team_b": teams.get(team_id_b),
     }
 
+def match_dicts(db: Session, rows: list) -> List[dict]:
+    """Matchs d'une page avec participants et équipes, en une requête pour toute la page"""
+    participants = (
+        db.query(models.MatchPlayer.match_id, models.MatchPlayer.side, models.MatchPlayer.player_id)
+        .filter(models.MatchPlayer.match_id.in_([row[0] for row in rows]))
+        .all()
+    )
+    players = player_dicts(db, {pid for _, _, pid in participants})
+    teams = team_dicts(db, {tid for row in rows for tid in row[-2:] if tid})
+    sides = {}
+    for match_id, side, pid in participants:
+        if pid in players:
+            sides.setdefault((match_id, side), []).append(players[pid])
+    return [match_dict(row, sides.get((row[0], "A"), []), sides.get((row[0], "B"), []), teams) for row in rows]
+
+def archived_match_dicts(db: Session, records: List[dict]) -> List[dict]:
+    """Matchs archivés au format de l'historique (joueurs et équipes relus en base)"""
+    players = player_dicts(db, {pid for r in records for pid in r["players_a"] + r["players_b"]})
+    teams = team_dicts(db, {tid for r in records for tid in (r["team_id_a"], r["team_id_b"]) if tid})
+
+    results = []
+    for r in records:
+        if any(pid not in players for pid in r["players_a"] + r["players_b"]):
+            continue  # joueur supprimé depuis l'archivage
+        row = (r["id"], r["format"], r["played_at"], r["balls_remaining"], r["winner_side"],
+               r["foul_black"], r["ranked"], r["team_id_a"], r["team_id_b"])
+        results.append(match_dict(
+            row, [players[pid] for pid in r["players_a"]], [players[pid] for pid in r["players_b"]], teams
+        ))
+    return results
+
+LEADERBOARD_FORMATS = ("global", "1v1", "2v2", "2v2_individual", "3v3", "1v2", "2v3")
+
+@app.get("/bootstrap")
+def get_bootstrap(
+    request: Request,
+    leaderboards: str = "global",
+    history: int = Query(50, ge=0, le=200),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db)
+):
+    """Ouverture de la PWA en un seul aller-retour : joueurs, classement(s) demandés
+    (`leaderboards=global,1v1`), `history` derniers matchs et version des données.
+
+    Chaque partie est un fragment déjà encodé, associé à la version de ses données
+    (http_cache.fragment_cache) : seule une partie modifiée est reconstruite, la
+    réponse est une concaténation. ETag : 304 si aucune partie n'a changé.
+    """
+    formats = list(dict.fromkeys(f for f in leaderboards.split(",") if f))
+    unknown = [f for f in formats if f not in LEADERBOARD_FORMATS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Classement inconnu : {', '.join(unknown)}")
+
+    tenant = tenant_of(db)
+    players_version = players_signature(db)
+    history_key = history_version(db)
+    ratings_key = ratings_signature(db) + players_version
+    etag = weak_etag("bootstrap", tenant, formats, history, limit, history_key, ratings_key)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    players = fragment_cache.get(
+        ("players", tenant), players_version, lambda: identity_cache.get(db).sorted_players
+    )
+    boards = b",".join(
+        orjson.dumps(fmt) + b":" + fragment_cache.get(
+            ("leaderboard", tenant, fmt, limit), ratings_key, lambda fmt=fmt: leaderboard_entries(db, fmt, limit)
+        )
+        for fmt in formats
+    )
+    matches = fragment_cache.get(
+        ("history", tenant, history), history_key, lambda: history_page(db, limit=history)
+    )
+    body = (
+        b'{"version":' + orjson.dumps(etag[3:-1]) + b',"players":' + players
+        + b',"leaderboards":{' + boards + b'},"history":' + matches + b"}"
+    )
+    return with_etag(Response(content=body, media_type="application/json"), etag)
+
 @app.post("/head-to-head")
 def get_head_to_head(
     payload: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     format = payload.get("format")
     players_a = payload.get("players_a", [])
@@ -534,8 +834,12 @@ def get_head_to_head(
         if (match_players_a == set_a and match_players_b == set_b) or \
            (match_players_a == set_b and match_players_b == set_a):
             relevant_matches.append(match)
+
+    # Confrontations archivées : agrégats conservés en base
+    key_a, key_b = side_key(set_a), side_key(set_b)
+    archived = db.get(models.ArchivedHeadToHead, (format, *sorted((key_a, key_b)))) if format else None
     
-    if not relevant_matches:
+    if not relevant_matches and archived is None:
         return schemas.HeadToHeadStats(
             total_games=0,
             side_a_wins=0,
@@ -579,16 +883,132 @@ def get_head_to_head(
         
         total_balls += match.balls_remaining
     
-    avg_balls = total_balls / len(relevant_matches) if relevant_matches else 0
+    total_games = len(relevant_matches)
+    last_match_date = relevant_matches[0].played_at if relevant_matches else None
+    if archived is not None:
+        total_games += archived.games
+        side_a_wins += archived.side_x_wins if key_a == archived.side_x else archived.games - archived.side_x_wins
+        total_balls += archived.balls_total
+        last_match_date = last_match_date or archived.last_played_at
+
+    avg_balls = total_balls / total_games if total_games else 0
     
     return schemas.HeadToHeadStats(
-        total_games=len(relevant_matches),
+        total_games=total_games,
         side_a_wins=side_a_wins,
-        side_b_wins=len(relevant_matches) - side_a_wins,
+        side_b_wins=total_games - side_a_wins,
         last_5_results=last_5,
         avg_balls_remaining=round(avg_balls, 2),
-        last_match_date=relevant_matches[0].played_at if relevant_matches else None
+        last_match_date=last_match_date
+    )
+
+@app.post("/matchmaking", response_model=schemas.MatchmakingResponse)
+def matchmaking(request: schemas.MatchmakingRequest, db: Session = Depends(get_read_db)):
+    """Proposer les compositions les plus équilibrées pour un groupe de joueurs.
+
+    Les forces partent des ratings affichés (décroissance d'inactivité comprise) :
+    ceux du classement, que le prochain match appliquera avant le calcul ELO.
+    """
+    fmt = request.format.value
+    size_a, size_b = FORMAT_PLAYERS[fmt]
+
+    pool = list(dict.fromkeys(request.player_ids))
+    if len(pool) < size_a + size_b:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format {fmt} requiert au moins {size_a + size_b} joueurs"
+        )
+
+    players = identity_cache.get(db).player_dicts(pool)
+    if len(players) != len(pool):
+        raise HTTPException(status_code=404, detail="Joueur non trouvé")
+
+    elo_calc = EloCalculator(db)
+    ratings = dict(
+        db.query(models.Rating.player_id, displayed_rating(db, models.Rating))
+        .filter(models.Rating.format == fmt, models.Rating.player_id.in_(pool))
     )
+    team_ratings = {}
+    if fmt == "2v2":
+        team_ratings = dict(
+            db.query(models.Team.key, displayed_rating(db, models.TeamRating))
+            .join(models.TeamRating, models.TeamRating.team_id == models.Team.id)
+            .filter(models.TeamRating.format == "2v2")
+        )
+
+    def strength(side: tuple) -> float:
+        # Paire 2v2 déjà connue : son rating d'équipe ; sinon moyenne des individuels
+        if fmt == "2v2":
+            key = f"{side[0]}-{side[1]}"
+            if key in team_ratings:
+                return team_ratings[key]
+        return sum(ratings.get(pid, elo_calc.INITIAL_RATING) for pid in side) / len(side)
+
+    splits, evaluated = best_splits(pool, size_a, size_b, strength, request.top_n)
+
+    results = []
+    for _, side_a, side_b in splits:
+        strength_a, strength_b = strength(side_a), strength(side_b)
+        playing = set(side_a) | set(side_b)
+        results.append(schemas.MatchmakingSplit(
+            players_a=[players[pid] for pid in side_a],
+            players_b=[players[pid] for pid in side_b],
+            bench=[players[pid] for pid in pool if pid not in playing],
+            strength_a=round(strength_a, 2),
+            strength_b=round(strength_b, 2),
+            expected_a=round(elo_calc.calculate_expected_score(strength_a, strength_b), 4)
+        ))
+
+    return schemas.MatchmakingResponse(format=fmt, evaluated=evaluated, splits=results)
+
+@app.get("/predictions/{format}/matrix")
+def get_win_matrix(
+    format: str,
+    entities: Optional[str] = None,
+    encoding: str = Query("json", pattern="^(json|u8)$"),
+    db: Session = Depends(get_read_db)
+):
+    """Probabilités de victoire pour toutes les paires d'un format.
+
+    `entities=1,5,8` restreint à une sous-matrice : IDs d'équipes pour `2v2`, IDs de
+    joueurs pour les autres formats (dont `2v2_individual`), tous classés dans ce
+    format (`entity_type` de la réponse). `encoding=u8` renvoie l'encodage binaire
+    quantifié (voir predictions.py) au lieu du JSON.
+    """
+    target = rank_target(format)
+    if target is None:
+        raise HTTPException(status_code=400, detail="Format inconnu")
+    kind, fmt = target
+
+    matrix = win_matrix_cache.get(db, kind, fmt)
+    if entities:
+        try:
+            wanted = [int(entity_id) for entity_id in entities.split(",") if entity_id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Paramètre entities invalide")
+        unknown = [entity_id for entity_id in wanted if entity_id not in matrix.positions]
+        if unknown:
+            label = "Équipe(s)" if kind == "team" else "Joueur(s)"
+            raise HTTPException(
+                status_code=404,
+                detail=f"{label} sans rating {format} : {', '.join(map(str, unknown))}"
+            )
+        matrix = matrix.subset(wanted)
+
+    if encoding == "u8":
+        return Response(content=matrix.to_u8(), media_type="application/octet-stream")
+    return {"format": format, "entity_type": kind, **matrix.to_json()}
+
+@app.get("/teams/synergy")
+def get_team_synergy(
+    min_games: int = Query(5, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Synergie des paires 2v2 : résultats de l'équipe comparés à ce que prédisent les
+    ratings individuels de ses membres (voir synergy.py). Matrice joueur × joueur et
+    meilleures / pires associations parmi les équipes d'au moins `min_games` matchs."""
+    return synergy_cache.get(db, min_games, limit)
 
 @app.post("/admin/login")
 def admin_login(login: schemas.AdminLogin, db: Session = Depends(get_db)):
@@ -612,6 +1032,7 @@ def admin_login(login: schemas.AdminLogin, db: Session = Depends(get_db)):
     # Créer une session
     token = secrets.token_urlsafe(32)
     admin_sessions[token] = {
+        "tenant": tenant_of(db),
         "created": datetime.utcnow(),
         "expires": datetime.utcnow() + timedelta(minutes=30)
     }
@@ -636,6 +1057,7 @@ def update_settings(
             db.add(setting)
 
     db.commit()
+    settings_cache.invalidate(tenant_of(db))
     return {"status": "success"}
 
 @app.delete("/admin/matches/{match_id}")
@@ -651,19 +1073,156 @@ def delete_match(match_id: int, token: str, db: Session = Depends(get_db)):
     db.delete(match)
     db.commit()
 
-    # Recalcul global
-    rebuild_ratings(db)
-    return {"status": "ok", "message": "Match supprimé et ELO recalculés"}
+    # Recalcul global (en tâche de fond)
+    job = enqueue_rebuild()
+    return {"status": "ok", "message": "Match supprimé, recalcul des ELO en cours", "job_id": job.id}
+
+@app.patch("/admin/matches/{match_id}")
+def update_match(
+    match_id: int,
+    changes: schemas.MatchUpdate,
+    token: str,
+    db: Session = Depends(get_db)
+):
+    """Corriger un match (admin) : seuls les ELO que la correction peut affecter sont recalculés."""
+    check_admin(token)
+
+    match = (
+        db.query(models.Match)
+        .options(selectinload(models.Match.players))
+        .filter_by(id=match_id)
+        .first()
+    )
+    if not match:
+        raise HTTPException(status_code=404, detail="Match introuvable")
+
+    old = ReplayMatch.from_orm(match)
+    data = changes.model_dump(exclude_unset=True)
+    fmt = data.get("format") or match.format
+    players_a = data.get("players_a") or old.players_a
+    players_b = data.get("players_b") or old.players_b
+    validate_match_players(fmt, players_a, players_b)
+    if data.get("played_at"):
+        data["played_at"] = naive_utc(data["played_at"])
+    ensure_not_archived(db, data.get("played_at"))
+
+    for field in ("played_at", "balls_remaining", "winner_side", "foul_black", "ranked"):
+        if data.get(field) is not None:
+            setattr(match, field, data[field])
+    match.format = fmt
+    match.updated_at = datetime.utcnow()
+
+    # Remplacement des participants si les équipes changent
+    if set(players_a) != set(old.players_a) or set(players_b) != set(old.players_b):
+        for mp in list(match.players):
+            db.delete(mp)
+        db.flush()
+        for player_id in players_a:
+            db.add(models.MatchPlayer(match_id=match.id, player_id=player_id, side="A"))
+        for player_id in players_b:
+            db.add(models.MatchPlayer(match_id=match.id, player_id=player_id, side="B"))
+
+    elo_calc = EloCalculator(db)
+    if fmt == "2v2":
+        match.team_id_a = elo_calc.get_or_create_team(players_a)
+        match.team_id_b = elo_calc.get_or_create_team(players_b)
+    else:
+        match.team_id_a = None
+        match.team_id_b = None
+
+    db.flush()
+    db.expire(match, ["players"])
+
+    stats = recompute_after_edit(db, old, ReplayMatch.from_orm(match))
+    db.commit()
+    db.refresh(match)
+
+    return {
+        "status": "ok",
+        "message": "Match modifié et ELO recalculés",
+        "match": match_to_response(db, match),
+        **stats
+    }
 
 @app.post("/admin/rebuild-ratings")
-def rebuild_ratings_endpoint(token: str, db: Session = Depends(get_db)):
-    """Reconstruire tous les ratings ELO (admin)"""
+def rebuild_ratings_endpoint(token: str):
+    """Reconstruire tous les ratings ELO (admin) — asynchrone, suivre via /admin/jobs/{id}"""
+    check_admin(token)
+    job = enqueue_rebuild()
+    return {"status": "ok", "message": "Recalcul des ratings planifié", "job_id": job.id}
+
+@app.post("/admin/archive")
+def archive_matches_endpoint(before: datetime, token: str):
+    """Archiver les matchs joués avant une date (admin) — asynchrone, suivre via /admin/jobs/{id}"""
+    check_admin(token)
+
+    def run(job: Job):
+        db = tenants.session_factory(job.tenant)()
+        try:
+            archive_old_matches(db, before, progress=job.set_progress)
+        finally:
+            db.close()
+
+    # Fusion avec une demande en attente seulement pour la même date limite
+    job = job_runner.submit("archive_matches", run, tenant=current_tenant.get(), params=(naive_utc(before),))
+    return {"status": "ok", "message": "Archivage planifié", "job_id": job.id}
+
+@app.post("/admin/seasons", response_model=schemas.Season)
+def create_season_endpoint(season: schemas.SeasonCreate, token: str, db: Session = Depends(get_db)):
+    """Ouvrir une saison (admin) ; les matchs déjà joués dans la période y sont comptés"""
+    check_admin(token)
+    if season.ends_at <= season.starts_at:
+        raise HTTPException(status_code=400, detail="La saison doit finir après son début")
+    current = active_season(db)
+    if current is not None:
+        raise HTTPException(status_code=409, detail=f"Saison « {current.name} » encore ouverte : la clore d'abord")
+    if db.query(models.Season.id).filter_by(name=season.name).first():
+        raise HTTPException(status_code=409, detail="Une saison porte déjà ce nom")
+    return season_dict(create_season(db, season.name, season.starts_at, season.ends_at))
+
+@app.post("/admin/seasons/{season_id}/close")
+def close_season_endpoint(season_id: int, token: str, db: Session = Depends(get_db)):
+    """Clore une saison (admin) : son classement final est figé"""
+    check_admin(token)
+    season = db.get(models.Season, season_id)
+    if not season:
+        raise HTTPException(status_code=404, detail="Saison non trouvée")
+    if season.closed_at is not None:
+        raise HTTPException(status_code=400, detail="Saison déjà close")
+    standings = close_season(db, season)
+    return {"status": "ok", "message": f"Saison « {season.name} » close", "standings": standings}
+
+@app.post("/admin/rating-intervals")
+def rating_intervals_endpoint(
+    token: str,
+    replicates: int = Query(REPLICATES, ge=10, le=1000),
+    force: bool = False
+):
+    """Estimer l'incertitude des ratings par bootstrap (admin) — asynchrone, suivre via
+    /admin/jobs/{id}. Sans effet si l'historique n'a pas changé depuis le dernier calcul."""
+    check_admin(token)
+
+    def run(job: Job):
+        db = tenants.session_factory(job.tenant)()
+        try:
+            compute_intervals(db, replicates, progress=job.set_progress, force=force)
+        finally:
+            db.close()
+
+    job = job_runner.submit("rating_intervals", run, tenant=current_tenant.get(), params=(replicates, force))
+    return {"status": "ok", "message": "Estimation des intervalles planifiée", "job_id": job.id}
+
+@app.get("/admin/jobs/{job_id}", response_model=schemas.JobResponse)
+def get_job(job_id: int, token: str):
+    """Suivre une tâche de fond (admin) : état, matchs rejoués / total, ETA"""
     check_admin(token)
-    rebuild_ratings(db)
-    return {"status": "ok", "message": "Ratings recalculés avec succès"}
+    job = job_runner.get(job_id)
+    if not job or job.tenant != current_tenant.get():
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job.to_dict()
 
 @app.get("/admin/settings")
-def get_settings(token: str, db: Session = Depends(get_db)):
+def get_settings(token: str, db: Session = Depends(get_read_db)):
     """Récupérer les paramètres actuels (admin)"""
     check_admin(token)
 
@@ -671,97 +1230,70 @@ def get_settings(token: str, db: Session = Depends(get_db)):
     return settings
 
 @app.get("/admin/export")
-def export_data(token: str, db: Session = Depends(get_db)):
-    """Exporter toutes les données en JSON (admin)"""
+def export_data(token: str):
+    """Exporter toutes les données en JSON (admin), produit au fil de l'eau"""
     check_admin(token)
+    tenant = current_tenant.get()
 
-    # Exporter tous les joueurs
-    players = db.query(models.Player).all()
-    players_data = [
-        {
-            "id": p.id,
-            "name": p.name,
-            "is_guest": p.is_guest,
-            "created_at": p.created_at.isoformat()
-        }
-        for p in players
-    ]
+    # Session propre au flux : celle d'une dépendance serait fermée avant l'envoi
+    def body():
+        db = tenants.session_factory(tenant, read_only=True)()
+        try:
+            yield from export_chunks(db)
+        finally:
+            db.close()
 
-    # Exporter tous les matchs
-    matches = db.query(models.Match).all()
-    matches_data = []
-    for m in matches:
-        players_a = [mp.player_id for mp in m.players if mp.side == "A"]
-        players_b = [mp.player_id for mp in m.players if mp.side == "B"]
-        matches_data.append({
-            "id": m.id,
-            "format": m.format,
-            "played_at": m.played_at.isoformat(),
-            "balls_remaining": m.balls_remaining,
-            "winner_side": m.winner_side,
-            "foul_black": m.foul_black,
-            "ranked": m.ranked,
-            "players_a": players_a,
-            "players_b": players_b,
-            "team_id_a": m.team_id_a,
-            "team_id_b": m.team_id_b
-        })
-
-    # Exporter tous les ratings
-    ratings = db.query(models.Rating).all()
-    ratings_data = [
-        {
-            "player_id": r.player_id,
-            "format": r.format,
-            "rating": r.rating,
-            "games": r.games,
-            "wins": r.wins,
-            "losses": r.losses,
-            "streak": r.streak,
-            "last_played": r.last_played.isoformat() if r.last_played else None
-        }
-        for r in ratings
-    ]
+    return StreamingResponse(body(), media_type="application/json")
 
-    # Exporter les équipes et team ratings
-    teams = db.query(models.Team).all()
-    teams_data = [
-        {
-            "id": t.id,
-            "key": t.key,
-            "name": t.name,
-            "created_at": t.created_at.isoformat(),
-            "members": [tm.player_id for tm in t.members]
-        }
-        for t in teams
-    ]
+@app.post("/admin/backup")
+def backup_endpoint(token: str):
+    """Sauvegarde à chaud de la base du club (admin) — asynchrone, suivre via /admin/jobs/{id}"""
+    check_admin(token)
 
-    team_ratings = db.query(models.TeamRating).all()
-    team_ratings_data = [
-        {
-            "team_id": tr.team_id,
-            "format": tr.format,
-            "rating": tr.rating,
-            "games": tr.games,
-            "wins": tr.wins,
-            "losses": tr.losses,
-            "streak": tr.streak,
-            "last_played": tr.last_played.isoformat() if tr.last_played else None
-        }
-        for tr in team_ratings
-    ]
+    def run(job: Job):
+        db = tenants.session_factory(job.tenant)()
+        try:
+            path = backup_database(db, progress=job.set_progress)
+            prune_backups(os.path.dirname(path))
+        finally:
+            db.close()
 
-    settings = {s.key: s.value for s in db.query(models.Setting).all()}
+    job = job_runner.submit("backup", run, tenant=current_tenant.get())
+    return {"status": "ok", "message": "Sauvegarde planifiée", "job_id": job.id}
 
-    return {
-        "export_date": datetime.utcnow().isoformat(),
-        "players": players_data,
-        "matches": matches_data,
-        "ratings": ratings_data,
-        "teams": teams_data,
-        "team_ratings": team_ratings_data,
-        "settings": settings
-    }
+@app.post("/admin/import")
+async def import_endpoint(request: Request, token: str, replace: bool = False):
+    """Remplacer les données du club par un export JSON (admin) — asynchrone.
+
+    Le corps de la requête est recopié par morceaux dans un fichier temporaire,
+    puis relu au fil de l'eau par la tâche de fond.
+    """
+    check_admin(token)
+    if not replace:
+        raise HTTPException(status_code=400, detail="Import destructif : confirmer avec replace=true")
+
+    def run(job: Job):
+        db = tenants.session_factory(job.tenant)()
+        try:
+            with open(spool.name, encoding="utf-8") as f:
+                import_data(db, f, progress=job.set_progress)
+        finally:
+            db.close()
+            os.remove(spool.name)
+
+    spool = tempfile.NamedTemporaryFile(prefix="billiard-import-", suffix=".json", delete=False)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.close()
+        # Chaque import est une tâche propre (jamais fusionné) : deux envois sont appliqués dans l'ordre
+        job = job_runner.submit("import", run, tenant=current_tenant.get(), coalesce=False)
+    except BaseException:
+        # Fichier sans tâche pour le supprimer (envoi interrompu)
+        spool.close()
+        os.remove(spool.name)
+        raise
+    return {"status": "ok", "message": "Import planifié", "job_id": job.id}
 
 @app.delete("/admin/players/{player_id}")
 def delete_player(player_id: int, token: str, db: Session = Depends(get_db)):
@@ -772,56 +1304,12 @@ def delete_player(player_id: int, token: str, db: Session = Depends(get_db)):
     if not player:
         raise HTTPException(status_code=404, detail="Joueur introuvable")
 
-    # 1) supprimer tous les matchs où il figure
-    link_rows = db.query(models.MatchPlayer).filter_by(player_id=player_id).all()
-    match_ids = {r.match_id for r in link_rows}
-    if match_ids:
-        db.query(models.Match).filter(models.Match.id.in_(match_ids)).delete(synchronize_session=False)
-
-    # 2) supprimer le joueur (ratings + memberships en cascade)
-    db.delete(player)
+    # Matchs impliqués, ratings, appartenances et équipes orphelines (voir ratings.py)
+    delete_player_data(db, player_id)
 
-    # 3) optionnel: supprimer équipes 2v2 devenues orphelines
-    # (si une équipe n'a plus 2 membres, on la supprime)
-    lone_teams = (
-        db.query(models.Team)
-        .outerjoin(models.TeamMember, models.Team.id == models.TeamMember.team_id)
-        .group_by(models.Team.id)
-        .having(func.count(models.TeamMember.player_id) < 2)
-        .all()
-    )
-    for t in lone_teams:
-        db.delete(t)
-
-    db.commit()
-
-    # 4) rebuild ELO
-    rebuild_ratings(db)
-    return {"status": "ok", "message": "Joueur supprimé et ELO recalculés"}
-
-# Initialisation des paramètres par défaut
-@app.on_event("startup")
-def init_default_settings():
-    db = SessionLocal()
-    
-    defaults = {
-        "k_base": "24",
-        "alpha": "0.5",
-        "beta": "0.5",
-        "delta": "400",
-        "initial_rating": "1000",
-        "team_2v2_seed": "1000",
-        "inflation": "2.0",
-        "win_bonus": "1.0"
-    }
-    
-    for key, value in defaults.items():
-        if not db.query(models.Setting).filter_by(key=key).first():
-            setting = models.Setting(key=key, value=value)
-            db.add(setting)
-    
-    db.commit()
-    db.close()
+    # Rebuild ELO (en tâche de fond)
+    job = enqueue_rebuild()
+    return {"status": "ok", "message": "Joueur supprimé, recalcul des ELO en cours", "job_id": job.id}
 
 if __name__ == "__main__":
     import uvicorn
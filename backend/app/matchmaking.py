@@ -0,0 +1,77 @@
+"""Recherche des compositions d'équipes les plus équilibrées.
+
+Plutôt que d'énumérer toutes les partitions du groupe, on calcule une fois la force
+de chaque côté possible (cache), on trie les côtés B par force, puis pour chaque
+côté A on cherche par dichotomie les côtés B de force voisine en s'éloignant tant
+que l'écart reste meilleur que le N-ième meilleur trouvé (branch & bound). Pour
+des côtés de même taille, {A, B} et {B, A} ne sont évalués qu'une fois.
+"""
+import bisect
+import heapq
+from functools import lru_cache
+from itertools import combinations
+from typing import Callable, List, Sequence, Tuple
+
+Side = Tuple[int, ...]
+
+
+def best_splits(
+    pool: Sequence[int],
+    size_a: int,
+    size_b: int,
+    strength: Callable[[Side], float],
+    top_n: int = 5,
+) -> Tuple[List[Tuple[float, Side, Side]], int]:
+    """Les `top_n` couples (A, B) disjoints de tailles données minimisant |force A - force B|.
+
+    `strength` reçoit un côté trié (tuple d'IDs). Renvoie ([(écart, A, B)], nb évalués),
+    du plus équilibré au moins équilibré.
+    """
+    pool = sorted(pool)
+    cached = lru_cache(maxsize=None)(strength)
+
+    sides_a = list(combinations(pool, size_a))
+    sides_b = sides_a if size_b == size_a else list(combinations(pool, size_b))
+    sides_b = sorted(sides_b, key=cached)
+    strengths_b = [cached(side) for side in sides_b]
+
+    best: List[Tuple[float, int, Side, Side]] = []  # tas max via écart négatif
+    evaluated = 0
+    symmetric = size_a == size_b
+
+    def worst() -> float:
+        return -best[0][0] if len(best) >= top_n else float("inf")
+
+    for side_a in sides_a:
+        s_a = cached(side_a)
+        members = set(side_a)
+        start = bisect.bisect_left(strengths_b, s_a)
+        lo, hi = start - 1, start
+
+        # Parcours vers l'extérieur, en alternant le côté le plus proche
+        while lo >= 0 or hi < len(sides_b):
+            gap_lo = s_a - strengths_b[lo] if lo >= 0 else float("inf")
+            gap_hi = strengths_b[hi] - s_a if hi < len(sides_b) else float("inf")
+            if gap_lo <= gap_hi:
+                gap, j = gap_lo, lo
+                lo -= 1
+            else:
+                gap, j = gap_hi, hi
+                hi += 1
+            if gap > worst():
+                break  # tous les côtés restants sont encore plus éloignés
+
+            side_b = sides_b[j]
+            if symmetric and side_b[0] < side_a[0]:
+                continue  # même partition que (B, A), déjà évaluée
+            if members.intersection(side_b):
+                continue
+            evaluated += 1
+            entry = (-gap, evaluated, side_a, side_b)
+            if len(best) < top_n:
+                heapq.heappush(best, entry)
+            elif gap < worst():
+                heapq.heapreplace(best, entry)
+
+    ranked = sorted(best, key=lambda e: (-e[0], e[1]))
+    return [(-neg_gap, a, b) for neg_gap, _, a, b in ranked], evaluated
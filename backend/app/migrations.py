@@ -0,0 +1,205 @@
+"""Migrations de schéma versionnées.
+
+`create_all` crée les tables manquantes mais ne touche jamais une base existante :
+les colonnes et index ajoutés après coup passent donc par ici. Chaque étape est
+idempotente (rejouable sans effet) et s'exécute dans sa propre transaction courte,
+la version appliquée étant enregistrée dans `schema_migrations`.
+
+Usage : python -m backend.app.migrations [--check]
+"""
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.app.database import Base
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+
+
+def _with_progress(conn: Connection, label: str, sql: str):
+    """Exécute une instruction longue (création d'index) en affichant sa progression"""
+    raw = conn.connection.driver_connection
+    started = time.monotonic()
+    steps = [0]
+
+    def report():
+        steps[0] += 1
+        if steps[0] % 50 == 0:
+            logger.info("%s : %.1fs...", label, time.monotonic() - started)
+        return 0  # 0 = continuer
+
+    raw.set_progress_handler(report, 100_000)
+    try:
+        conn.execute(text(sql))
+    finally:
+        raw.set_progress_handler(None, 0)
+    logger.info("%s : terminé en %.2fs", label, time.monotonic() - started)
+
+
+def _create_index(name: str, table: str, columns: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection):
+        _with_progress(conn, name, f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    return apply
+
+
+def _add_match_client_uuid(conn: Connection):
+    columns = {c["name"] for c in inspect(conn).get_columns("matches")}
+    if "client_uuid" not in columns:
+        conn.execute(text("ALTER TABLE matches ADD COLUMN client_uuid VARCHAR"))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_matches_client_uuid ON matches (client_uuid)"
+    ))
+
+
+def _add_team_rating_synergy(conn: Connection):
+    # Sommes à 0 : remplies par le prochain recalcul complet (POST /admin/rebuild-ratings)
+    columns = {c["name"] for c in inspect(conn).get_columns("team_ratings")}
+    for name, sql_type in (("synergy_games", "INTEGER"), ("synergy_wins", "INTEGER"),
+                           ("synergy_expected", "FLOAT")):
+        if name not in columns:
+            conn.execute(text(f"ALTER TABLE team_ratings ADD COLUMN {name} {sql_type} NOT NULL DEFAULT 0"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "matches.client_uuid", _add_match_client_uuid),
+    Migration(2, "idx_match_players_player_match",
+              _create_index("idx_match_players_player_match", "match_players", "player_id, match_id")),
+    Migration(3, "idx_ratings_format_rating",
+              _create_index("idx_ratings_format_rating", "ratings", "format, rating DESC")),
+    Migration(4, "idx_team_ratings_format_rating",
+              _create_index("idx_team_ratings_format_rating", "team_ratings", "format, rating DESC")),
+    Migration(5, "idx_matches_format_played_at",
+              _create_index("idx_matches_format_played_at", "matches", "format, played_at")),
+    Migration(6, "team_ratings.synergy", _add_team_rating_synergy),
+]
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(engine: Engine) -> int:
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Crée les tables manquantes puis applique les migrations en attente, dans l'ordre"""
+    # Import pour enregistrer tous les modèles dans Base.metadata
+    from backend.app import models  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+
+    applied = []
+    version = current_version(engine)
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        logger.info("v%d %s", migration.version, migration.name)
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :at)"),
+                {"v": migration.version, "n": migration.name, "at": datetime.utcnow()}
+            )
+        applied.append(migration.version)
+    return applied
+
+
+# Requêtes chaudes de main.py / elo.py et index que SQLite doit utiliser pour chacune
+HOT_QUERIES = [
+    ("leaderboard joueurs (main.get_leaderboard)",
+     "SELECT * FROM ratings WHERE format = '1v1' ORDER BY rating DESC LIMIT 50",
+     "idx_ratings_format_rating"),
+    ("leaderboard équipes (main.get_leaderboard)",
+     "SELECT * FROM team_ratings WHERE format = '2v2' ORDER BY rating DESC LIMIT 50",
+     "idx_team_ratings_format_rating"),
+    ("matchs d'un joueur (main.get_player_summary)",
+     "SELECT match_id FROM match_players WHERE player_id = 1",
+     "idx_match_players_player_match"),
+    ("historique filtré par joueur (main.get_match_history)",
+     "SELECT matches.id FROM matches JOIN match_players ON matches.id = match_players.match_id "
+     "WHERE match_players.player_id = 1 ORDER BY matches.played_at DESC LIMIT 20",
+     "idx_match_players_player_match"),
+    ("historique filtré par format (main.get_match_history)",
+     "SELECT * FROM matches WHERE format = '1v1' ORDER BY played_at DESC LIMIT 20",
+     "idx_matches_format_played_at"),
+    ("matchs d'un format (main.get_head_to_head)",
+     "SELECT * FROM matches WHERE format = '1v1'",
+     "idx_matches_format_played_at"),
+    ("dernière date par format (main.create_matches_batch)",
+     "SELECT format, max(played_at) FROM matches GROUP BY format",
+     "idx_matches_format_played_at"),
+    ("rating d'un joueur (elo._ensure_rating)",
+     "SELECT * FROM ratings WHERE player_id = 1 AND format = '1v1'",
+     "sqlite_autoindex_ratings_1"),
+    ("rating d'une équipe (elo._ensure_team_rating)",
+     "SELECT * FROM team_ratings WHERE team_id = 1 AND format = '2v2'",
+     "sqlite_autoindex_team_ratings_1"),
+    ("membres d'une équipe (elo.EloCalculator._get_team_players)",
+     "SELECT player_id FROM team_members WHERE team_id = 1",
+     "team_members"),
+    ("équipe par clé (elo.EloCalculator.get_or_create_team)",
+     "SELECT * FROM teams WHERE key = '1-2'",
+     "ix_teams_key"),
+    ("version du cache d'identité (identity.read_version)",
+     "SELECT version FROM cache_versions WHERE name = 'identity'",
+     "sqlite_autoindex_cache_versions_1"),
+    ("intervalles d'une page de classement (uncertainty.load_intervals)",
+     "SELECT * FROM rating_intervals WHERE entity_type = 'player' AND format = '1v1' AND entity_id IN (1, 2)",
+     "sqlite_autoindex_rating_intervals_1"),
+    ("classement de la saison active (seasons.season_leaderboard)",
+     "SELECT * FROM season_ratings WHERE season_id = 1 AND entity_type = 'player' AND format = '1v1' "
+     "ORDER BY rating DESC LIMIT 50",
+     "idx_season_ratings_board"),
+    ("classement figé d'une saison close (seasons.season_leaderboard)",
+     "SELECT * FROM season_standings WHERE season_id = 1 AND entity_type = 'player' AND format = '1v1' "
+     "ORDER BY rank LIMIT 50",
+     "season_standings"),
+    ("rejeu ordonné (ratings.load_replay_matches)",
+     "SELECT * FROM matches WHERE ranked = 1 ORDER BY played_at, id",
+     "ix_matches_played_at"),
+]
+
+
+def check_query_plans(engine: Engine) -> List[str]:
+    """Vérifie par EXPLAIN QUERY PLAN que chaque requête chaude utilise son index.
+
+    Renvoie la liste des anomalies (vide si tout est indexé comme prévu).
+    """
+    problems = []
+    with engine.connect() as conn:
+        for label, sql, index_name in HOT_QUERIES:
+            plan = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            # Table sans rowid : sa clé primaire est l'index
+            if not any(index_name in step and ("INDEX" in step or "PRIMARY KEY" in step) for step in plan):
+                problems.append(f"{label} : {index_name} non utilisé ({'; '.join(plan)})")
+    return problems
+
+
+if __name__ == "__main__":
+    from backend.app.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="[migrations] %(message)s")
+    applied = run_migrations(engine)
+    logger.info("schéma en version %d (%d appliquée(s))", current_version(engine), len(applied))
+    if "--check" in sys.argv:
+        problems = check_query_plans(engine)
+        for problem in problems:
+            logger.error("PLAN KO %s", problem)
+        logger.info("%d/%d requêtes indexées", len(HOT_QUERIES) - len(problems), len(HOT_QUERIES))
+        sys.exit(1 if problems else 0)
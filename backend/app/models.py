@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, ForeignKey, UniqueConstraint, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.app.database import Base
@@ -55,6 +55,8 @@ class Match(Base):
     winner_side = Column(String, nullable=False)  # 'A' ou 'B'
     foul_black = Column(Boolean, default=False)
     ranked = Column(Boolean, default=True)
+    # UUID généré côté client (file offline) : rend la soumission idempotente
+    client_uuid = Column(String, unique=True, nullable=True, index=True)
     
     # Pour 2v2 uniquement
     team_id_a = Column(Integer, ForeignKey("teams.id", ondelete="SET NULL"), nullable=True)
@@ -70,6 +72,7 @@ class Match(Base):
     
     __table_args__ = (
         Index('idx_matches_teams', 'team_id_a', 'team_id_b'),
+        Index('idx_matches_format_played_at', 'format', 'played_at'),
     )
 
 class MatchPlayer(Base):
@@ -82,6 +85,10 @@ class MatchPlayer(Base):
     # Relations
     match = relationship("Match", back_populates="players")
     player = relationship("Player", back_populates="match_participations")
+    
+    __table_args__ = (
+        Index('idx_match_players_player_match', 'player_id', 'match_id'),
+    )
 
 class Rating(Base):
     __tablename__ = "ratings"
@@ -113,6 +120,11 @@ class TeamRating(Base):
     losses = Column(Integer, default=0, nullable=False, server_default="0")
     streak = Column(Integer, default=0, nullable=False, server_default="0")
     last_played = Column(DateTime, nullable=True)
+    # Synergie (2v2) : sommes courantes du score réel et du score attendu d'après les
+    # ratings individuels des deux membres, sur synergy_games matchs (voir synergy.py)
+    synergy_games = Column(Integer, default=0, nullable=False, server_default="0")
+    synergy_wins = Column(Integer, default=0, nullable=False, server_default="0")
+    synergy_expected = Column(Float, default=0.0, nullable=False, server_default="0")
     
     # Relations
     team = relationship("Team", back_populates="ratings")
@@ -121,6 +133,10 @@ class TeamRating(Base):
         UniqueConstraint('team_id', 'format', name='uq_team_format'),
     )
 
+# Index des classements (tri décroissant par format) — voir aussi migrations.py
+Index('idx_ratings_format_rating', Rating.format, Rating.rating.desc())
+Index('idx_team_ratings_format_rating', TeamRating.format, TeamRating.rating.desc())
+
 class Setting(Base):
     __tablename__ = "settings"
     
@@ -138,4 +154,102 @@ class AuditLog(Base):
     old_value = Column(String, nullable=True)
     new_value = Column(String, nullable=True)
     user_info = Column(String, nullable=True)  # IP ou session info
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ArchiveCheckpoint(Base):
+    """État complet des ratings juste après le dernier match archivé (voir archive.py)"""
+    __tablename__ = "archive_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    archived_until = Column(DateTime, nullable=False)  # played_at du dernier match archivé
+    last_match_id = Column(Integer, nullable=False)
+    match_count = Column(Integer, nullable=False)  # Total des matchs archivés
+    ratings = Column(LargeBinary, nullable=False)  # Instantané binaire (format de snapshot.py)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedHeadToHead(Base):
+    """Agrégats des confrontations archivées, pour un head-to-head exact sans l'archive"""
+    __tablename__ = "archived_head_to_head"
+
+    format = Column(String, primary_key=True)
+    side_x = Column(String, primary_key=True)  # IDs triés "1-4", side_x < side_y
+    side_y = Column(String, primary_key=True)
+    games = Column(Integer, default=0, nullable=False)
+    side_x_wins = Column(Integer, default=0, nullable=False)
+    balls_total = Column(Integer, default=0, nullable=False)
+    last_played_at = Column(DateTime, nullable=True)
+
+class CacheVersion(Base):
+    """Versions des caches en mémoire, incrémentées à chaque modification (voir identity.py)"""
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class RatingInterval(Base):
+    """Incertitude d'un rating estimée par rééchantillonnage (voir uncertainty.py)"""
+    __tablename__ = "rating_intervals"
+
+    # Clé dans l'ordre des lectures : une page de classement = un (type, format)
+    entity_type = Column(String, primary_key=True)  # 'player' ou 'team'
+    format = Column(String, primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    rating_se = Column(Float, nullable=False)  # Écart-type des ratings rejoués
+    rank_low = Column(Integer, nullable=False)  # Plage de rang à 95 %
+    rank_high = Column(Integer, nullable=False)
+    samples = Column(Integer, nullable=False)  # Rejeux où l'entité apparaît
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class Season(Base):
+    """Période de classement ; une seule saison ouverte à la fois (voir seasons.py)"""
+    __tablename__ = "seasons"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    starts_at = Column(DateTime, nullable=False)  # Matchs joués dans [starts_at, ends_at)
+    ends_at = Column(DateTime, nullable=False)
+    closed_at = Column(DateTime, nullable=True)  # NULL = saison active, classement courant
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class SeasonRating(Base):
+    """Ratings courants de la saison active, mis à jour avec ceux de tous les temps"""
+    __tablename__ = "season_ratings"
+
+    season_id = Column(Integer, ForeignKey("seasons.id", ondelete="CASCADE"), primary_key=True)
+    entity_type = Column(String, primary_key=True)  # 'player' ou 'team'
+    format = Column(String, primary_key=True)
+    entity_id = Column(Integer, primary_key=True)
+    rating = Column(Float, nullable=False)
+    games = Column(Integer, default=0, nullable=False)
+    wins = Column(Integer, default=0, nullable=False)
+    losses = Column(Integer, default=0, nullable=False)
+    streak = Column(Integer, default=0, nullable=False)
+    last_played = Column(DateTime, nullable=True)
+
+class SeasonStanding(Base):
+    """Classement final figé d'une saison close : une ligne par rang.
+
+    Table sans rowid, rangée dans l'ordre de sa clé : une page de classement est
+    une lecture contiguë, sans tri.
+    """
+    __tablename__ = "season_standings"
+
+    season_id = Column(Integer, ForeignKey("seasons.id", ondelete="CASCADE"), primary_key=True)
+    entity_type = Column(String, primary_key=True)
+    format = Column(String, primary_key=True)
+    rank = Column(Integer, primary_key=True)
+    entity_id = Column(Integer, nullable=False)
+    rating = Column(Float, nullable=False)
+    games = Column(Integer, nullable=False)
+    wins = Column(Integer, nullable=False)
+    losses = Column(Integer, nullable=False)
+    streak = Column(Integer, nullable=False)
+    last_played = Column(DateTime, nullable=True)
+
+    __table_args__ = {"sqlite_with_rowid": False}
+
+# Classement de la saison active : même tri que idx_ratings_format_rating
+Index(
+    'idx_season_ratings_board',
+    SeasonRating.season_id, SeasonRating.entity_type, SeasonRating.format, SeasonRating.rating.desc()
+)
@@ -0,0 +1,117 @@
+"""Matrice des probabilités de victoire pour toutes les paires d'un format.
+
+La matrice est calculée d'un coup par broadcasting NumPy à partir du vecteur des
+ratings affichés (décroissance d'inactivité comprise, comme au classement ; même
+formule que EloCalculator.calculate_expected_score), puis gardée en cache tant que
+les ratings du format et leur affichage n'ont pas changé.
+
+Encodage binaire compact (`encoding=u8`), petit-boutiste :
+    'BTWP', n (uint32), ids (int32 × n), probabilités (uint8 × n², ligne par ligne,
+    p[i][j] = valeur / 255 = probabilité que i batte j)
+"""
+import struct
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import tenant_of
+from backend.app.elo import rating_display
+
+_MAGIC = b"BTWP"
+
+
+class WinMatrix:
+    def __init__(self, ids: np.ndarray, names: List[str], probabilities: np.ndarray):
+        self.ids = ids
+        self.names = names
+        self.probabilities = probabilities
+        self.positions = {int(entity_id): i for i, entity_id in enumerate(ids)}
+
+    def subset(self, entity_ids: Sequence[int]) -> "WinMatrix":
+        """Sous-matrice restreinte à certaines entités (ordre conservé, inconnues ignorées)"""
+        rows = [self.positions[e] for e in entity_ids if e in self.positions]
+        return WinMatrix(
+            self.ids[rows], [self.names[i] for i in rows], self.probabilities[np.ix_(rows, rows)]
+        )
+
+    def to_json(self, decimals: int = 4) -> dict:
+        return {
+            "ids": self.ids.tolist(),
+            "names": self.names,
+            "matrix": np.round(self.probabilities.astype(np.float64), decimals).tolist(),
+        }
+
+    def to_u8(self) -> bytes:
+        quantized = np.rint(self.probabilities * 255).astype(np.uint8)
+        return (
+            struct.pack("<4sI", _MAGIC, len(self.ids))
+            + self.ids.astype("<i4").tobytes()
+            + quantized.tobytes()
+        )
+
+
+def win_probability_matrix(ratings: np.ndarray) -> np.ndarray:
+    """P[i, j] = 1 / (1 + 10^((r_j - r_i) / 400)), calculé sans boucle Python"""
+    diff = (ratings[np.newaxis, :] - ratings[:, np.newaxis]) / 400.0
+    return (1.0 / (1.0 + np.power(10.0, diff))).astype(np.float32)
+
+
+class WinMatrixCache:
+    """Cache par (club, type d'entité, format), invalidé quand l'empreinte des ratings change.
+
+    L'empreinte (nombre de lignes, somme des ratings, somme des parties) est une
+    agrégation SQL triviale : elle change à chaque match ou recalcul, quel que soit
+    le processus qui l'a écrit.
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str, str], Tuple[tuple, WinMatrix]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _source(kind: str):
+        if kind == "team":
+            return models.TeamRating, models.TeamRating.team_id, models.Team
+        return models.Rating, models.Rating.player_id, models.Player
+
+    def _fingerprint(self, db: Session, kind: str, fmt: str) -> tuple:
+        model, _, _ = self._source(kind)
+        return tuple(
+            db.query(func.count(), func.sum(model.rating), func.sum(model.games))
+            .filter(model.format == fmt)
+            .one()
+        )
+
+    def get(self, db: Session, kind: str, fmt: str) -> WinMatrix:
+        key = (tenant_of(db), kind, fmt)
+        # La décroissance change les ratings affichés sans écriture : sa vue fait partie de l'empreinte
+        decay, target, at = rating_display(db, kind)
+        fingerprint = (*self._fingerprint(db, kind, fmt), decay.key, target, at if decay.enabled else None)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+        model, id_column, entity = self._source(kind)
+        rating = decay.column(model, target, at)
+        rows = (
+            db.query(id_column, entity.name, rating)
+            .join(entity, entity.id == id_column)
+            .filter(model.format == fmt)
+            .order_by(rating.desc(), id_column)
+            .all()
+        )
+        ids = np.array([r[0] for r in rows], dtype=np.int64)
+        ratings = np.array([r[2] for r in rows], dtype=np.float64)
+        matrix = WinMatrix(ids, [r[1] for r in rows], win_probability_matrix(ratings))
+
+        with self._lock:
+            self._entries[key] = (fingerprint, matrix)
+        return matrix
+
+
+win_matrix_cache = WinMatrixCache()
@@ -0,0 +1,254 @@
+"""Index de rang en mémoire (arbre d'ordre statistique) par format.
+
+Chaque classement est un treap dont les nœuds connaissent la taille de leur
+sous-arbre : rang, percentile et voisins d'une entité s'obtiennent en O(log n)
+au lieu de relire tout le classement.
+
+Les méthodes de mise à jour d'EloCalculator notent les ratings modifiés dans
+`session.info` ; ils ne sont reportés ici qu'au commit de la session (un rollback
+les oublie). Un recalcul global invalide simplement l'index, rechargé au besoin.
+Les index de chaque club sont séparés (club tiré de la session).
+
+Entre workers (ou avec la ligne de commande), la cohérence passe par la version
+`ratings` de `cache_versions`, incrémentée par toute transaction qui écrit des
+ratings : l'index d'un club est rechargé dès que la version lue n'est plus la sienne.
+Un commit local n'est reporté en place que s'il fait passer de la version de l'index
+à la suivante ; sinon un autre processus a écrit entre-temps et l'index est rechargé.
+
+Les clés sont les ratings affichés (décroissance d'inactivité comprise, évaluée au
+début du jour) : l'index est rechargé quand le jour ou les paramètres changent.
+"""
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import tenant_of
+from backend.app.elo import RATING_CHANGES_KEY, rating_display
+from backend.app.identity import RATINGS, bump_version, read_version
+
+# Version des ratings écrite par la transaction en cours (posée avant son commit)
+RATINGS_VERSION_KEY = "ratings_version"
+
+
+class _Node:
+    __slots__ = ("key", "prio", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.prio = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node) -> int:
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+
+def _split(node, key):
+    """Sépare en (clés < key, clés >= key)"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key)
+    node.left = right
+    return left, _update(node)
+
+
+def _merge(a, b):
+    if a is None or b is None:
+        return a or b
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        return _update(a)
+    b.left = _merge(a, b.left)
+    return _update(b)
+
+
+class OrderStatisticIndex:
+    """Classement trié par rating décroissant (égalités départagées par id)"""
+
+    def __init__(self):
+        self._root = None
+        self._keys: Dict[int, tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, entity_id: int, rating: float):
+        self.remove(entity_id)
+        key = (-rating, entity_id)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+        self._keys[entity_id] = key
+
+    def remove(self, entity_id: int):
+        key = self._keys.pop(entity_id, None)
+        if key is None:
+            return
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, (key[0], key[1] + 1))
+        self._root = _merge(left, right)
+
+    def rank(self, entity_id: int) -> Optional[int]:
+        """Rang 1-based, None si l'entité n'est pas classée"""
+        key = self._keys.get(entity_id)
+        if key is None:
+            return None
+        node, before = self._root, 0
+        while node is not None:
+            if key < node.key:
+                node = node.left
+            elif key > node.key:
+                before += _size(node.left) + 1
+                node = node.right
+            else:
+                return before + _size(node.left) + 1
+        return None
+
+    def select(self, rank: int) -> Tuple[int, float]:
+        """(entity_id, rating) au rang donné (1-based)"""
+        node, i = self._root, rank - 1
+        while node is not None:
+            left = _size(node.left)
+            if i < left:
+                node = node.left
+            elif i > left:
+                i -= left + 1
+                node = node.right
+            else:
+                return node.key[1], -node.key[0]
+        raise IndexError(rank)
+
+    def neighbours(self, entity_id: int, k: int) -> List[Tuple[int, int, float]]:
+        """(rang, entity_id, rating) des k entités au-dessus et au-dessous"""
+        rank = self.rank(entity_id)
+        if rank is None:
+            return []
+        first, last = max(1, rank - k), min(len(self), rank + k)
+        return [(r, *self.select(r)) for r in range(first, last + 1)]
+
+
+class RankIndex:
+    """Registre des index par (club, type d'entité, format), chargés à la demande"""
+
+    def __init__(self):
+        self._indexes: Dict[Tuple[str, str, str], OrderStatisticIndex] = {}
+        # Affichage (décroissance, cible, date de référence) avec lequel chaque index a été chargé
+        self._views: Dict[Tuple[str, str, str], tuple] = {}
+        # Version des ratings (cache_versions) reflétée par les index de chaque club
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def _load(self, db: Session, kind: str, fmt: str) -> OrderStatisticIndex:
+        tenant = tenant_of(db)
+        version = read_version(db, RATINGS)
+        if self._versions.get(tenant) != version:
+            self.invalidate(tenant)
+            self._versions[tenant] = version
+        key = (tenant, kind, fmt)
+        decay, target, at = rating_display(db, kind)
+        view = (decay.key, target, at if decay.enabled else None)
+        index = self._indexes.get(key)
+        if index is None or self._views[key][0] != view:
+            index = OrderStatisticIndex()
+            model, id_column = (
+                (models.TeamRating, models.TeamRating.team_id) if kind == "team"
+                else (models.Rating, models.Rating.player_id)
+            )
+            rows = db.query(id_column, model.rating, model.last_played).filter(model.format == fmt)
+            for entity_id, rating, last_played in rows:
+                index.update(entity_id, decay.apply(rating, last_played, at, target))
+            self._indexes[key] = index
+            self._views[key] = (view, decay, target, at)
+        return index
+
+    def position(self, db: Session, kind: str, fmt: str, entity_id: int) -> Optional[dict]:
+        """Rang, effectif et percentile (part des classés en dessous) d'une entité"""
+        with self._lock:
+            index = self._load(db, kind, fmt)
+            rank = index.rank(entity_id)
+            if rank is None:
+                return None
+            total = len(index)
+            return {
+                "rank": rank,
+                "total": total,
+                "percentile": round(100 * (total - rank) / total, 1),
+            }
+
+    def neighbours(self, db: Session, kind: str, fmt: str, entity_id: int, k: int):
+        with self._lock:
+            return self._load(db, kind, fmt).neighbours(entity_id, k)
+
+    def apply(self, tenant: str, changes: Dict[Tuple[str, str, int], Optional[tuple]], version: int):
+        """Reporte des ratings modifiés, (rating, last_played) ou None = supprimé,
+        dans les index déjà chargés ; `version` est celle écrite par la transaction"""
+        with self._lock:
+            if self._versions.get(tenant) != version - 1:
+                # Écriture d'un autre processus entre-temps : rechargement à la lecture suivante
+                self.invalidate(tenant)
+                return
+            self._versions[tenant] = version
+            for (kind, fmt, entity_id), change in changes.items():
+                index = self._indexes.get((tenant, kind, fmt))
+                if index is None:
+                    continue
+                if change is None:
+                    index.remove(entity_id)
+                else:
+                    _, decay, target, at = self._views[(tenant, kind, fmt)]
+                    index.update(entity_id, decay.apply(*change, at, target))
+
+    def invalidate(self, tenant: Optional[str] = None):
+        with self._lock:
+            if tenant is None:
+                self._indexes.clear()
+                self._views.clear()
+                self._versions.clear()
+            else:
+                for key in [k for k in self._indexes if k[0] == tenant]:
+                    del self._indexes[key]
+                    del self._views[key]
+                self._versions.pop(tenant, None)
+
+
+rank_index = RankIndex()
+
+
+def ratings_replaced(db: Session):
+    """À appeler dans la transaction qui remplace ou supprime des ratings en masse
+    (recalcul, suppression de joueur) : les index de tous les processus sont rechargés"""
+    bump_version(db, RATINGS)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_ratings_version(session):
+    if session.info.get(RATING_CHANGES_KEY) and RATINGS_VERSION_KEY not in session.info:
+        session.info[RATINGS_VERSION_KEY] = bump_version(session, RATINGS)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_rating_changes(session):
+    changes = session.info.pop(RATING_CHANGES_KEY, None)
+    version = session.info.pop(RATINGS_VERSION_KEY, None)
+    if changes and version is not None:
+        rank_index.apply(tenant_of(session), changes, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rating_changes(session):
+    session.info.pop(RATING_CHANGES_KEY, None)
+    session.info.pop(RATINGS_VERSION_KEY, None)
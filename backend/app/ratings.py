@@ -0,0 +1,582 @@
+"""Calcul des ratings hors des routes HTTP : application d'un match, rejeu complet ou
+partiel de l'historique, import d'un export et archivage.
+
+Partagé par l'API (main.py) et la ligne de commande (cli.py), qui l'importe sans
+démarrer l'application FastAPI. L'ouverture d'une base de club (tenants.on_open)
+crée les tables, applique les migrations et les paramètres par défaut.
+"""
+import logging
+import os
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session, selectinload
+
+from backend.app import models
+from backend.app.archive import (
+    archive_dir, latest_checkpoint, load_checkpoint, match_record, merge_into_partitions, restore_checkpoint, side_key
+)
+from backend.app.backup import import_export
+from backend.app.database import tenant_of, tenants
+from backend.app.elo import (
+    EloCalculator, ReplayEloCalculator, RATING_CHANGES_KEY, RATING_FIELDS, SYNERGY_FIELDS, active_season, in_season,
+    naive_utc, rating_display, settings_cache
+)
+from backend.app.identity import (
+    RATING_INTERVALS, RATINGS, RATINGS_EPOCH, bump_version, identity_cache, read_version, write_version
+)
+from backend.app.migrations import run_migrations
+from backend.app.rank_index import rank_index, ratings_replaced
+from backend.app.snapshot import (
+    decode_snapshot, encode_snapshot, history_prefix, read_snapshot, snapshot_path, write_snapshot
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "k_base": "24",
+    "alpha": "0.5",
+    "beta": "0.5",
+    "delta": "400",
+    "initial_rating": "1000",
+    "team_2v2_seed": "1000",
+    "inflation": "2.0",
+    "win_bonus": "1.0",
+    # Décroissance d'inactivité (demi-vie 0 = désactivée)
+    "decay_grace_days": "60",
+    "decay_half_life_days": "0"
+}
+
+
+def init_default_settings(db: Session):
+    """Ajoute les paramètres absents de la base (jamais d'écrasement)"""
+    for key, value in DEFAULT_SETTINGS.items():
+        if not db.query(models.Setting).filter_by(key=key).first():
+            setting = models.Setting(key=key, value=value)
+            db.add(setting)
+    
+    db.commit()
+    settings_cache.invalidate(tenant_of(db))
+
+
+# Créer les tables, appliquer les migrations et les paramètres par défaut de chaque
+# base de club à son ouverture (API comme ligne de commande)
+@tenants.on_open
+def prepare_tenant(tenant: str, engine, session_factory):
+    run_migrations(engine)
+    db = session_factory()
+    try:
+        init_default_settings(db)
+        # Cache d'identité chargé dès l'ouverture, pas à la première requête
+        identity_cache.get(db)
+    finally:
+        db.close()
+
+
+def apply_match_ratings(
+    elo_calc: EloCalculator,
+    fmt: str,
+    players_a: list,
+    players_b: list,
+    winner_side: str,
+    balls_remaining: int,
+    team_a_id: Optional[int] = None,
+    team_b_id: Optional[int] = None,
+    played_at: Optional[datetime] = None
+):
+    """Applique un match classé aux ratings (création, lot offline ou rejeu), et à ceux
+    de la saison active s'il en fait partie"""
+    if fmt == "1v1" and len(players_a) == 1 and len(players_b) == 1:
+        winner_id = players_a[0] if winner_side == "A" else players_b[0]
+        elo_calc.update_1v1_ratings(
+            players_a[0], players_b[0],
+            winner_id,
+            balls_remaining,
+            played_at
+        )
+    elif fmt == "2v2" and len(players_a) == 2 and len(players_b) == 2:
+        # retrouver/créer les équipes comme lors de la création
+        team_a_id = team_a_id or elo_calc.get_or_create_team(players_a)
+        team_b_id = team_b_id or elo_calc.get_or_create_team(players_b)
+        winner_team_id = team_a_id if winner_side == "A" else team_b_id
+        elo_calc.update_2v2_ratings(
+            team_a_id, team_b_id, winner_team_id, balls_remaining, played_at
+        )
+    elif fmt in ("3v3", "1v2", "2v3"):
+        # Mise à jour des ratings individuels pour les autres formats d'équipe
+        elo_calc.update_team_ratings(
+            players_a,
+            players_b,
+            winner_side,
+            balls_remaining,
+            fmt,
+            played_at
+        )
+
+    season_calc = elo_calc.season_calculator(played_at)
+    if season_calc is not None:
+        apply_match_ratings(
+            season_calc, fmt, players_a, players_b, winner_side, balls_remaining, team_a_id, team_b_id, played_at
+        )
+
+
+class ReplayMatch(NamedTuple):
+    """Vue légère d'un match classé pour les rejeux en mémoire"""
+    id: int
+    played_at: datetime
+    format: str
+    players_a: List[int]
+    players_b: List[int]
+    winner_side: str
+    balls_remaining: int
+    team_id_a: Optional[int]
+    team_id_b: Optional[int]
+    ranked: bool = True
+
+    @classmethod
+    def from_orm(cls, m: models.Match) -> "ReplayMatch":
+        return cls(
+            m.id, m.played_at, m.format,
+            [mp.player_id for mp in m.players if mp.side == "A"],
+            [mp.player_id for mp in m.players if mp.side == "B"],
+            m.winner_side, m.balls_remaining, m.team_id_a, m.team_id_b, bool(m.ranked)
+        )
+
+    @property
+    def order_key(self):
+        return (self.played_at, self.id)
+
+    def entities(self) -> set:
+        """Ratings lus ou écrits par ce match : ('player'|'team', id, format)"""
+        if self.format == "2v2":
+            return {("team", self.team_id_a, "2v2"), ("team", self.team_id_b, "2v2")} | {
+                ("player", pid, "2v2") for pid in self.players_a + self.players_b
+            }
+        return {("player", pid, self.format) for pid in self.players_a + self.players_b}
+
+    def apply(self, elo_calc: EloCalculator):
+        apply_match_ratings(
+            elo_calc, self.format, self.players_a, self.players_b,
+            self.winner_side, self.balls_remaining,
+            self.team_id_a, self.team_id_b, self.played_at
+        )
+
+
+def load_replay_matches(db: Session, after: Optional[tuple] = None, format: Optional[str] = None) -> List[ReplayMatch]:
+    """Historique classé, ordonné comme pour le calcul ELO (played_at puis id).
+
+    `after` = (played_at, id) limite aux matchs strictement postérieurs.
+    """
+    query = (
+        db.query(models.Match)
+        .options(selectinload(models.Match.players))
+        .filter(models.Match.ranked == True)
+    )
+    if format is not None:
+        query = query.filter(models.Match.format == format)
+    if after is not None:
+        query = query.filter(tuple_(models.Match.played_at, models.Match.id) > after)
+    matches = query.order_by(models.Match.played_at.asc(), models.Match.id.asc()).all()
+    return [ReplayMatch.from_orm(m) for m in matches]
+
+
+def start_replay(db: Session, after: Optional[tuple] = None) -> tuple:
+    """Prépare un rejeu, en repartant de l'instantané binaire s'il est encore valable.
+
+    Renvoie (calculateur, instantané utilisé ou None). Avec `after`, l'instantané
+    n'est utilisé que s'il précède ce point de l'historique. À défaut, le rejeu part
+    du point de reprise de l'archive (antérieur à tous les matchs en base), s'il existe.
+    """
+    elo_calc = ReplayEloCalculator(db)
+    snap = read_snapshot(snapshot_path(db))
+    if (
+        snap is not None and snap.last_played_at is not None
+        and (after is None or snap.order_key < after)
+        and snap.is_valid_for(db, elo_calc)
+    ):
+        snap.restore_into(elo_calc)
+        return elo_calc, snap
+    checkpoint = load_checkpoint(db)
+    if checkpoint is not None:
+        restore_checkpoint(db, checkpoint, elo_calc)
+    return elo_calc, checkpoint
+
+
+def save_snapshot(db: Session, elo_calc: ReplayEloCalculator, last: Optional[tuple], prefix: tuple):
+    """Écrit l'instantané d'un rejeu complet ; un échec d'écriture n'est pas bloquant"""
+    last_played_at, last_match_id = last or (None, 0)
+    try:
+        write_snapshot(snapshot_path(db), elo_calc, last_match_id, last_played_at, prefix)
+    except OSError as exc:
+        logger.warning("Instantané des ratings non écrit : %s", exc)
+
+
+def history_signature(db: Session) -> tuple:
+    """Empreinte de l'historique : change à chaque ajout, suppression ou édition de match"""
+    return tuple(db.query(
+        func.count(models.Match.id), func.max(models.Match.id), func.max(models.Match.updated_at)
+    ).one())
+
+
+def ratings_signature(db: Session) -> tuple:
+    """Empreinte des ratings affichés : change à chaque match classé, recalcul ou import,
+    à chaque estimation des intervalles, et chaque jour quand la décroissance
+    d'inactivité est active.
+
+    Les agrégats seuls ne suffisent pas : inverser le vainqueur d'un 1v1 laisse
+    somme, parties et dates inchangées. La version `ratings` (incrémentée à chaque
+    écriture de ratings, voir rank_index.py) distingue ces cas."""
+    signature = ()
+    for model in (models.Rating, models.TeamRating):
+        signature += tuple(db.query(
+            func.count(), func.total(model.rating), func.total(model.games), func.max(model.last_played)
+        ).one())
+    decay, _, at = rating_display(db)
+    return signature + (
+        decay.key, at if decay.enabled else None, read_version(db, RATINGS),
+        read_version(db, RATING_INTERVALS), read_version(db, RATINGS_EPOCH)
+    )
+
+
+def rebuild_ratings(db: Session, progress: Optional[Callable[[int, int], None]] = None):
+    """Recalcule tous les ELO depuis l'historique après une suppression/modification.
+
+    Le rejeu se fait en mémoire (ReplayEloCalculator) : pendant ce temps les lecteurs
+    continuent de voir les anciens classements. Le résultat remplace ensuite les
+    tables en une seule transaction courte (swap_ratings). Si l'instantané binaire
+    est encore valable, seuls les matchs postérieurs sont rejoués.
+    `progress(fait, total)` est appelé régulièrement pendant le rejeu.
+    """
+    for _ in range(3):
+        # 1) Charger l'historique ordonné (lecture seule), après l'instantané s'il est valable
+        signature = history_signature(db)
+        elo_calc, snap = start_replay(db)
+        matches = load_replay_matches(db, after=snap.order_key if snap else None)
+        last = matches[-1].order_key if matches else (snap.order_key if snap else None)
+        prefix = history_prefix(db, *last) if last else (0, -1)
+
+        # 2) Rejouer les matchs classés par date, sans écrire en base
+        total = len(matches)
+
+        for done, m in enumerate(matches, 1):
+            m.apply(elo_calc)
+            if progress and (done % 100 == 0 or done == total):
+                progress(done, total)
+
+        # 3) Remplacement atomique des classements, sauf si l'historique a bougé entre-temps
+        if swap_ratings(db, elo_calc.rating_rows(), elo_calc.team_rating_rows(), signature):
+            save_snapshot(db, elo_calc, last, prefix)
+            refresh_season_ratings(db)
+            db.commit()
+            return
+    raise RuntimeError("Historique modifié pendant chaque tentative de recalcul")
+
+
+def swap_ratings(db: Session, rating_rows: list, team_rating_rows: list, signature: Optional[tuple] = None) -> bool:
+    """Remplace ratings et team_ratings en une transaction (verrou d'écriture bref).
+
+    Si `signature` est fournie et ne correspond plus à l'historique une fois le verrou
+    pris, rien n'est remplacé et la fonction renvoie False.
+    """
+    db.query(models.Rating).delete(synchronize_session=False)
+    if signature is not None and history_signature(db) != signature:
+        db.rollback()
+        return False
+    db.query(models.TeamRating).delete(synchronize_session=False)
+    if rating_rows:
+        db.bulk_insert_mappings(models.Rating, rating_rows)
+    if team_rating_rows:
+        db.bulk_insert_mappings(models.TeamRating, team_rating_rows)
+    ratings_replaced(db)
+    db.commit()
+    db.expire_all()
+    rank_index.invalidate(tenant_of(db))
+    return True
+
+
+def refresh_season_ratings(db: Session) -> int:
+    """Recalcule les ratings de la saison active en rejouant ses seuls matchs (sans commit).
+
+    Une saison ne couvre que quelques mois : le rejeu complet de la fenêtre est
+    plus simple et à peine plus long qu'un recalcul partiel. Renvoie le nombre de lignes.
+    """
+    season = active_season(db)
+    if season is None:
+        return 0
+    elo_calc = ReplayEloCalculator(db)
+    for m in load_replay_matches(db, after=(season.starts_at, 0)):
+        if not in_season(season, m.played_at):
+            break
+        m.apply(elo_calc)
+
+    rows = [
+        dict(season_id=season.id, entity_type="player", entity_id=r["player_id"], format=r["format"],
+             **{f: r[f] for f in RATING_FIELDS})
+        for r in elo_calc.rating_rows()
+    ] + [
+        dict(season_id=season.id, entity_type="team", entity_id=r["team_id"], format=r["format"],
+             **{f: r[f] for f in RATING_FIELDS})
+        for r in elo_calc.team_rating_rows()
+    ]
+    db.query(models.SeasonRating).filter_by(season_id=season.id).delete(synchronize_session=False)
+    if rows:
+        db.bulk_insert_mappings(models.SeasonRating, rows)
+    return len(rows)
+
+
+def replay_closure(history: List[ReplayMatch], match_ids: set = frozenset(), entities: set = frozenset()) -> List[ReplayMatch]:
+    """Sous-historique suffisant pour recalculer exactement des matchs/ratings donnés.
+
+    En remontant le temps, un match est retenu s'il fait partie de `match_ids` ou
+    touche un rating déjà requis ; ses propres ratings deviennent alors requis.
+    """
+    needed = set(entities)
+    selected = []
+    for m in reversed(history):
+        if m.id in match_ids or m.entities() & needed:
+            needed |= m.entities()
+            selected.append(m)
+    selected.reverse()
+    return selected
+
+
+def player_rating_series(db: Session, player_id: int, fmt: str) -> list:
+    """Trajectoire (date, rating après le match, id du match) d'un joueur dans un format"""
+    history = load_replay_matches(db, format=fmt)
+    to_replay = replay_closure(history, entities={("player", player_id, fmt)})
+
+    elo_calc = ReplayEloCalculator(db)
+    checkpoint = load_checkpoint(db)
+    if checkpoint is not None:
+        restore_checkpoint(db, checkpoint, elo_calc)
+    series = []
+    for m in to_replay:
+        m.apply(elo_calc)
+        if player_id in m.players_a or player_id in m.players_b:
+            series.append((m.played_at, elo_calc.ratings[(player_id, fmt)].rating, m.id))
+    return series
+
+
+def recompute_after_edit(db: Session, old: Optional[ReplayMatch], new: Optional[ReplayMatch]) -> dict:
+    """Recalcul partiel après la modification d'un match (sans commit).
+
+    Seuls les ratings atteignables depuis les participants du match modifié via les
+    matchs suivants peuvent changer (fermeture en avant). Pour les recalculer, on
+    rejoue en mémoire les seuls matchs dont ils dépendent (fermeture en arrière),
+    puis on n'écrit que ces lignes : les autres Rating/TeamRating restent intactes.
+    """
+    seeds = [m for m in (old, new) if m is not None and m.ranked]
+    if not seeds:
+        return {"replayed_matches": 0, "updated_ratings": 0}
+
+    # Si l'instantané précède la modification, le rejeu part de lui
+    start = min(m.order_key for m in seeds)
+    elo_calc, snap = start_replay(db, after=start)
+    history = load_replay_matches(db, after=snap.order_key if snap else None)
+
+    # 1) Fermeture en avant : ratings affectés par la modification
+    affected = set().union(*(m.entities() for m in seeds))
+    affected_ids = set()
+    for m in history:
+        if m.order_key < start:
+            continue
+        if (new is not None and m.id == new.id) or m.entities() & affected:
+            affected |= m.entities()
+            affected_ids.add(m.id)
+
+    # 2) Fermeture en arrière : matchs nécessaires pour reconstruire ces ratings, y compris
+    #    ceux des joueurs/équipes retirés du match, dont l'historique peut être entièrement antérieur
+    to_replay = replay_closure(history, affected_ids, affected)
+
+    for m in to_replay:
+        m.apply(elo_calc)
+
+    # 3) Écriture des seuls ratings affectés (reportés dans rank_index au commit)
+    changes = db.info.setdefault(RATING_CHANGES_KEY, {})
+    for kind, entity_id, fmt in affected:
+        if kind == "team":
+            model, computed = models.TeamRating, elo_calc.team_ratings.get((entity_id, fmt))
+        else:
+            model, computed = models.Rating, elo_calc.ratings.get((entity_id, fmt))
+        changes[(kind, fmt, entity_id)] = (computed.rating, computed.last_played) if computed is not None else None
+        row = db.get(model, (entity_id, fmt))
+        if computed is None:
+            # Plus aucun match classé pour ce rating
+            if row is not None:
+                db.delete(row)
+            continue
+        if row is None:
+            row = model(**{"team_id" if kind == "team" else "player_id": entity_id, "format": fmt})
+            db.add(row)
+        for field in RATING_FIELDS + (SYNERGY_FIELDS if kind == "team" else ()):
+            setattr(row, field, getattr(computed, field))
+
+    season = active_season(db)
+    if season is not None and any(in_season(season, m.played_at) for m in seeds):
+        refresh_season_ratings(db)
+
+    return {"replayed_matches": len(to_replay), "updated_ratings": len(affected)}
+
+
+def discard_intervals(db: Session):
+    """Efface les intervalles de confiance (sans commit) quand des ids d'entités peuvent
+    changer de sens ; un calcul en cours ne sera pas servi (voir uncertainty.py)"""
+    db.query(models.RatingInterval).delete(synchronize_session=False)
+    write_version(db, RATING_INTERVALS, 0)
+    bump_version(db, RATINGS_EPOCH)
+
+
+def _delete_season_rows(db: Session, kind: str, entity_ids: List[int]):
+    # Les classements figés gardent les rangs des autres : celui de l'entité supprimée reste vacant
+    for model in (models.SeasonRating, models.SeasonStanding):
+        db.query(model).filter(model.entity_type == kind, model.entity_id.in_(entity_ids)).delete(
+            synchronize_session=False
+        )
+
+
+def delete_player_data(db: Session, player_id: int) -> int:
+    """Supprime un joueur, ses matchs, ses ratings (de saison compris) et les équipes devenues orphelines (avec commit).
+
+    Les clés étrangères de SQLite ne sont pas activées : les lignes dépendantes sont
+    supprimées explicitement, en masse. Les ratings restants sont à recalculer ensuite.
+    Renvoie le nombre de matchs supprimés.
+    """
+    match_ids = [mid for (mid,) in db.query(models.MatchPlayer.match_id).filter_by(player_id=player_id)]
+    for i in range(0, len(match_ids), 500):
+        chunk = match_ids[i:i + 500]
+        db.query(models.MatchPlayer).filter(models.MatchPlayer.match_id.in_(chunk)).delete(synchronize_session=False)
+        db.query(models.Match).filter(models.Match.id.in_(chunk)).delete(synchronize_session=False)
+
+    db.query(models.Rating).filter_by(player_id=player_id).delete(synchronize_session=False)
+    _delete_season_rows(db, "player", [player_id])
+    db.query(models.TeamMember).filter_by(player_id=player_id).delete(synchronize_session=False)
+    db.query(models.Player).filter_by(id=player_id).delete(synchronize_session=False)
+
+    # Équipes 2v2 qui n'ont plus leurs deux membres
+    lone_teams = [
+        team_id for (team_id,) in (
+            db.query(models.Team.id)
+            .outerjoin(models.TeamMember, models.Team.id == models.TeamMember.team_id)
+            .group_by(models.Team.id)
+            .having(func.count(models.TeamMember.player_id) < 2)
+        )
+    ]
+    if lone_teams:
+        db.query(models.TeamRating).filter(models.TeamRating.team_id.in_(lone_teams)).delete(synchronize_session=False)
+        _delete_season_rows(db, "team", lone_teams)
+        db.query(models.TeamMember).filter(models.TeamMember.team_id.in_(lone_teams)).delete(synchronize_session=False)
+        db.query(models.Team).filter(models.Team.id.in_(lone_teams)).delete(synchronize_session=False)
+    identity_cache.bump(db)
+    ratings_replaced(db)
+    discard_intervals(db)
+
+    db.commit()
+    db.expire_all()
+    rank_index.invalidate(tenant_of(db))
+    return len(match_ids)
+
+
+def import_data(db: Session, f, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Import d'un export JSON (remplace les données), puis un seul recalcul des ratings"""
+    try:
+        counts = import_export(db, f, progress=progress)
+        db.flush()
+        identity_cache.bump(db)
+        discard_intervals(db)
+    except Exception:
+        db.rollback()
+        raise
+    # L'instantané de rejeu décrit l'ancien historique
+    path = snapshot_path(db)
+    if os.path.exists(path):
+        os.remove(path)
+    settings_cache.invalidate(tenant_of(db))
+    rebuild_ratings(db, progress=progress)
+    return counts
+
+
+def archive_old_matches(db: Session, before: datetime, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Déplace les matchs joués avant `before` vers l'archive froide (voir archive.py).
+
+    Les matchs archivés forment un préfixe de l'historique : le nouveau point de
+    reprise s'obtient en les rejouant depuis le précédent, et les ratings courants
+    restent inchangés. Les partitions sont écrites avant la transaction qui supprime
+    les matchs et enregistre le point de reprise ; un archivage interrompu peut
+    simplement être relancé. Les matchs de la saison active restent en base : ses
+    ratings se recalculent en rejouant ses matchs.
+    """
+    season = active_season(db)
+    if season is not None:
+        before = min(naive_utc(before), season.starts_at)
+    for _ in range(3):
+        matches = (
+            db.query(models.Match)
+            .options(selectinload(models.Match.players))
+            .filter(models.Match.played_at < before)
+            .order_by(models.Match.played_at.asc(), models.Match.id.asc())
+            .all()
+        )
+        if not matches:
+            return {"archived": 0, "partitions": []}
+        last_played_at, last_id = matches[-1].played_at, matches[-1].id
+
+        # 1) Point de reprise : rejeu des matchs classés depuis le point précédent
+        previous = latest_checkpoint(db)
+        elo_calc = ReplayEloCalculator(db)
+        if previous is not None:
+            restore_checkpoint(db, decode_snapshot(previous.ratings, min_version=1), elo_calc)
+        total = len(matches)
+        for done, m in enumerate(matches, 1):
+            if m.ranked:
+                ReplayMatch.from_orm(m).apply(elo_calc)
+            if progress and (done % 100 == 0 or done == total):
+                progress(done, total)
+
+        # 2) Partitions mensuelles compressées
+        partitions = merge_into_partitions(archive_dir(db), [match_record(m) for m in matches])
+
+        # 3) Agrégats head-to-head des matchs archivés
+        aggregates = {}
+        for m in matches:
+            key_a = side_key(mp.player_id for mp in m.players if mp.side == "A")
+            key_b = side_key(mp.player_id for mp in m.players if mp.side == "B")
+            side_x, side_y = sorted((key_a, key_b))
+            key = (m.format, side_x, side_y)
+            row = aggregates.get(key) or db.get(models.ArchivedHeadToHead, key)
+            if row is None:
+                row = models.ArchivedHeadToHead(
+                    format=m.format, side_x=side_x, side_y=side_y, games=0, side_x_wins=0, balls_total=0
+                )
+                db.add(row)
+            aggregates[key] = row
+            row.games += 1
+            row.side_x_wins += int((key_a if m.winner_side == "A" else key_b) == side_x)
+            row.balls_total += m.balls_remaining
+            row.last_played_at = max(filter(None, (row.last_played_at, m.played_at)))
+
+        # 4) Suppression et point de reprise dans une seule transaction, sauf si un
+        #    match antidaté a été ajouté dans la période entre-temps
+        ids = [m.id for m in matches]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            db.query(models.MatchPlayer).filter(models.MatchPlayer.match_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(models.Match).filter(models.Match.id.in_(chunk)).delete(synchronize_session=False)
+        remaining = (
+            db.query(func.count(models.Match.id))
+            .filter(tuple_(models.Match.played_at, models.Match.id) <= (last_played_at, last_id))
+            .scalar()
+        )
+        if remaining:
+            db.rollback()
+            continue
+        db.add(models.ArchiveCheckpoint(
+            archived_until=last_played_at,
+            last_match_id=last_id,
+            match_count=(previous.match_count if previous else 0) + len(matches),
+            ratings=encode_snapshot(elo_calc, last_id, last_played_at, (0, -1)),
+        ))
+        db.commit()
+        db.expunge_all()
+        return {"archived": len(matches), "partitions": partitions, "archived_until": last_played_at}
+    raise RuntimeError("Historique modifié pendant chaque tentative d'archivage")
@@ -58,6 +58,7 @@ class MatchCreate(BaseModel):
     foul_black: bool = False
     ranked: bool = True
     played_at: Optional[datetime] = None
+    client_uuid: Optional[str] = Field(default=None, max_length=64)
     
     @validator('players_a', 'players_b')
     def validate_players(cls, v, values):
@@ -65,6 +66,45 @@ class MatchCreate(BaseModel):
             raise ValueError("Au moins un joueur requis par équipe")
         return v
 
+class MatchUpdate(BaseModel):
+    """Correction d'un match existant (admin) : seuls les champs fournis changent"""
+    format: Optional[MatchFormat] = None
+    players_a: Optional[List[int]] = None
+    players_b: Optional[List[int]] = None
+    winner_side: Optional[Literal["A", "B"]] = None
+    balls_remaining: Optional[int] = Field(default=None, ge=0, le=7)
+    foul_black: Optional[bool] = None
+    ranked: Optional[bool] = None
+    played_at: Optional[datetime] = None
+
+    @validator('players_a', 'players_b')
+    def validate_players(cls, v):
+        if v is not None and not v:
+            raise ValueError("Au moins un joueur requis par équipe")
+        return v
+
+class MatchBatchCreate(BaseModel):
+    """Lot de matchs rejoués depuis la file offline (idempotent par client_uuid)"""
+    matches: List[MatchCreate]
+
+    @validator('matches')
+    def validate_uuids(cls, v):
+        if any(not m.client_uuid for m in v):
+            raise ValueError("client_uuid requis pour chaque match du lot")
+        return v
+
+class MatchBatchItem(BaseModel):
+    client_uuid: str
+    match_id: int
+    status: Literal["created", "duplicate"]
+
+class MatchBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    rebuild_job_id: Optional[int] = None  # Recalcul planifié si un match est antidaté
+    ratings_stale: bool = False  # Classements sans ce lot jusqu'à la fin du recalcul
+    results: List[MatchBatchItem]
+
 class MatchResponse(BaseModel):
     id: int
     format: str
@@ -81,6 +121,24 @@ class MatchResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MatchmakingRequest(BaseModel):
+    format: MatchFormat
+    player_ids: List[int] = Field(min_length=2, max_length=16)
+    top_n: int = Field(default=5, ge=1, le=50)
+
+class MatchmakingSplit(BaseModel):
+    players_a: List[Player]
+    players_b: List[Player]
+    bench: List[Player]  # Joueurs du groupe qui ne jouent pas cette partie
+    strength_a: float
+    strength_b: float
+    expected_a: float  # Probabilité de victoire du côté A
+
+class MatchmakingResponse(BaseModel):
+    format: str
+    evaluated: int  # Compositions réellement évaluées après élagage
+    splits: List[MatchmakingSplit]
+
 class RatingResponse(BaseModel):
     player_id: Optional[int] = None
     team_id: Optional[int] = None
@@ -107,6 +165,24 @@ class LeaderboardEntry(BaseModel):
     win_rate: float
     streak: int
     last_played: Optional[datetime] = None
+    # Intervalle à 95 % et plage de rang plausible (bootstrap, voir uncertainty.py)
+    rating_low: Optional[float] = None
+    rating_high: Optional[float] = None
+    rank_low: Optional[int] = None
+    rank_high: Optional[int] = None
+
+class SeasonCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=64)
+    starts_at: datetime
+    ends_at: datetime
+
+class Season(BaseModel):
+    id: int
+    name: str
+    starts_at: datetime
+    ends_at: datetime
+    closed_at: Optional[datetime] = None
+    active: bool
 
 class HeadToHeadStats(BaseModel):
     total_games: int
@@ -127,4 +203,19 @@ class AdminSettings(BaseModel):
     initial_rating: Optional[float] = None
     team_2v2_seed: Optional[float] = None
     win_bonus: Optional[float] = None
-    inflation: Optional[float] = None
\ No newline at end of file
+    inflation: Optional[float] = None
+    decay_grace_days: Optional[float] = Field(None, ge=0)
+    decay_half_life_days: Optional[float] = Field(None, ge=0)
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: Literal["pending", "running", "done", "failed"]
+    requests: int  # Demandes fusionnées dans cette tâche
+    done: int  # Matchs rejoués
+    total: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
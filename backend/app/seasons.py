@@ -0,0 +1,114 @@
+"""Saisons : classements sur une période, figés à la clôture.
+
+Une saison couvre les matchs joués dans [starts_at, ends_at). Tant qu'elle est
+ouverte, ses ratings (season_ratings) sont tenus à jour à chaque match classé, avec
+les mêmes formules que les ratings de tous les temps mais en repartant du rating
+initial (EloCalculator.season_calculator) ; toute correction de l'historique rejoue
+les seuls matchs de la saison (ratings.refresh_season_ratings).
+
+La clôture range le classement final dans season_standings, une ligne par rang, et
+supprime les ratings courants : le classement d'une saison, close ou non, est une
+lecture indexée sans rejeu. Une seule saison est ouverte à la fois.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.elo import RATING_FIELDS, active_season, naive_utc
+from backend.app.identity import identity_cache
+from backend.app.ratings import refresh_season_ratings
+from backend.app.serialization import leaderboard_dict
+
+
+def season_dict(season: models.Season) -> dict:
+    return {
+        "id": season.id,
+        "name": season.name,
+        "starts_at": season.starts_at,
+        "ends_at": season.ends_at,
+        "closed_at": season.closed_at,
+        "active": season.closed_at is None,
+    }
+
+
+def find_season(db: Session, season: str) -> Optional[models.Season]:
+    """Saison désignée par son id ou par "current" (saison active)"""
+    if season == "current":
+        return active_season(db)
+    try:
+        return db.get(models.Season, int(season))
+    except ValueError:
+        return None
+
+
+def create_season(db: Session, name: str, starts_at: datetime, ends_at: datetime) -> models.Season:
+    """Ouvre une saison (avec commit) ; les matchs déjà joués dans la période sont rejoués"""
+    season = models.Season(name=name, starts_at=naive_utc(starts_at), ends_at=naive_utc(ends_at))
+    db.add(season)
+    db.flush()
+    refresh_season_ratings(db)
+    db.commit()
+    return season
+
+
+def close_season(db: Session, season: models.Season) -> int:
+    """Fige le classement final de la saison (avec commit) ; renvoie le nombre de lignes"""
+    ratings = (
+        db.query(models.SeasonRating)
+        .filter_by(season_id=season.id)
+        .order_by(
+            models.SeasonRating.entity_type, models.SeasonRating.format,
+            models.SeasonRating.rating.desc(), models.SeasonRating.entity_id
+        )
+        .all()
+    )
+    rows, ranks = [], {}
+    for r in ratings:
+        board = (r.entity_type, r.format)
+        ranks[board] = ranks.get(board, 0) + 1
+        rows.append(dict(
+            season_id=season.id, entity_type=r.entity_type, format=r.format, rank=ranks[board],
+            entity_id=r.entity_id, **{c: getattr(r, c) for c in RATING_FIELDS}
+        ))
+
+    db.query(models.SeasonStanding).filter_by(season_id=season.id).delete(synchronize_session=False)
+    if rows:
+        db.bulk_insert_mappings(models.SeasonStanding, rows)
+    db.query(models.SeasonRating).filter_by(season_id=season.id).delete(synchronize_session=False)
+    season.closed_at = datetime.utcnow()
+    db.commit()
+    return len(rows)
+
+
+def season_leaderboard(db: Session, season: models.Season, kind: str, fmt: str, limit: int = 50) -> List[dict]:
+    """Les `limit` premiers d'un classement de saison, figé ou courant"""
+    identities = identity_cache.get(db)
+    name = identities.team_name if kind == "team" else identities.player_name
+
+    if season.closed_at is not None:
+        # Saison close : rangs figés, lus dans l'ordre de la clé
+        model = models.SeasonStanding
+        rows = (
+            db.query(model.rank, model.entity_id, *(getattr(model, c) for c in RATING_FIELDS))
+            .filter_by(season_id=season.id, entity_type=kind, format=fmt)
+            .order_by(model.rank)
+            .limit(limit)
+        )
+        return [
+            leaderboard_dict(row[0], name(row[1]), row[1], kind, *row[2:])
+            for row in rows if name(row[1]) is not None
+        ]
+
+    model = models.SeasonRating
+    rows = (
+        db.query(model.entity_id, *(getattr(model, c) for c in RATING_FIELDS))
+        .filter_by(season_id=season.id, entity_type=kind, format=fmt)
+        .order_by(model.rating.desc())
+        .limit(limit)
+    )
+    return [
+        leaderboard_dict(idx, name(row[0]), row[0], kind, *row[1:])
+        for idx, row in enumerate((r for r in rows if name(r[0]) is not None), 1)
+    ]
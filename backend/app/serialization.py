@@ -0,0 +1,90 @@
+"""Sérialisation directe des grandes listes (historique, classement).
+
+Les lignes sont lues en tuples et converties en dicts aux mêmes clés, dans le même
+ordre, que les schémas Pydantic (MatchResponse, LeaderboardEntry), puis encodées par
+orjson : ni modèle Pydantic par ligne, ni seconde validation par FastAPI.
+
+`fields=` restreint les clés renvoyées : `fields=entity_name,rating` pour l'écran du
+bar, `fields=id,played_at,players_a.name,players_b.name` pour un historique compact
+(un point sélectionne les clés des joueurs ou équipes imbriqués).
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+from backend.app import schemas
+
+LEADERBOARD_FIELDS = tuple(schemas.LeaderboardEntry.model_fields)
+MATCH_FIELDS = tuple(schemas.MatchResponse.model_fields)
+PLAYER_FIELDS = tuple(schemas.Player.model_fields)
+TEAM_FIELDS = tuple(schemas.TeamSimple.model_fields)
+NESTED_FIELDS = {
+    "players_a": PLAYER_FIELDS, "players_b": PLAYER_FIELDS,
+    "team_a": TEAM_FIELDS, "team_b": TEAM_FIELDS,
+}
+
+# {clé: None (valeur entière) ou tuple de sous-clés}
+Projection = Dict[str, Optional[Tuple[str, ...]]]
+
+
+def leaderboard_dict(rank: int, name: str, entity_id: int, entity_type: str, rating: float, games: int,
+                     wins: int, losses: int, streak: int, last_played,
+                     uncertainty: tuple = (None, None, None, None)) -> dict:
+    rating_low, rating_high, rank_low, rank_high = uncertainty
+    return {
+        "rank": rank,
+        "entity_name": name,
+        "entity_id": entity_id,
+        "entity_type": entity_type,
+        "rating": rating,
+        "games": games,
+        "wins": wins,
+        "losses": losses,
+        "win_rate": (wins / games * 100) if games > 0 else 0.0,
+        "streak": streak,
+        "last_played": last_played,
+        "rating_low": rating_low,
+        "rating_high": rating_high,
+        "rank_low": rank_low,
+        "rank_high": rank_high,
+    }
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[Projection]:
+    """Projection demandée par `fields=a,b,c.d` ; None = tous les champs (400 si inconnu)"""
+    if not fields:
+        return None
+    allowed = tuple(allowed)
+    projection: Projection = {}
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        key, _, sub = name.partition(".")
+        if key not in allowed or (sub and sub not in NESTED_FIELDS.get(key, ())):
+            raise HTTPException(status_code=400, detail=f"Champ inconnu : {name}")
+        if sub:
+            if projection.get(key, ()) is not None:
+                projection[key] = projection.get(key, ()) + (sub,)
+        else:
+            projection[key] = None
+    return projection or None
+
+
+def _project_one(value, sub: Optional[Tuple[str, ...]]):
+    if sub is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [{k: v[k] for k in sub} for v in value]
+    return {k: value[k] for k in sub}
+
+
+def project(items: Iterable[dict], projection: Optional[Projection]) -> list:
+    if projection is None:
+        return list(items)
+    return [{key: _project_one(item[key], sub) for key, sub in projection.items()} for item in items]
+
+
+def json_response(content) -> ORJSONResponse:
+    """Réponse encodée par orjson (datetimes en ISO 8601, comme Pydantic)"""
+    return ORJSONResponse(content)
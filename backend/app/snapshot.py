@@ -0,0 +1,246 @@
+"""Instantanés binaires de l'état complet des ratings.
+
+Format (petit-boutiste, version 2) :
+
+    en-tête   : magic 'BTRS', version, nb de sections, id et date du dernier match
+                appliqué, empreinte de l'historique (nb de matchs classés et dernier
+                updated_at jusqu'à ce match), empreinte des paramètres ELO, CRC32
+    sections  : une par (type d'entité, format), en colonnes alignées sur 8 octets :
+                ids (q), rating (d), games/wins/losses/streak (i), last_played (q, µs),
+                puis pour les équipes synergy_games/synergy_wins (i), synergy_expected (d)
+                (absents en version 1 : sommes de synergie repartant de 0)
+
+Le fichier est écrit dans un fichier temporaire puis renommé (atomique), et relu via
+`mmap` : pas de lecture intermédiaire du fichier entier, chaque colonne est copiée une
+seule fois des pages mappées vers un `array` (le mmap est fermé aussitôt après). Un
+recalcul repart de l'instantané et ne rejoue que les matchs postérieurs au dernier
+match appliqué.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import database_file
+from backend.app.elo import EloCalculator, ReplayEloCalculator
+
+MAGIC = b"BTRS"
+VERSION = 2
+SNAPSHOT_FILENAME = "ratings.snap"
+
+# magic, version, sections, last_match_id, last_played_at (µs),
+# prefix_count, prefix_updated_at (µs), settings fingerprint, crc32 du corps
+_HEADER = struct.Struct("<4sHHqqqq8sI4x")
+# type d'entité (0 = joueur, 1 = équipe), format, nombre de lignes
+_SECTION = struct.Struct("<B7sI4x")
+
+# (nom, code array, taille) des colonnes de chaque section
+_COLUMNS = (("ids", "q", 8), ("rating", "d", 8), ("games", "i", 4), ("wins", "i", 4),
+            ("losses", "i", 4), ("streak", "i", 4), ("last_played", "q", 8))
+_TEAM_COLUMNS = (("synergy_games", "i", 4), ("synergy_wins", "i", 4), ("synergy_expected", "d", 8))
+
+_EPOCH = datetime(1970, 1, 1)
+_NONE = -1
+
+
+def _to_us(dt: Optional[datetime]) -> int:
+    if dt is None:
+        return _NONE
+    return (dt.replace(tzinfo=None) - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_us(us: int) -> Optional[datetime]:
+    return None if us == _NONE else _EPOCH + timedelta(microseconds=us)
+
+
+def _pad(n: int) -> int:
+    return -n % 8
+
+
+def snapshot_path(db: Session) -> str:
+    """L'instantané vit à côté du fichier SQLite de la session"""
+    return os.path.join(os.path.dirname(database_file(db)), SNAPSHOT_FILENAME)
+
+
+def settings_fingerprint(elo_calc: EloCalculator) -> bytes:
+    """Un instantané n'est valable que pour les paramètres ELO qui l'ont produit"""
+    params = (
+        elo_calc.K_BASE, elo_calc.ALPHA, elo_calc.BETA, elo_calc.DELTA,
+        elo_calc.INITIAL_RATING, elo_calc.TEAM_2V2_SEED, elo_calc.WIN_BONUS, elo_calc.INFLATION
+    ) + elo_calc.decay.key
+    return hashlib.sha256(repr(params).encode()).digest()[:8]
+
+
+def history_prefix(db: Session, last_played_at: datetime, last_match_id: int) -> Tuple[int, int]:
+    """(nb de matchs classés, dernier updated_at) jusqu'au match donné inclus.
+
+    Change si un match de ce préfixe est supprimé, modifié, ou si un match antidaté
+    y est inséré : l'instantané ne correspond alors plus à l'historique.
+    """
+    count, updated = (
+        db.query(func.count(models.Match.id), func.max(models.Match.updated_at))
+        .filter(models.Match.ranked == True)
+        .filter(tuple_(models.Match.played_at, models.Match.id) <= (last_played_at, last_match_id))
+        .one()
+    )
+    return count, _to_us(updated)
+
+
+class RatingSnapshot:
+    """Instantané relu : colonnes par (type, format) et position dans l'historique"""
+
+    def __init__(self, last_match_id: int, last_played_at: Optional[datetime],
+                 prefix: Tuple[int, int], fingerprint: bytes, sections: Dict[Tuple[str, str], dict]):
+        self.last_match_id = last_match_id
+        self.last_played_at = last_played_at
+        self.prefix = prefix
+        self.fingerprint = fingerprint
+        self.sections = sections
+
+    @property
+    def order_key(self):
+        return (self.last_played_at, self.last_match_id)
+
+    def is_valid_for(self, db: Session, elo_calc: EloCalculator) -> bool:
+        if self.fingerprint != settings_fingerprint(elo_calc):
+            return False
+        if self.last_played_at is None:
+            return self.prefix == (0, _NONE)
+        return history_prefix(db, self.last_played_at, self.last_match_id) == self.prefix
+
+    def restore_into(self, elo_calc: ReplayEloCalculator):
+        """Remplit les ratings en mémoire d'un ReplayEloCalculator"""
+        for (kind, fmt), cols in self.sections.items():
+            target, model, key = (
+                (elo_calc.team_ratings, models.TeamRating, "team_id") if kind == "team"
+                else (elo_calc.ratings, models.Rating, "player_id")
+            )
+            extra = [name for name, _, _ in _TEAM_COLUMNS if name in cols] if kind == "team" else []
+            for i, entity_id in enumerate(cols["ids"]):
+                entity = model(**{
+                    key: entity_id, "format": fmt, "rating": cols["rating"][i],
+                    "games": cols["games"][i], "wins": cols["wins"][i],
+                    "losses": cols["losses"][i], "streak": cols["streak"][i],
+                    "last_played": _from_us(cols["last_played"][i]),
+                    **{name: cols[name][i] for name in extra},
+                })
+                if kind == "team" and not extra:
+                    entity.synergy_games, entity.synergy_wins, entity.synergy_expected = 0, 0, 0.0
+                target[(entity_id, fmt)] = entity
+
+
+def encode_snapshot(elo_calc: ReplayEloCalculator, last_match_id: int,
+                    last_played_at: Optional[datetime], prefix: Tuple[int, int]) -> bytes:
+    """Sérialise l'état en mémoire d'un rejeu (en-tête + sections)"""
+    groups: Dict[Tuple[int, str], list] = {}
+    for (entity_id, fmt), r in elo_calc.ratings.items():
+        groups.setdefault((0, fmt), []).append((entity_id, r))
+    for (entity_id, fmt), tr in elo_calc.team_ratings.items():
+        groups.setdefault((1, fmt), []).append((entity_id, tr))
+
+    body = bytearray()
+    for (kind, fmt), rows in sorted(groups.items()):
+        rows.sort(key=lambda row: row[0])
+        body += _SECTION.pack(kind, fmt.encode()[:7], len(rows))
+        columns = [
+            array("q", [entity_id for entity_id, _ in rows]),
+            array("d", [r.rating for _, r in rows]),
+            array("i", [r.games or 0 for _, r in rows]),
+            array("i", [r.wins or 0 for _, r in rows]),
+            array("i", [r.losses or 0 for _, r in rows]),
+            array("i", [r.streak or 0 for _, r in rows]),
+            array("q", [_to_us(r.last_played) for _, r in rows]),
+        ]
+        if kind == 1:
+            columns += [
+                array("i", [r.synergy_games or 0 for _, r in rows]),
+                array("i", [r.synergy_wins or 0 for _, r in rows]),
+                array("d", [r.synergy_expected or 0.0 for _, r in rows]),
+            ]
+        for column in columns:
+            if sys.byteorder != "little":
+                column.byteswap()
+            data = column.tobytes()
+            body += data + b"\0" * _pad(len(data))
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, len(groups), last_match_id, _to_us(last_played_at),
+        prefix[0], prefix[1], settings_fingerprint(elo_calc), zlib.crc32(body)
+    )
+    return header + bytes(body)
+
+
+def write_snapshot(path: str, elo_calc: ReplayEloCalculator, last_match_id: int,
+                   last_played_at: Optional[datetime], prefix: Tuple[int, int]):
+    """Écrit l'instantané d'un rejeu et remplace le fichier atomiquement"""
+    data = encode_snapshot(elo_calc, last_match_id, last_played_at, prefix)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[RatingSnapshot]:
+    """Relit un instantané via mmap ; None si absent, d'une autre version ou corrompu"""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return decode_snapshot(mm)
+
+
+def decode_snapshot(buffer, min_version: int = VERSION) -> Optional[RatingSnapshot]:
+    """Relit un instantané depuis un tampon (bytes, mmap) ; None si invalide.
+
+    Les colonnes sont copiées dans des `array` (une copie par colonne, sans tampon
+    intermédiaire) : l'instantané reste utilisable une fois le mmap fermé.
+
+    `min_version=1` accepte les anciens formats (points de reprise de l'archive,
+    qu'on ne peut pas régénérer) ; le fichier ratings.snap, lui, est simplement
+    recalculé s'il date d'une version précédente.
+    """
+    if len(buffer) < _HEADER.size:
+        return None
+    (magic, version, n_sections, last_match_id, last_played_us,
+     prefix_count, prefix_updated, fingerprint, crc) = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or not min_version <= version <= VERSION:
+        return None
+    view = memoryview(buffer)
+    try:
+        if zlib.crc32(view[_HEADER.size:]) != crc:
+            return None
+
+        sections = {}
+        offset = _HEADER.size
+        for _ in range(n_sections):
+            kind, fmt, count = _SECTION.unpack_from(buffer, offset)
+            offset += _SECTION.size
+            cols = {}
+            layout = _COLUMNS + (_TEAM_COLUMNS if kind == 1 and version >= 2 else ())
+            for name, code, size in layout:
+                column = array(code)
+                column.frombytes(view[offset:offset + count * size])
+                if sys.byteorder != "little":
+                    column.byteswap()
+                cols[name] = column
+                offset += count * size + _pad(count * size)
+            sections[("team" if kind else "player", fmt.rstrip(b"\0").decode())] = cols
+    finally:
+        view.release()
+
+    return RatingSnapshot(
+        last_match_id, _from_us(last_played_us), (prefix_count, prefix_updated), fingerprint, sections
+    )
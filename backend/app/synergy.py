@@ -0,0 +1,141 @@
+"""Synergie des paires en 2v2 : quelles équipes font mieux (ou moins bien) que ce que
+prédisent les ratings individuels de leurs deux membres.
+
+`update_2v2_ratings` cumule pour chaque TeamRating, match après match, le score réel
+de l'équipe (synergy_wins) et le score attendu d'après la moyenne des ratings 2v2
+individuels des membres avant le match (synergy_expected), sur synergy_games matchs.
+La synergie d'une paire se lit donc directement dans la table, sans relire
+l'historique : une seule passe vectorisée (NumPy) sur les équipes suffit.
+
+- synergy  : (victoires - victoires attendues) / matchs, en fraction de match ;
+- elo_gap  : écart équivalent en points ELO entre la performance observée (lissée)
+             et la performance prédite ;
+- z_score  : écart rapporté à l'écart-type binomial attendu, pour distinguer une
+             vraie synergie d'une série de quelques matchs chanceux.
+"""
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.database import tenant_of
+from backend.app.identity import Identities, identity_cache
+
+
+class SynergyTable:
+    """Colonnes des équipes 2v2 (ordre des team_id), prêtes pour le calcul vectorisé"""
+
+    def __init__(self, rows: list):
+        self.team_ids = np.array([r.team_id for r in rows], dtype=np.int64)
+        # Clé canonique "a-b" (ids triés) : les deux membres sans jointure
+        members = [tuple(int(pid) for pid in r.key.split("-")) for r in rows]
+        self.members = np.array(members, dtype=np.int64).reshape(len(rows), 2)
+        self.ratings = np.array([r.rating for r in rows], dtype=np.float64)
+        self.games = np.array([r.synergy_games for r in rows], dtype=np.float64)
+        self.wins = np.array([r.synergy_wins for r in rows], dtype=np.float64)
+        self.expected = np.array([r.synergy_expected for r in rows], dtype=np.float64)
+
+    def compute(self, identities: Identities, min_games: int = 5, limit: int = 10) -> dict:
+        """Synergies des équipes d'au moins `min_games` matchs, noms tirés du cache d'identité"""
+        keep = np.flatnonzero(self.games >= min_games)
+        games, wins, expected = self.games[keep], self.wins[keep], self.expected[keep]
+
+        synergy = (wins - expected) / games
+        p_expected = np.clip(expected / games, 0.01, 0.99)
+        p_observed = (wins + 0.5) / (games + 1.0)
+        elo_gap = 400.0 * (np.log10(p_observed / (1 - p_observed)) - np.log10(p_expected / (1 - p_expected)))
+        z_score = (wins - expected) / np.sqrt(games * p_expected * (1 - p_expected))
+
+        # Matrice joueur × joueur (symétrique), NaN pour les paires sans assez de matchs
+        members = self.members[keep]
+        player_ids = np.unique(members)
+        index = np.searchsorted(player_ids, members)
+        matrix = np.full((len(player_ids), len(player_ids)), np.nan)
+        matrix[index[:, 0], index[:, 1]] = synergy
+        matrix[index[:, 1], index[:, 0]] = synergy
+
+        def entry(i: int) -> dict:
+            team = keep[i]
+            return {
+                "team_id": int(self.team_ids[team]),
+                "name": identities.team_name(int(self.team_ids[team])),
+                "player_ids": members[i].tolist(),
+                "games": int(games[i]),
+                "wins": int(wins[i]),
+                "expected_wins": round(float(expected[i]), 2),
+                "synergy": round(float(synergy[i]), 4),
+                "elo_gap": round(float(elo_gap[i]), 1),
+                "z_score": round(float(z_score[i]), 2),
+                "rating": round(float(self.ratings[team]), 2),
+            }
+
+        order = np.lexsort((-games, -synergy))
+        best = [entry(i) for i in order[:limit] if synergy[i] > 0]
+        order = np.lexsort((-games, synergy))
+        worst = [entry(i) for i in order[:limit] if synergy[i] < 0]
+
+        rounded = np.round(matrix, 4)
+        return {
+            "format": "2v2",
+            "min_games": min_games,
+            "teams": len(keep),
+            "players": {
+                "ids": player_ids.tolist(),
+                "names": [identities.player_name(int(pid)) for pid in player_ids],
+            },
+            "matrix": [[None if np.isnan(v) else v for v in row] for row in rounded.tolist()],
+            "best": best,
+            "worst": worst,
+        }
+
+
+class SynergyCache:
+    """Table des équipes par club, relue quand l'empreinte des sommes 2v2 change"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[tuple, SynergyTable]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(db: Session) -> tuple:
+        return tuple(
+            db.query(
+                func.count(), func.sum(models.TeamRating.synergy_games),
+                func.sum(models.TeamRating.synergy_expected), func.sum(models.TeamRating.rating)
+            )
+            .filter(models.TeamRating.format == "2v2")
+            .one()
+        )
+
+    def table(self, db: Session) -> SynergyTable:
+        key = tenant_of(db)
+        fingerprint = self._fingerprint(db)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+        rows = (
+            db.query(
+                models.TeamRating.team_id, models.Team.key, models.TeamRating.rating,
+                models.TeamRating.synergy_games, models.TeamRating.synergy_wins,
+                models.TeamRating.synergy_expected
+            )
+            .join(models.Team, models.Team.id == models.TeamRating.team_id)
+            .filter(models.TeamRating.format == "2v2")
+            .order_by(models.TeamRating.team_id)
+            .all()
+        )
+        table = SynergyTable(rows)
+        with self._lock:
+            self._entries[key] = (fingerprint, table)
+        return table
+
+    def get(self, db: Session, min_games: int = 5, limit: int = 10) -> dict:
+        return self.table(db).compute(identity_cache.get(db), min_games, limit)
+
+
+synergy_cache = SynergyCache()
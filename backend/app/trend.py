@@ -0,0 +1,78 @@
+"""Évolution du rating d'un joueur dans le temps, pour les sparklines du profil.
+
+La trajectoire complète est reconstruite par un rejeu en mémoire limité aux
+matchs dont dépend le joueur, gardée en cache par joueur, puis réduite côté
+serveur par LTTB (Largest-Triangle-Three-Buckets), qui conserve les pics et creux
+visibles bien mieux qu'un simple échantillonnage régulier.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+Point = Tuple[datetime, float, int]  # (date, rating après le match, id du match)
+
+
+def lttb(points: List[Point], threshold: int) -> List[Point]:
+    """Réduit une série à `threshold` points en préservant sa forme (LTTB)"""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points) if threshold >= n else [points[0], points[-1]][:threshold]
+
+    xs = [p[0].timestamp() for p in points]
+    ys = [p[1] for p in points]
+    sampled = [points[0]]
+    bucket = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Moyenne du seau suivant : troisième sommet du triangle
+        next_start = int((i + 1) * bucket) + 1
+        next_end = min(int((i + 2) * bucket) + 1, n)
+        avg_x = sum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(ys[next_start:next_end]) / (next_end - next_start)
+
+        # Point du seau courant formant le plus grand triangle avec a et la moyenne
+        start, end = int(i * bucket) + 1, int((i + 1) * bucket) + 1
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class TrendCache:
+    """Trajectoires complètes par (joueur, format), LRU borné.
+
+    Chaque entrée est associée à l'état courant du Rating du joueur (parties, rating,
+    dernière partie) : dès qu'il joue ou qu'un de ses matchs est corrigé/supprimé,
+    cet état change et la trajectoire est reconstruite à la demande suivante.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Tuple[tuple, List[Point]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, version: tuple) -> Optional[List[Point]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, version: tuple, series: List[Point]):
+        with self._lock:
+            self._entries[key] = (version, series)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+trend_cache = TrendCache()
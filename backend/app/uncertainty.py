@@ -0,0 +1,198 @@
+"""Incertitude des ratings par bootstrap : intervalle de rating et plage de rang.
+
+Un écart de 4 points au classement ne veut rien dire. Pour le mesurer, l'historique
+classé est rééchantillonné avec remise (autant de matchs, ordre chronologique
+conservé) puis rejoué avec les formules d'EloCalculator, `replicates` fois :
+
+- l'écart-type des ratings rejoués donne l'erreur type de chaque rating, affichée
+  comme intervalle à 95 % autour du rating courant (± 1,96 erreur type) ;
+- les percentiles 2,5 et 97,5 des rangs rejoués donnent la plage de rang plausible.
+
+Les rejeux sont répartis sur un pool de processus, chacun recevant l'historique une
+seule fois. Le calcul tourne en tâche de fond (POST /admin/rating-intervals) ou en
+cron (python -m backend.app.cli intervals), jamais dans une requête, et il est sauté
+si ni l'historique ni les paramètres n'ont changé depuis le précédent. La période
+archivée n'est pas rééchantillonnée : les rejeux partent du point de reprise.
+
+Un import ou une suppression de joueur efface les intervalles et change l'époque des
+ratings (`ratings_epoch`) : un calcul commencé avant n'est jamais servi après, ses
+ids pouvant désigner d'autres joueurs ou équipes.
+"""
+import hashlib
+import math
+import multiprocessing
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app import models
+from backend.app.archive import load_checkpoint, restore_checkpoint
+from backend.app.elo import ReplayEloCalculator, settings_cache
+from backend.app.identity import (
+    RATING_INTERVALS, RATING_INTERVALS_EPOCH, RATINGS_EPOCH, read_version, write_version
+)
+from backend.app.ratings import DEFAULT_SETTINGS, ReplayMatch, history_signature, load_replay_matches
+
+REPLICATES = 100
+BATCH = 5  # Rejeux par tâche envoyée au pool
+Z_95 = 1.96
+
+# (type d'entité, id, format) -> rating, pour un rejeu
+Sample = Dict[Tuple[str, int, str], float]
+
+# Données de rejeu de chaque processus du pool, reçues une fois (initializer)
+_worker_state: dict = {}
+
+
+def _init_worker(matches: List[ReplayMatch], settings: Dict[str, str], team_players: Dict[int, List[int]],
+                 ratings: List[dict], team_ratings: List[dict]):
+    _worker_state.update(
+        matches=matches, settings=settings, team_players=team_players, ratings=ratings, team_ratings=team_ratings
+    )
+
+
+def replay_sample(seed: int, matches: List[ReplayMatch], settings: Dict[str, str],
+                  team_players: Dict[int, List[int]], ratings: List[dict], team_ratings: List[dict]) -> Sample:
+    """Un rejeu de l'historique rééchantillonné avec remise (graine fixe : reproductible)"""
+    rng = random.Random(seed)
+    elo_calc = ReplayEloCalculator(None, settings, team_players)
+    # Point de départ : ratings au point de reprise de l'archive (vide sans archive)
+    elo_calc.ratings = {(r["player_id"], r["format"]): models.Rating(**r) for r in ratings}
+    elo_calc.team_ratings = {(r["team_id"], r["format"]): models.TeamRating(**r) for r in team_ratings}
+    # Indices triés : l'ordre chronologique est conservé, un match tiré deux fois est rejoué deux fois
+    for i in sorted(rng.randrange(len(matches)) for _ in range(len(matches))):
+        matches[i].apply(elo_calc)
+
+    sample = {("player", pid, fmt): r.rating for (pid, fmt), r in elo_calc.ratings.items()}
+    sample.update({("team", tid, fmt): tr.rating for (tid, fmt), tr in elo_calc.team_ratings.items()})
+    return sample
+
+
+def _run_batch(seeds: List[int]) -> List[Sample]:
+    return [replay_sample(seed, **_worker_state) for seed in seeds]
+
+
+def _percentile(values: List[int], q: float) -> int:
+    """Percentile par rang le plus proche d'une liste triée"""
+    return values[min(len(values) - 1, max(0, math.ceil(q * len(values)) - 1))]
+
+
+def summarize(samples: List[Sample]) -> List[dict]:
+    """Erreur type et plage de rang de chaque entité, sur les rejeux où elle apparaît"""
+    values: Dict[tuple, List[float]] = {}
+    ranks: Dict[tuple, List[int]] = {}
+    for sample in samples:
+        boards: Dict[Tuple[str, str], list] = {}
+        for key, rating in sample.items():
+            values.setdefault(key, []).append(rating)
+            boards.setdefault((key[0], key[2]), []).append((-rating, key[1], key))
+        for board in boards.values():
+            board.sort()
+            for rank, (_, _, key) in enumerate(board, 1):
+                ranks.setdefault(key, []).append(rank)
+
+    rows = []
+    for key, ratings in values.items():
+        if len(ratings) < 2:
+            continue
+        entity_ranks = sorted(ranks[key])
+        rows.append({
+            "entity_type": key[0], "entity_id": key[1], "format": key[2],
+            "rating_se": statistics.stdev(ratings),
+            "rank_low": _percentile(entity_ranks, 0.025),
+            "rank_high": _percentile(entity_ranks, 0.975),
+            "samples": len(ratings),
+        })
+    return rows
+
+
+def intervals_signature(db: Session, replicates: int) -> int:
+    """Empreinte (entier) de l'historique et des paramètres couverts par un calcul"""
+    settings = settings_cache.get(db)
+    signature = (history_signature(db), sorted((k, settings.get(k)) for k in DEFAULT_SETTINGS), replicates)
+    return int(hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:12], 16)
+
+
+def compute_intervals(db: Session, replicates: int = REPLICATES, workers: Optional[int] = None,
+                      progress: Optional[Callable[[int, int], None]] = None, force: bool = False) -> dict:
+    """Estime et enregistre l'incertitude de tous les ratings (avec commit)"""
+    signature = intervals_signature(db, replicates)
+    epoch = read_version(db, RATINGS_EPOCH)
+    if not force and (read_version(db, RATING_INTERVALS), read_version(db, RATING_INTERVALS_EPOCH)) == (signature, epoch):
+        return {"status": "unchanged", "replicates": replicates}
+
+    settings = {k: settings_cache.get(db).get(k, v) for k, v in DEFAULT_SETTINGS.items()}
+    matches = load_replay_matches(db)
+    base = ReplayEloCalculator(db, settings)
+    checkpoint = load_checkpoint(db)
+    if checkpoint is not None:
+        restore_checkpoint(db, checkpoint, base)
+    state = (matches, settings, base.team_players, base.rating_rows(), base.team_rating_rows())
+
+    samples: List[Sample] = []
+    if matches:
+        batches = [list(range(i, min(i + BATCH, replicates))) for i in range(0, replicates, BATCH)]
+        workers = min(workers or os.cpu_count() or 1, len(batches))
+        if workers <= 1:
+            _init_worker(*state)
+            for batch in batches:
+                samples.extend(_run_batch(batch))
+                if progress:
+                    progress(len(samples), replicates)
+        else:
+            # spawn : pas de fork d'un processus serveur qui a des threads et des connexions ouvertes
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=state
+            ) as pool:
+                for future in as_completed([pool.submit(_run_batch, batch) for batch in batches]):
+                    samples.extend(future.result())
+                    if progress:
+                        progress(len(samples), replicates)
+
+    rows = summarize(samples)
+    computed_at = datetime.utcnow()
+    db.query(models.RatingInterval).delete(synchronize_session=False)
+    db.bulk_insert_mappings(models.RatingInterval, [dict(row, computed_at=computed_at) for row in rows])
+    write_version(db, RATING_INTERVALS, signature)
+    write_version(db, RATING_INTERVALS_EPOCH, epoch)
+    db.commit()
+    return {"status": "computed", "replicates": replicates, "matches": len(matches), "intervals": len(rows)}
+
+
+def load_intervals(db: Session, entity_type: str, fmt: str, entity_ids: Iterable[int]) -> Dict[int, tuple]:
+    """id -> (erreur type, rang bas, rang haut) des entités d'une page de classement,
+    vide si les intervalles datent d'une autre époque des ratings"""
+    ids = list(entity_ids)
+    if not ids:
+        return {}
+    epochs = dict(
+        db.query(models.CacheVersion.name, models.CacheVersion.version)
+        .filter(models.CacheVersion.name.in_((RATINGS_EPOCH, RATING_INTERVALS_EPOCH)))
+    )
+    if epochs.get(RATINGS_EPOCH, 0) != epochs.get(RATING_INTERVALS_EPOCH, 0):
+        return {}
+    rows = (
+        db.query(
+            models.RatingInterval.entity_id, models.RatingInterval.rating_se,
+            models.RatingInterval.rank_low, models.RatingInterval.rank_high
+        )
+        .filter(
+            models.RatingInterval.entity_type == entity_type, models.RatingInterval.format == fmt,
+            models.RatingInterval.entity_id.in_(ids)
+        )
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+
+def interval_fields(rating: float, interval: Optional[tuple]) -> tuple:
+    """(rating bas, rating haut, rang bas, rang haut) affichés, None sans estimation"""
+    if interval is None:
+        return None, None, None, None
+    rating_se, rank_low, rank_high = interval
+    return rating - Z_95 * rating_se, rating + Z_95 * rating_se, rank_low, rank_high
@@ -0,0 +1,38 @@
+import itertools
+import os
+import tempfile
+
+# La base du club par défaut est ouverte à l'import (chemin relatif data/) :
+# les tests tournent dans un répertoire jetable
+os.chdir(tempfile.mkdtemp(prefix="billiard-tests-"))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.database import tenants
+from backend.app.main import app
+
+_clubs = itertools.count(1)
+
+
+@pytest.fixture
+def client():
+    """Client HTTP sur un club neuf (base SQLite vide)"""
+    club = f"test-{next(_clubs)}"
+    tenants.create(club)
+    with TestClient(app, headers={"X-Club": club}) as c:
+        yield c
+
+
+@pytest.fixture
+def token(client):
+    return client.post("/admin/login", json={"pin": "1234"}).json()["token"]
+
+
+@pytest.fixture
+def players(client):
+    """players("A", "B") -> ids des joueurs créés"""
+    def create(*names):
+        return [client.post("/players", json={"name": name}).json()["id"] for name in names]
+    return create
+
@@ -0,0 +1,20 @@
+"""Outils communs aux tests (client HTTP de conftest.py)"""
+import time
+
+
+def wait_job(client, token, job_id, timeout=10.0) -> dict:
+    """Attend la fin d'une tâche de fond et renvoie son état"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/admin/jobs/{job_id}?token={token}").json()
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def leaderboard(client, fmt="1v1") -> dict:
+    """entity_id -> (rating arrondi, matchs joués)"""
+    return {
+        e["entity_id"]: (round(e["rating"], 2), e["games"])
+        for e in client.get(f"/leaderboard/{fmt}?limit=1000").json()
+    }
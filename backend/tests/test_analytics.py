@@ -0,0 +1,112 @@
+import pytest
+
+# (format, côté A, côté B, vainqueur, billes restantes, faute sur la noire), un jour par match
+HISTORY = [
+    ("1v1", "A", "B", "A", 3, False),
+    ("1v1", "B", "A", "A", 2, False),
+    ("1v1", "A", "C", "A", 5, False),
+    ("1v1", "C", "A", "A", 0, True),
+    ("2v2", "AD", "BC", "A", 1, False),
+    ("1v1", "A", "B", "A", 4, False),
+    ("1v1", "A", "B", "B", 2, False),
+    ("1v1", "D", "A", "A", 6, True),
+]
+
+
+def expected_analytics(history, ids, last):
+    """Statistiques du joueur A recalculées en Python à partir de l'historique"""
+    rows = []
+    for day, (fmt, side_a, side_b, winner, balls, foul) in enumerate(history, start=1):
+        side = "A" if "A" in side_a else "B"
+        opponents = side_b if side == "A" else side_a
+        rows.append({"day": day, "format": fmt, "side": side, "won": winner == side, "balls": balls,
+                     "foul": foul, "opponents": [ids[name] for name in opponents]})
+
+    def summary(subset):
+        games, wins = len(subset), sum(r["won"] for r in subset)
+        won = [r["balls"] for r in subset if r["won"]]
+        lost = [r["balls"] for r in subset if not r["won"]]
+        fouls = sum(1 for r in subset if r["foul"] and not r["won"])
+        return {
+            "games": games, "wins": wins, "losses": games - wins,
+            "win_rate": round(wins / games * 100, 2),
+            "avg_balls_remaining_won": round(sum(won) / len(won), 2) if won else None,
+            "avg_balls_remaining_lost": round(sum(lost) / len(lost), 2) if lost else None,
+            "foul_black_losses": fouls, "foul_black_rate": round(fouls / games * 100, 2),
+        }
+
+    versus = {}
+    for r in rows:
+        for opponent in r["opponents"]:
+            games, wins = versus.get(opponent, (0, 0))
+            versus[opponent] = (games + 1, wins + r["won"])
+    best = sorted(versus, key=lambda o: (-versus[o][1] / versus[o][0], -versus[o][0], o))
+    worst = sorted(versus, key=lambda o: (versus[o][1] / versus[o][0], -versus[o][0], o))
+
+    latest = rows[::-1]
+    streak = next((i for i, r in enumerate(latest) if r["won"] != latest[0]["won"]), len(latest))
+    return {
+        "overall": summary(rows),
+        "by_format": {fmt: summary([r for r in rows if r["format"] == fmt]) for fmt in ("1v1", "2v2")},
+        "by_side": {side: summary([r for r in rows if r["side"] == side]) for side in ("A", "B")},
+        "best": [(o, versus[o]) for o in best[:3]],
+        "worst": [(o, versus[o]) for o in worst[:3]],
+        "form": [r["won"] for r in latest[:last]],
+        "streak": streak if latest[0]["won"] else -streak,
+    }
+
+
+def post_history(client, ids):
+    match_ids = []
+    for day, (fmt, side_a, side_b, winner, balls, foul) in enumerate(HISTORY, start=1):
+        match_ids.append(client.post("/matches", json={
+            "format": fmt, "players_a": [ids[n] for n in side_a], "players_b": [ids[n] for n in side_b],
+            "winner_side": winner, "balls_remaining": balls, "foul_black": foul,
+            "played_at": f"2025-01-0{day}T20:00:00",
+        }).json()["id"])
+    return match_ids
+
+
+def check(analytics, expected):
+    assert analytics["overall"] == expected["overall"]
+    assert analytics["by_format"] == expected["by_format"]
+    assert analytics["by_side"] == expected["by_side"]
+    for key in ("best", "worst"):
+        assert [(o["player_id"], (o["games"], o["wins"])) for o in analytics["opponents"][key]] == expected[key]
+    assert [r["won"] for r in analytics["form"]["results"]] == expected["form"]
+    assert analytics["form"]["current_streak"] == expected["streak"]
+
+
+def test_sql_analytics_match_python_reference(client, token, players):
+    ids = dict(zip("ABCD", players("A", "B", "C", "D")))
+    match_ids = post_history(client, ids)
+
+    url = f"/players/{ids['A']}/analytics?last=4&min_games=1"
+    check(client.get(url).json(), expected_analytics(HISTORY, ids, 4))
+
+    # Correction d'un match : le résultat en cache est recalculé
+    client.patch(f"/admin/matches/{match_ids[-1]}?token={token}", json={"winner_side": "A"})
+    corrected = HISTORY[:-1] + [HISTORY[-1][:3] + ("A",) + HISTORY[-1][4:]]
+    check(client.get(url).json(), expected_analytics(corrected, ids, 4))
+
+
+def test_opponents_below_min_games_are_left_out(client, players):
+    ids = dict(zip("ABCD", players("A", "B", "C", "D")))
+    post_history(client, ids)
+
+    analytics = client.get(f"/players/{ids['A']}/analytics?min_games=3").json()
+    assert {o["player_id"] for o in analytics["opponents"]["best"]} == {ids["B"], ids["C"]}
+    assert analytics["opponents"]["min_games"] == 3
+    assert client.get("/players/999/analytics").status_code == 404
+
+
+@pytest.mark.parametrize("last", [1, 3, 20])
+def test_form_window(client, players, last):
+    ids = dict(zip("ABCD", players("A", "B", "C", "D")))
+    post_history(client, ids)
+
+    form = client.get(f"/players/{ids['A']}/analytics?last={last}").json()["form"]
+    assert form["games"] == min(last, len(HISTORY))
+    assert [r["played_at"][:10] for r in form["results"]] == [
+        f"2025-01-0{day}" for day in range(len(HISTORY), len(HISTORY) - form["games"], -1)
+    ]
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.app import main, models
+from backend.app.database import tenants
+from backend.tests.helpers import leaderboard, wait_job
+
+
+def match(a, b, played_at, client_uuid=None):
+    return {
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 3,
+        "played_at": played_at, "client_uuid": client_uuid,
+    }
+
+
+def test_batch_after_history_is_applied_immediately(client, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-10T20:00:00"))
+
+    result = client.post("/matches/batch", json={"matches": [match(b, a, "2025-01-11T20:00:00", "u1")]}).json()
+    assert result["created"] == 1
+    assert result["rebuild_job_id"] is None and result["ratings_stale"] is False
+    assert leaderboard(client)[a][1] == 2
+
+
+def test_backdated_batch_is_flagged_until_rebuilt(client, token, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-10T20:00:00"))
+
+    batch = {"matches": [match(b, a, "2025-01-05T20:00:00", "u1"), match(b, a, "2025-01-06T20:00:00", "u2")]}
+    result = client.post("/matches/batch", json=batch).json()
+    assert result["created"] == 2
+    assert result["ratings_stale"] is True
+    assert wait_job(client, token, result["rebuild_job_id"])["status"] == "done"
+    assert leaderboard(client)[a][1] == 3
+
+    # Lot rejoué par la file offline : rien n'est réappliqué
+    again = client.post("/matches/batch", json=batch).json()
+    assert (again["created"], again["duplicates"], again["ratings_stale"]) == (0, 2, False)
+    assert {r["status"] for r in again["results"]} == {"duplicate"}
+
+
+def test_concurrent_duplicate_client_uuid_returns_409(client, players, monkeypatch):
+    a, b = players("A", "B")
+    club = client.headers["X-Club"]
+    insert_match = main.insert_match
+
+    def racing_insert(db, elo_calc, match_data):
+        # Un autre envoi du même lot enregistre ce client_uuid après le dédoublonnage
+        other = tenants.session_factory(club)()
+        try:
+            other.add(models.Match(
+                format="1v1", played_at=datetime(2025, 1, 1), balls_remaining=0, winner_side="A",
+                client_uuid=match_data.client_uuid
+            ))
+            other.commit()
+        finally:
+            other.close()
+        monkeypatch.setattr(main, "insert_match", insert_match)
+        return insert_match(db, elo_calc, match_data)
+
+    monkeypatch.setattr(main, "insert_match", racing_insert)
+    response = client.post("/matches/batch", json={"matches": [match(a, b, "2025-01-10T20:00:00", "u1")]})
+    assert response.status_code == 409
+
+    # Le client réessaie : le match est reconnu comme déjà appliqué
+    retry = client.post("/matches/batch", json={"matches": [match(a, b, "2025-01-10T20:00:00", "u1")]}).json()
+    assert retry["duplicates"] == 1
+
+
+def test_timezone_aware_dates_are_normalized(client, token, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-10T20:00:00+01:00"))
+
+    # 18:30Z = 19:30 heure de Paris : antérieur au match précédent (19:00Z)
+    batch = {"matches": [match(b, a, "2025-01-10T18:30:00Z", "u1"), match(b, a, "2025-01-11T10:00:00Z", "u2")]}
+    result = client.post("/matches/batch", json=batch).json()
+    assert result["created"] == 2 and result["ratings_stale"] is True
+    wait_job(client, token, result["rebuild_job_id"])
+
+    played = sorted(m["played_at"] for m in client.get("/history?limit=10").json()["matches"])
+    assert played == ["2025-01-10T18:30:00", "2025-01-10T19:00:00", "2025-01-11T10:00:00"]
+
+
+def test_player_twice_on_one_side_is_rejected(client, players):
+    a, b, c = players("A", "B", "C")
+    duplicate = {**match(a, b, None), "format": "2v2", "players_a": [a, a], "players_b": [b, c]}
+    assert client.post("/matches", json=duplicate).status_code == 400
+    batch = {"matches": [{**duplicate, "client_uuid": "u1"}]}
+    assert client.post("/matches/batch", json=batch).status_code == 400
+    assert client.get("/history").json()["total"] == 0
+
+
+def test_integrity_error_without_client_uuid_is_not_reported_as_success(client, players, monkeypatch):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-10T20:00:00"))
+
+    def failing_insert(db, elo_calc, match_data):
+        raise IntegrityError("INSERT", {}, Exception("contrainte"))
+
+    monkeypatch.setattr(main, "insert_match", failing_insert)
+    response = client.post("/matches", json=match(b, a, "2025-01-11T20:00:00"))
+    assert response.status_code == 400
@@ -0,0 +1,66 @@
+from backend.app.http_cache import FragmentCache
+
+
+def match(a, b, played_at, winner="A"):
+    return {
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": winner,
+        "balls_remaining": 2, "played_at": played_at,
+    }
+
+
+def bootstrap(client, **headers):
+    return client.get("/bootstrap?leaderboards=global,1v1&history=10", headers=headers)
+
+
+def check_parts(client, body):
+    assert body["players"] == client.get("/players").json()
+    assert body["leaderboards"]["1v1"] == client.get("/leaderboard/1v1").json()
+    assert body["leaderboards"]["global"] == client.get("/leaderboard/global").json()
+    assert body["history"] == client.get("/history?limit=10").json()
+
+
+def test_fragment_cache_rebuilds_only_changed_versions():
+    cache, calls = FragmentCache(max_entries=2), []
+
+    def build(value):
+        calls.append(value)
+        return {"value": value}
+
+    assert cache.get("a", 1, lambda: build(1)) == b'{"value":1}'
+    assert cache.get("a", 1, lambda: build(2)) == b'{"value":1}'
+    assert cache.get("a", 2, lambda: build(3)) == b'{"value":3}'
+    cache.get("b", 1, lambda: build(4))
+    cache.get("c", 1, lambda: build(5))  # évince "a", la plus ancienne
+    cache.get("a", 2, lambda: build(6))
+    assert calls == [1, 3, 4, 5, 6]
+
+
+def test_bootstrap_follows_writes(client, token, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-01T20:00:00"))
+
+    first = bootstrap(client)
+    etag = first.headers["ETag"]
+    check_parts(client, first.json())
+    assert first.json()["version"] == etag[3:-1]
+    assert bootstrap(client, **{"If-None-Match": etag}).status_code == 304
+
+    # Nouveau match : classements et historique reconstruits
+    m2 = client.post("/matches", json=match(b, a, "2025-01-02T20:00:00")).json()["id"]
+    second = bootstrap(client, **{"If-None-Match": etag})
+    assert second.status_code == 200 and second.headers["ETag"] != etag
+    check_parts(client, second.json())
+    assert second.json()["history"]["total"] == 2
+
+    # Nouveau joueur : seule la liste des joueurs change, les autres fragments restent valides
+    players("C")
+    third = bootstrap(client, **{"If-None-Match": second.headers["ETag"]})
+    assert third.status_code == 200
+    check_parts(client, third.json())
+
+    # Correction d'un match (admin) : ratings recalculés, fragment de classement invalidé
+    client.patch(f"/admin/matches/{m2}?token={token}", json={"winner_side": "B"})
+    fourth = bootstrap(client, **{"If-None-Match": third.headers["ETag"]})
+    assert fourth.status_code == 200
+    check_parts(client, fourth.json())
+    assert fourth.json()["leaderboards"]["1v1"] != third.json()["leaderboards"]["1v1"]
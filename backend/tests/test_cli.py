@@ -0,0 +1,20 @@
+from backend.app import cli
+
+
+def test_archive_command(client, token, players):
+    a, b = players("A", "B")
+    for played_at in ("2024-01-15T20:00:00", "2024-03-15T20:00:00"):
+        client.post("/matches", json={
+            "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 2,
+            "played_at": played_at,
+        })
+    ratings = client.get("/leaderboard/1v1").json()
+
+    cli.main(["--club", client.headers["X-Club"], "archive", "--before", "2024-02-01", "--vacuum"])
+
+    assert client.get("/leaderboard/1v1").json() == ratings
+    late = client.post("/matches", json={
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 2,
+        "played_at": "2024-01-10T20:00:00",
+    })
+    assert late.status_code == 400
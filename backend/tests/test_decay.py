@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app import models
+from backend.app.database import tenants
+from backend.app.elo import InactivityDecay
+
+AT = datetime(2025, 6, 1)
+TARGET = 1000.0
+
+
+@pytest.mark.parametrize("grace,half_life", [(60, 30), (0, 30), (10, 0.5)])
+def test_sql_decay_matches_python(client, grace, half_life):
+    decay = InactivityDecay(grace, half_life)
+    # Avant, pile à et juste après la fin de la grâce, puis une et trois demi-vies plus tard
+    offsets = [grace - 1, grace, grace + 0.01, grace + half_life, grace + 3 * half_life]
+    db = tenants.session_factory(client.headers["X-Club"])()
+    try:
+        for i, days in enumerate(offsets, start=1):
+            db.add(models.Player(id=i, name=f"P{i}"))
+            db.add(models.Rating(player_id=i, format="1v1", rating=1200.0, last_played=AT - timedelta(days=days)))
+        db.add(models.Player(id=99, name="Jamais joué"))
+        db.add(models.Rating(player_id=99, format="1v1", rating=1200.0, last_played=None))
+        db.flush()
+
+        rows = db.query(models.Rating.player_id, models.Rating.rating, models.Rating.last_played,
+                        decay.column(models.Rating, TARGET, AT)).all()
+        for player_id, rating, last_played, in_sql in rows:
+            assert in_sql == pytest.approx(decay.apply(rating, last_played, AT, TARGET), abs=1e-6)
+        displayed = {player_id: in_sql for player_id, _, _, in_sql in rows}
+    finally:
+        db.rollback()
+        db.close()
+
+    assert displayed[1] == displayed[2] == displayed[99] == 1200.0
+    assert displayed[3] < 1200.0
+    assert displayed[4] == pytest.approx(1100.0, abs=1e-6)  # une demi-vie : moitié de l'écart
+    assert displayed[5] == pytest.approx(1025.0, abs=1e-6)
@@ -0,0 +1,92 @@
+import gzip
+import importlib.util
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_build_frontend():
+    spec = importlib.util.spec_from_file_location("build_frontend", os.path.join(ROOT, "scripts", "build_frontend.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def match(a, b, played_at):
+    return {
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A",
+        "balls_remaining": 1, "played_at": played_at,
+    }
+
+
+def test_history_etag_revalidation(client, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match(a, b, "2025-01-01T20:00:00"))
+
+    first = client.get("/history")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/history", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == etag
+    # Autres paramètres : autre représentation
+    assert client.get("/history?limit=5", headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/matches", json=match(b, a, "2025-01-02T20:00:00"))
+    changed = client.get("/history", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()["total"] == 2
+
+
+def test_players_etag_changes_with_new_player(client, players):
+    players("A")
+    etag = client.get("/players").headers["ETag"]
+    assert client.get("/players", headers={"If-None-Match": f'"x", {etag}'}).status_code == 304
+
+    players("B")
+    response = client.get("/players", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.json()) == 2
+
+
+def test_large_json_is_gzipped(client, players):
+    ids = players(*(f"Joueur {i:02d}" for i in range(40)))
+    response = client.get("/players", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == len(ids)
+
+
+def test_build_frontend_output(tmp_path):
+    build_frontend = load_build_frontend()
+    src = os.path.join(ROOT, "frontend")
+    out = str(tmp_path / "dist")
+
+    build_id = build_frontend.build(src, out)
+    assets = sorted(os.listdir(os.path.join(out, "assets")))
+    css = next(name for name in assets if re.fullmatch(r"app\.[0-9a-f]{10}\.css", name))
+    js = next(name for name in assets if re.fullmatch(r"app\.[0-9a-f]{10}\.js", name))
+
+    with open(os.path.join(out, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    assert f'href="/assets/{css}"' in html and f'src="/assets/{js}"' in html
+    assert "<style>" not in html and "<script>" not in html
+
+    with open(os.path.join(out, "service-worker.js"), encoding="utf-8") as f:
+        worker = f.read()
+    assert f"const CACHE_NAME = 'billiard-tracker-{build_id}';" in worker
+    assert f"'/assets/{js}'," in worker
+
+    for name in ("index.html", "service-worker.js", os.path.join("assets", js)):
+        path = os.path.join(out, name)
+        with open(path, "rb") as plain, open(path + ".gz", "rb") as packed:
+            assert gzip.decompress(packed.read()) == plain.read()
+
+    # Même source : même build, archives .gz identiques
+    with open(os.path.join(out, "index.html.gz"), "rb") as f:
+        first_gz = f.read()
+    assert build_frontend.build(src, out) == build_id
+    with open(os.path.join(out, "index.html.gz"), "rb") as f:
+        assert f.read() == first_gz
+    assert not os.path.exists(out + ".tmp") and not os.path.exists(out + ".old")
@@ -0,0 +1,20 @@
+from backend.app import models
+from backend.app.database import tenants
+from backend.app.identity import identity_cache
+
+
+def test_rolled_back_identities_are_not_shared(client, players):
+    players("A")
+    db = tenants.session_factory(client.headers["X-Club"])()
+    try:
+        db.add(models.Player(name="Fantôme"))
+        db.flush()
+        identity_cache.bump(db)
+        assert "Fantôme" in {p["name"] for p in identity_cache.get(db).players.values()}
+        db.rollback()
+    finally:
+        db.close()
+
+    # Le joueur suivant reprend le numéro de version de la transaction annulée
+    players("B")
+    assert sorted(p["name"] for p in client.get("/players").json()) == ["A", "B"]
@@ -0,0 +1,65 @@
+from backend.app.database import tenants
+from backend.app.identity import RATINGS_EPOCH, bump_version
+from backend.tests.helpers import wait_job
+
+
+def play(client, a, b, winner="A"):
+    client.post("/matches", json={
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": winner, "balls_remaining": 3,
+    })
+
+
+def compute(client, token):
+    job_id = client.post(f"/admin/rating-intervals?token={token}&replicates=20").json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+
+
+def spreads(client) -> dict:
+    return {e["entity_id"]: e["rating_low"] for e in client.get("/leaderboard/1v1").json()}
+
+
+def seed(client, players):
+    a, b, c = players("A", "B", "C")
+    for winner, loser in ((a, b), (b, c), (a, c), (c, b), (a, b)):
+        play(client, winner, loser)
+    return a, b, c
+
+
+def test_import_discards_intervals(client, token, players):
+    seed(client, players)
+    compute(client, token)
+    assert all(low is not None for low in spreads(client).values())
+
+    export = client.get(f"/admin/export?token={token}").content
+    job_id = client.post(f"/admin/import?token={token}&replace=true", content=export).json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+    assert all(low is None for low in spreads(client).values())
+
+    compute(client, token)
+    assert all(low is not None for low in spreads(client).values())
+
+
+def test_delete_player_discards_intervals(client, token, players):
+    a, b, c = seed(client, players)
+    d, = players("D")
+    play(client, a, d)
+    compute(client, token)
+
+    job_id = client.delete(f"/admin/players/{d}?token={token}").json()["job_id"]
+    wait_job(client, token, job_id)
+    assert d not in spreads(client)
+    assert all(low is None for low in spreads(client).values())
+
+
+def test_intervals_from_an_older_epoch_are_not_served(client, token, players):
+    seed(client, players)
+    compute(client, token)
+
+    # Import ou suppression dans un autre processus pendant le calcul
+    db = tenants.session_factory(client.headers["X-Club"])()
+    try:
+        bump_version(db, RATINGS_EPOCH)
+        db.commit()
+    finally:
+        db.close()
+    assert all(low is None for low in spreads(client).values())
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from backend.app.jobs import JobRunner, job_runner
+from backend.tests.helpers import wait_job
+
+
+def wait_done(*jobs, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while any(job.status not in ("done", "failed") for job in jobs) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_only_identical_requests_are_coalesced():
+    runner = JobRunner()
+    gate = threading.Event()
+    ran = []
+    blocker = runner.submit("rebuild_ratings", lambda job: gate.wait(5))
+
+    first = runner.submit("archive_matches", lambda job: ran.append("2024-01"), params=("2024-01-01",))
+    same = runner.submit("archive_matches", lambda job: ran.append("doublon"), params=("2024-01-01",))
+    other = runner.submit("archive_matches", lambda job: ran.append("2024-06"), params=("2024-06-01",))
+    imports = [
+        runner.submit("import", lambda job, i=i: ran.append(f"import {i}"), coalesce=False) for i in range(2)
+    ]
+    assert same is first and first.requests == 2
+    assert other is not first
+    assert imports[0] is not imports[1]
+
+    gate.set()
+    wait_done(blocker, first, other, *imports)
+    assert ran == ["2024-01", "2024-06", "import 0", "import 1"]
+
+
+def test_each_import_upload_gets_its_own_job(client, token, players):
+    players("A", "B")
+    export = client.get(f"/admin/export?token={token}").content
+
+    job_ids = [
+        client.post(f"/admin/import?token={token}&replace=true", content=export).json()["job_id"]
+        for _ in range(2)
+    ]
+    assert job_ids[0] != job_ids[1]
+    assert [wait_job(client, token, job_id)["status"] for job_id in job_ids] == ["done", "done"]
+    assert sorted(p["name"] for p in client.get("/players").json()) == ["A", "B"]
+
+
+def test_archive_requests_with_different_dates_are_not_merged(client, token, players):
+    a, b = players("A", "B")
+    for day in (1, 2):
+        client.post("/matches", json={
+            "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 2,
+            "played_at": f"2024-0{day}-15T20:00:00",
+        })
+
+    # Tâche bloquante : les deux demandes restent en attente ensemble
+    gate = threading.Event()
+    job_runner.submit("test_gate", lambda job: gate.wait(5), tenant=client.headers["X-Club"])
+    first = client.post(f"/admin/archive?token={token}&before=2024-02-01T00:00:00").json()["job_id"]
+    second = client.post(f"/admin/archive?token={token}&before=2024-03-01T00:00:00").json()["job_id"]
+    gate.set()
+    assert first != second
+    assert wait_job(client, token, first)["status"] == "done"
+    assert wait_job(client, token, second)["status"] == "done"
+    # La seconde date a été appliquée : le match de février est archivé lui aussi
+    late = client.post("/matches", json={
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 2,
+        "played_at": "2024-02-10T20:00:00",
+    })
+    assert late.status_code == 400
+
+
+def test_interval_requests_keep_their_parameters(client, token):
+    gate = threading.Event()
+    job_runner.submit("test_gate", lambda job: gate.wait(5), tenant=client.headers["X-Club"])
+    job_ids = [
+        client.post(f"/admin/rating-intervals?token={token}&{query}").json()["job_id"]
+        for query in ("replicates=20", "replicates=20", "replicates=20&force=true", "replicates=40")
+    ]
+    gate.set()
+    assert job_ids[0] == job_ids[1]
+    assert len(set(job_ids)) == 3
+    assert all(wait_job(client, token, job_id)["status"] == "done" for job_id in job_ids)
@@ -0,0 +1,53 @@
+from backend.tests.helpers import leaderboard, wait_job
+
+
+def match(a, b, played_at, winner="A", fmt="1v1"):
+    return {
+        "format": fmt, "players_a": a, "players_b": b, "winner_side": winner,
+        "balls_remaining": 3, "played_at": played_at,
+    }
+
+
+def rebuilt(client, token) -> dict:
+    job_id = client.post(f"/admin/rebuild-ratings?token={token}").json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+    return leaderboard(client)
+
+
+def test_patch_matches_full_rebuild(client, token, players):
+    a, b, c, d = players("A", "B", "C", "D")
+    ids = [
+        client.post("/matches", json=match(p, q, f"2025-01-0{i + 1}T20:00:00")).json()["id"]
+        for i, (p, q) in enumerate([([a], [b]), ([c], [d]), ([a], [c]), ([b], [d])])
+    ]
+
+    response = client.patch(f"/admin/matches/{ids[1]}?token={token}", json={"winner_side": "B"})
+    assert response.status_code == 200
+    incremental = leaderboard(client)
+    assert incremental == rebuilt(client, token)
+
+
+def test_patch_replays_history_of_removed_player(client, token, players):
+    # M1 X contre B puis M2 A contre X ; X est retiré de M2 : son rating doit
+    # redevenir celui d'après M1, sans recalcul complet
+    x, b, a, y = players("X", "B", "A", "Y")
+    client.post("/matches", json=match([x], [b], "2025-01-01T20:00:00"))
+    m2 = client.post("/matches", json=match([a], [x], "2025-01-02T20:00:00")).json()["id"]
+
+    response = client.patch(f"/admin/matches/{m2}?token={token}", json={"players_b": [y]})
+    assert response.status_code == 200
+    incremental = leaderboard(client)
+    assert incremental[x][1] == 1
+    assert incremental == rebuilt(client, token)
+
+
+def test_patch_with_timezone_aware_date(client, token, players):
+    # 2025-01-03T00:30+02:00 = 2025-01-02T22:30Z : le match passe après le second
+    a, b, c = players("A", "B", "C")
+    m1 = client.post("/matches", json=match([a], [b], "2025-01-01T20:00:00")).json()["id"]
+    client.post("/matches", json=match([b], [c], "2025-01-02T20:00:00"))
+
+    response = client.patch(f"/admin/matches/{m1}?token={token}", json={"played_at": "2025-01-03T00:30:00+02:00"})
+    assert response.status_code == 200
+    assert response.json()["match"]["played_at"] == "2025-01-02T22:30:00"
+    assert leaderboard(client) == rebuilt(client, token)
@@ -0,0 +1,56 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from backend.app.matchmaking import best_splits
+from backend.tests.helpers import leaderboard
+
+
+def brute_force(pool, size_a, size_b, strength, top_n):
+    """Écarts des `top_n` meilleures compositions, par énumération complète"""
+    gaps = []
+    for side_a in combinations(sorted(pool), size_a):
+        rest = [p for p in pool if p not in side_a]
+        for side_b in combinations(rest, size_b):
+            if size_a == size_b and side_b[0] < side_a[0]:
+                continue
+            gaps.append(abs(strength(side_a) - strength(side_b)))
+    return sorted(gaps)[:top_n]
+
+
+@pytest.mark.parametrize("size_a,size_b", [(1, 1), (2, 2), (1, 2), (2, 3), (3, 3)])
+def test_branch_and_bound_matches_brute_force(size_a, size_b):
+    rng = random.Random(size_a * 10 + size_b)
+    pool = list(range(1, 9))
+    ratings = {pid: rng.uniform(800, 1400) for pid in pool}
+
+    def strength(side):
+        return sum(ratings[pid] for pid in side) / len(side)
+
+    splits, evaluated = best_splits(pool, size_a, size_b, strength, top_n=7)
+    assert [gap for gap, _, _ in splits] == pytest.approx(brute_force(pool, size_a, size_b, strength, 7))
+    for gap, side_a, side_b in splits:
+        assert not set(side_a) & set(side_b)
+        assert gap == pytest.approx(abs(strength(side_a) - strength(side_b)))
+    assert evaluated >= len(splits)
+
+
+def test_matchmaking_uses_displayed_ratings(client, token, players):
+    a, b = players("A", "B")
+    client.post("/matches", json={
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A",
+        "balls_remaining": 3, "played_at": "2024-01-01T20:00:00",
+    })
+    client.post(f"/admin/settings?token={token}", json={"decay_grace_days": 10, "decay_half_life_days": 30})
+
+    shown = leaderboard(client)
+    split = client.post("/matchmaking", json={"format": "1v1", "player_ids": [a, b], "top_n": 1}).json()["splits"][0]
+    strengths = {split["players_a"][0]["id"]: split["strength_a"], split["players_b"][0]["id"]: split["strength_b"]}
+    assert strengths == {a: shown[a][0], b: shown[b][0]}
+    assert abs(shown[a][0] - 1000) < 1  # Presque revenu au rating initial
+
+    matrix = client.get("/predictions/1v1/matrix").json()
+    i, j = matrix["ids"].index(a), matrix["ids"].index(b)
+    assert matrix["matrix"][i][j] == pytest.approx(split["expected_a"] if split["players_a"][0]["id"] == a
+                                                   else 1 - split["expected_a"], abs=1e-4)
@@ -0,0 +1,21 @@
+import logging
+
+from backend.app.database import make_engine
+from backend.app.migrations import MIGRATIONS, check_query_plans, current_version, run_migrations
+
+
+def test_hot_queries_use_their_index(tmp_path, capsys, caplog):
+    engine = make_engine(str(tmp_path / "billiard.db"))
+    try:
+        with caplog.at_level(logging.INFO, logger="backend.app.migrations"):
+            applied = run_migrations(engine)
+        assert applied == [m.version for m in MIGRATIONS]
+        assert current_version(engine) == MIGRATIONS[-1].version
+        assert check_query_plans(engine) == []
+        assert run_migrations(engine) == []
+    finally:
+        engine.dispose()
+
+    # Progression dans les logs, rien sur la sortie à chaque ouverture de club
+    assert capsys.readouterr().out == ""
+    assert any("idx_ratings_format_rating" in r.getMessage() for r in caplog.records)
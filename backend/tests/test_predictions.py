@@ -0,0 +1,43 @@
+import pytest
+
+from backend.app.elo import EloCalculator
+
+
+def match(a, b, played_at, fmt="1v1"):
+    return {
+        "format": fmt, "players_a": a, "players_b": b, "winner_side": "A",
+        "balls_remaining": 2, "played_at": played_at,
+    }
+
+
+def ratings(client, fmt) -> dict:
+    return {e["entity_id"]: e["rating"] for e in client.get(f"/leaderboard/{fmt}?limit=1000").json()}
+
+
+def test_matrix_cell_matches_elo_expectation(client, players):
+    a, b, c, d = players("A", "B", "C", "D")
+    client.post("/matches", json=match([a, b], [c, d], "2025-01-01T20:00:00", "2v2"))
+    client.post("/matches", json=match([a, c], [b, d], "2025-01-02T20:00:00", "2v2"))
+
+    teams = ratings(client, "2v2")
+    t1, t2 = sorted(teams, key=teams.get, reverse=True)[:2]
+    matrix = client.get(f"/predictions/2v2/matrix?entities={t1},{t2}").json()
+    assert matrix["entity_type"] == "team" and matrix["ids"] == [t1, t2]
+    expected = EloCalculator.calculate_expected_score(None, teams[t1], teams[t2])
+    assert matrix["matrix"][0][1] == pytest.approx(expected, abs=1e-4)
+    assert matrix["matrix"][1][0] == pytest.approx(1 - expected, abs=1e-4)
+
+    individual = ratings(client, "2v2_individual")
+    cell = client.get(f"/predictions/2v2_individual/matrix?entities={a},{d}").json()["matrix"][0][1]
+    assert cell == pytest.approx(EloCalculator.calculate_expected_score(None, individual[a], individual[d]), abs=1e-4)
+
+
+def test_matrix_rejects_entities_of_the_wrong_type(client, players):
+    a, b, c, d = players("A", "B", "C", "D")
+    client.post("/matches", json=match([a, b], [c, d], "2025-01-01T20:00:00", "2v2"))
+
+    # Deux équipes seulement : les IDs des joueurs C et D ne désignent aucune équipe
+    assert client.get(f"/predictions/2v2_individual/matrix?entities={c},{d}").status_code == 200
+    response = client.get(f"/predictions/2v2/matrix?entities={c},{d}")
+    assert response.status_code == 404
+    assert "Équipe" in response.json()["detail"]
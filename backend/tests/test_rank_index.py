@@ -0,0 +1,43 @@
+from backend.app import models
+from backend.app.database import tenants
+from backend.app.rank_index import ratings_replaced
+
+
+def play(client, winner, loser):
+    response = client.post("/matches", json={
+        "format": "1v1", "players_a": [winner], "players_b": [loser], "winner_side": "A", "balls_remaining": 3,
+    })
+    assert response.status_code == 200
+
+
+def ranks(client, player_ids) -> dict:
+    return {pid: client.get(f"/players/{pid}/summary").json()["ranks"]["1v1"]["rank"] for pid in player_ids}
+
+
+def board_ranks(client) -> dict:
+    return {e["entity_id"]: e["rank"] for e in client.get("/leaderboard/1v1").json()}
+
+
+def test_rank_index_follows_writes_from_another_process(client, players):
+    a, b, c, d = players("A", "B", "C", "D")
+    play(client, a, b)
+    play(client, a, c)
+    play(client, b, d)
+    assert ranks(client, [a, b, c, d]) == board_ranks(client)
+
+    # Écriture hors de ce processus (ligne de commande, autre worker) : pas d'invalidation locale
+    db = tenants.session_factory(client.headers["X-Club"])()
+    try:
+        db.get(models.Rating, (d, "1v1")).rating = 5000
+        ratings_replaced(db)
+        db.commit()
+    finally:
+        db.close()
+    assert ranks(client, [a, b, c, d]) == board_ranks(client)
+    assert ranks(client, [d])[d] == 1
+
+    # Un match enregistré ici ensuite reste cohérent avec le classement
+    play(client, c, a)
+    assert ranks(client, [a, b, c, d]) == board_ranks(client)
+    around = client.get(f"/leaderboard/1v1?around={c}&k=3").json()
+    assert {e["entity_id"]: e["rank"] for e in around} == board_ranks(client)
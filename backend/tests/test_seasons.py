@@ -0,0 +1,76 @@
+from backend.app import models
+from backend.app.database import tenants
+from backend.tests.helpers import wait_job
+
+
+def play(client, a, b, played_at):
+    response = client.post("/matches", json={
+        "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A", "balls_remaining": 3,
+        "played_at": played_at,
+    })
+    assert response.status_code == 200
+
+
+def open_season(client, token, name, starts_at, ends_at) -> int:
+    response = client.post(f"/admin/seasons?token={token}", json={
+        "name": name, "starts_at": starts_at, "ends_at": ends_at,
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def board(client, season) -> list:
+    return [(e["rank"], e["entity_id"]) for e in client.get(f"/leaderboard/1v1?season={season}").json()]
+
+
+def test_import_keeps_closed_seasons_and_recomputes_the_active_one(client, token, players):
+    a, b, c = players("A", "B", "C")
+    closed = open_season(client, token, "Hiver", "2025-01-01T00:00:00", "2025-03-01T00:00:00")
+    play(client, a, b, "2025-01-10T20:00:00")
+    play(client, c, a, "2025-02-10T20:00:00")
+    assert client.post(f"/admin/seasons/{closed}/close?token={token}").status_code == 200
+    active = open_season(client, token, "Printemps", "2025-03-01T00:00:00", "2025-06-01T00:00:00")
+    play(client, b, c, "2025-03-10T20:00:00")
+    before = {season: board(client, season) for season in (closed, active)}
+    seasons = client.get("/seasons").json()
+
+    export = client.get(f"/admin/export?token={token}").content
+    job_id = client.post(f"/admin/import?token={token}&replace=true", content=export).json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+
+    assert client.get("/seasons").json() == seasons
+    assert {season: board(client, season) for season in (closed, active)} == before
+
+
+def test_delete_player_removes_season_rows(client, token, players):
+    a, b, c = players("A", "B", "C")
+    closed = open_season(client, token, "Hiver", "2025-01-01T00:00:00", "2025-03-01T00:00:00")
+    play(client, a, b, "2025-01-10T20:00:00")
+    play(client, c, b, "2025-01-11T20:00:00")
+    client.post(f"/admin/seasons/{closed}/close?token={token}")
+    active = open_season(client, token, "Printemps", "2025-03-01T00:00:00", "2025-06-01T00:00:00")
+    play(client, a, c, "2025-03-10T20:00:00")
+
+    job_id = client.delete(f"/admin/players/{a}?token={token}").json()["job_id"]
+    wait_job(client, token, job_id)
+    # Rang figé de A vacant, celui des autres inchangé
+    assert [eid for _, eid in board(client, closed)] == [c, b]
+    assert board(client, active) == []
+    db = tenants.session_factory(client.headers["X-Club"])()
+    try:
+        for model in (models.SeasonRating, models.SeasonStanding):
+            assert db.query(model).filter_by(entity_type="player", entity_id=a).count() == 0
+    finally:
+        db.close()
+
+
+def test_import_replaces_seasons(client, token, players):
+    a, b = players("A", "B")
+    play(client, a, b, "2025-01-10T20:00:00")
+    export = client.get(f"/admin/export?token={token}").content
+
+    season = open_season(client, token, "Hiver", "2025-01-01T00:00:00", "2025-03-01T00:00:00")
+    client.post(f"/admin/seasons/{season}/close?token={token}")
+    job_id = client.post(f"/admin/import?token={token}&replace=true", content=export).json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+    assert client.get("/seasons").json() == []
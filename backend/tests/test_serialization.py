@@ -0,0 +1,39 @@
+from backend.app import schemas
+
+
+def match(a, b, played_at, fmt="1v1"):
+    return {
+        "format": fmt, "players_a": a, "players_b": b, "winner_side": "A",
+        "balls_remaining": 4, "played_at": played_at,
+    }
+
+
+def test_fast_path_matches_pydantic_schemas(client, players):
+    a, b, c, d = players("A", "B", "C", "D")
+    client.post("/matches", json=match([a], [b], "2025-01-01T20:00:00"))
+    client.post("/matches", json=match([a, b], [c, d], "2025-01-02T20:00:00", "2v2"))
+
+    for item in client.get("/history").json()["matches"]:
+        expected = schemas.MatchResponse.model_validate(item).model_dump(mode="json")
+        assert list(item) == list(expected) and item == expected
+    for fmt in ("1v1", "2v2"):
+        for entry in client.get(f"/leaderboard/{fmt}").json():
+            expected = schemas.LeaderboardEntry.model_validate(entry).model_dump(mode="json")
+            assert list(entry) == list(expected) and entry == expected
+
+
+def test_fields_projection(client, players):
+    a, b = players("A", "B")
+    client.post("/matches", json=match([a], [b], "2025-01-01T20:00:00"))
+
+    board = client.get("/leaderboard/1v1?fields=entity_name,rating").json()
+    assert [list(entry) for entry in board] == [["entity_name", "rating"]] * 2
+    assert {entry["entity_name"] for entry in board} == {"A", "B"}
+
+    history = client.get("/history?fields=id,players_a.name,players_b.name").json()
+    assert history["total"] == 1
+    assert history["matches"][0]["players_a"] == [{"name": "A"}]
+    assert list(history["matches"][0]) == ["id", "players_a", "players_b"]
+
+    assert client.get("/history?fields=id,players_a.pin").status_code == 400
+    assert client.get("/leaderboard/1v1?fields=password").status_code == 400
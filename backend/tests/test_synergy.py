@@ -0,0 +1,55 @@
+import pytest
+
+from backend.app import models
+from backend.app.database import tenants
+from backend.tests.helpers import wait_job
+
+
+def match(a, b, played_at, winner="A"):
+    return {
+        "format": "2v2", "players_a": a, "players_b": b, "winner_side": winner,
+        "balls_remaining": 2, "played_at": played_at,
+    }
+
+
+def synergy_sums(client) -> dict:
+    db = tenants.session_factory(client.headers["X-Club"], read_only=True)()
+    try:
+        rows = (
+            db.query(
+                models.Team.key, models.TeamRating.synergy_games,
+                models.TeamRating.synergy_wins, models.TeamRating.synergy_expected
+            )
+            .join(models.Team, models.Team.id == models.TeamRating.team_id)
+            .filter(models.TeamRating.format == "2v2")
+        )
+        return {key: (games, wins, expected) for key, games, wins, expected in rows}
+    finally:
+        db.close()
+
+
+def test_running_sums_match_full_recompute(client, token, players):
+    a, b, c, d, e = players("A", "B", "C", "D", "E")
+    lineups = [([a, b], [c, d], "A"), ([a, c], [b, d], "B"), ([a, b], [c, e], "A"),
+               ([d, e], [a, b], "B"), ([a, b], [c, d], "B"), ([b, c], [d, e], "A")]
+    ids = [
+        client.post("/matches", json=match(p, q, f"2025-01-0{i + 1}T20:00:00", w)).json()["id"]
+        for i, (p, q, w) in enumerate(lineups)
+    ]
+    # Correction : les sommes passent aussi par le recalcul partiel
+    client.patch(f"/admin/matches/{ids[2]}?token={token}", json={"winner_side": "B"})
+
+    incremental = synergy_sums(client)
+    assert incremental[f"{a}-{b}"][:2] == (4, 2)
+
+    job_id = client.post(f"/admin/rebuild-ratings?token={token}").json()["job_id"]
+    assert wait_job(client, token, job_id)["status"] == "done"
+    rebuilt = synergy_sums(client)
+    assert incremental.keys() == rebuilt.keys()
+    for key, (games, wins, expected) in rebuilt.items():
+        assert incremental[key][:2] == (games, wins)
+        assert incremental[key][2] == pytest.approx(expected)
+
+    report = client.get("/teams/synergy?min_games=1").json()
+    assert report["teams"] == len(rebuilt)
+    assert sorted(report["players"]["names"]) == ["A", "B", "C", "D", "E"]
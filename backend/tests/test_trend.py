@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from backend.app.trend import lttb
+from backend.tests.helpers import leaderboard
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    start = datetime(2025, 1, 1)
+    values = [1000 + (i % 5) for i in range(200)]
+    values[137] = 1300  # pic isolé
+    values[52] = 700  # creux isolé
+    points = [(start + timedelta(days=i), value, i) for i, value in enumerate(values)]
+
+    sampled = lttb(points, 20)
+    assert len(sampled) == 20
+    assert sampled[0] == points[0] and sampled[-1] == points[-1]
+    assert [p[2] for p in sampled] == sorted(p[2] for p in sampled)
+    assert {52, 137} <= {p[2] for p in sampled}
+    assert lttb(points[:10], 20) == points[:10]
+
+
+def test_trend_follows_rating_history(client, players):
+    a, b = players("A", "B")
+    for day in range(1, 7):
+        client.post("/matches", json={
+            "format": "1v1", "players_a": [a], "players_b": [b], "winner_side": "A" if day % 3 else "B",
+            "balls_remaining": 2, "played_at": f"2025-01-0{day}T20:00:00",
+        })
+
+    trend = client.get(f"/players/{a}/trend?points=1000").json()
+    assert trend["total_points"] == 6
+    assert trend["points"][-1]["rating"] == leaderboard(client)[a][0]
+
+    reduced = client.get(f"/players/{a}/trend?points=3").json()["points"]
+    assert len(reduced) == 3
+    assert reduced[0] == trend["points"][0] and reduced[-1] == trend["points"][-1]
+
+    # Nouveau match : la trajectoire en cache est reconstruite
+    client.post("/matches", json={
+        "format": "1v1", "players_a": [b], "players_b": [a], "winner_side": "A",
+        "balls_remaining": 2, "played_at": "2025-01-08T20:00:00",
+    })
+    trend = client.get(f"/players/{a}/trend?points=1000").json()
+    assert trend["total_points"] == 7
+    assert trend["points"][-1]["rating"] == leaderboard(client)[a][0]
@@ -80,30 +80,53 @@ self.addEventListener('sync', event => {
 async function syncOfflineMatches() {
   // Récupérer la file d'attente depuis IndexedDB
   const db = await openDB();
-  const tx = db.transaction('offline_matches', 'readonly');
-  const store = tx.objectStore('offline_matches');
-  const matches = await store.getAll();
+  const matches = await idbRequest(
+    db.transaction('offline_matches', 'readonly').objectStore('offline_matches').getAll()
+  );
+  if (!matches.length) return;
 
+  // Chaque match garde le même client_uuid d'un essai à l'autre : le serveur dédoublonne
+  const writeTx = db.transaction('offline_matches', 'readwrite');
+  const writeStore = writeTx.objectStore('offline_matches');
   for (const match of matches) {
-    try {
-      const response = await fetch('/api/matches', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(match)
-      });
+    if (!match.client_uuid) {
+      match.client_uuid = self.crypto.randomUUID();
+      writeStore.put(match);
+    }
+  }
 
-      if (response.ok) {
-        // Supprimer de la file d'attente
-        const deleteTx = db.transaction('offline_matches', 'readwrite');
-        const deleteStore = deleteTx.objectStore('offline_matches');
-        await deleteStore.delete(match.id);
+  try {
+    const response = await fetch('/api/matches/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        matches: matches.map(({ id, ...match }) => match)
+      })
+    });
+
+    if (response.ok) {
+      // Créés ou déjà appliqués : dans les deux cas, retirer de la file d'attente
+      const result = await response.json();
+      const applied = new Set(result.results.map(r => r.client_uuid));
+      const deleteStore = db.transaction('offline_matches', 'readwrite').objectStore('offline_matches');
+      for (const match of matches) {
+        if (applied.has(match.client_uuid)) {
+          deleteStore.delete(match.id);
+        }
       }
-    } catch (error) {
-      console.error('Erreur sync match:', error);
     }
+  } catch (error) {
+    console.error('Erreur sync matchs:', error);
   }
 }
 
+function idbRequest(request) {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
 // Helper pour IndexedDB
 function openDB() {
   return new Promise((resolve, reject) => {
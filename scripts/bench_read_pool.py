@@ -0,0 +1,141 @@
+"""Benchmark : pool unique vs pool de lecture seule séparé (voir database.py).
+
+Crée une base synthétique dans un répertoire temporaire, puis fait tourner pendant
+quelques secondes un écrivain (matchs 1v1 avec mise à jour ELO, comme POST /matches)
+et N lecteurs (classement + page d'historique, comme les routes GET), d'abord avec
+une seule fabrique de sessions partagée, puis avec les pools séparés.
+
+Usage : python scripts/bench_read_pool.py [--readers 16] [--seconds 5] [--players 200] [--matches 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--matches", type=int, default=5000)
+    args = parser.parse_args()
+
+    # database.py crée ./data : on se place dans un répertoire jetable avant l'import
+    os.chdir(tempfile.mkdtemp(prefix="billiard-bench-"))
+    sys.path.insert(0, ROOT)
+
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import selectinload, sessionmaker
+
+    from backend.app import database, models, schemas
+    from backend.app.elo import EloCalculator
+    from backend.app.main import insert_match
+    from backend.app.migrations import run_migrations
+    from backend.app.ratings import apply_match_ratings, init_default_settings, rebuild_ratings
+
+    run_migrations(database.engine)
+    db = database.SessionLocal()
+    init_default_settings(db)
+    db.add_all(models.Player(name=f"Joueur {i}") for i in range(args.players))
+    db.commit()
+    ids = [p.id for p in db.query(models.Player.id)]
+    rng = random.Random(42)
+    for _ in range(args.matches):
+        a, b = rng.sample(ids, 2)
+        insert_match(db, None, schemas.MatchCreate(
+            format="1v1", players_a=[a], players_b=[b],
+            winner_side=rng.choice("AB"), balls_remaining=rng.randint(0, 7)
+        ))
+    db.commit()
+    rebuild_ratings(db)
+    db.close()
+    print(f"Base synthétique : {args.players} joueurs, {args.matches} matchs")
+
+    # Configuration « avant » : un seul moteur au pool par défaut pour tout le monde
+    shared_engine = create_engine(database.DATABASE_URL, connect_args={"check_same_thread": False})
+    event.listen(shared_engine, "connect", database._set_sqlite_pragmas)
+    shared = sessionmaker(autocommit=False, autoflush=False, bind=shared_engine)
+
+    def run(label, write_factory, read_factory):
+        stop = time.monotonic() + args.seconds
+        read_latencies, write_latencies, errors = [], [], []
+        lock = threading.Lock()
+
+        def reader():
+            local = []
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                session = read_factory()
+                try:
+                    (session.query(models.Rating, models.Player.name)
+                     .join(models.Player, models.Player.id == models.Rating.player_id)
+                     .filter(models.Rating.format == "1v1")
+                     .order_by(models.Rating.rating.desc()).all())
+                    (session.query(models.Match)
+                     .options(selectinload(models.Match.players))
+                     .order_by(models.Match.played_at.desc()).limit(50).all())
+                except Exception as exc:
+                    errors.append(exc)
+                finally:
+                    session.close()
+                local.append(time.perf_counter() - start)
+            with lock:
+                read_latencies.extend(local)
+
+        def writer():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                session = write_factory()
+                try:
+                    a, b = rng.sample(ids, 2)
+                    winner = rng.choice("AB")
+                    elo_calc = EloCalculator(session)
+                    match = insert_match(session, elo_calc, schemas.MatchCreate(
+                        format="1v1", players_a=[a], players_b=[b],
+                        winner_side=winner, balls_remaining=3
+                    ))
+                    apply_match_ratings(elo_calc, "1v1", [a], [b], winner, 3, played_at=match.played_at)
+                    session.commit()
+                except Exception as exc:
+                    session.rollback()
+                    errors.append(exc)
+                finally:
+                    session.close()
+                write_latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        print(f"\n[{label}]")
+        print(f"  lectures : {len(read_latencies) / args.seconds:8.1f}/s  "
+              f"p50 {statistics.median(read_latencies or [0]) * 1000:6.1f} ms  "
+              f"p95 {percentile(read_latencies, 0.95) * 1000:6.1f} ms")
+        print(f"  écritures: {len(write_latencies) / args.seconds:8.1f}/s  "
+              f"p50 {statistics.median(write_latencies or [0]) * 1000:6.1f} ms  "
+              f"p95 {percentile(write_latencies, 0.95) * 1000:6.1f} ms")
+        print(f"  erreurs  : {len(errors)}" + (f" ({errors[0]!r})" if errors else ""))
+
+    run("pool partagé", shared, shared)
+    run("pools lecture / écriture séparés", database.SessionLocal, database.ReadSessionLocal)
+
+
+if __name__ == "__main__":
+    main()
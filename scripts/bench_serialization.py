@@ -0,0 +1,127 @@
+"""Benchmark : sérialisation Pydantic d'origine vs chemin direct orjson (voir serialization.py).
+
+Crée une base synthétique dans un répertoire temporaire puis compare, pour une page
+d'historique de 1000 matchs et le classement complet, le temps CPU par requête et la
+taille de la réponse :
+- « avant » : objets ORM, un MatchResponse / LeaderboardEntry par ligne (joueurs
+  imbriqués compris), puis jsonable_encoder + json.dumps comme le fait FastAPI ;
+- « après » : tuples + dicts + orjson, avec et sans projection `fields=`.
+
+Usage : python scripts/bench_serialization.py [--players 200] [--matches 5000] [--rows 1000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # database.py crée ./data : on se place dans un répertoire jetable avant l'import
+    os.chdir(tempfile.mkdtemp(prefix="billiard-bench-"))
+    sys.path.insert(0, ROOT)
+
+    from fastapi import Request
+    from fastapi.encoders import jsonable_encoder
+
+    from backend.app import database, models, schemas
+    from backend.app.elo import EloCalculator
+    from backend.app.main import get_leaderboard, get_match_history, insert_match
+    from backend.app.migrations import run_migrations
+    from backend.app.ratings import init_default_settings, rebuild_ratings
+
+    run_migrations(database.engine)
+    db = database.SessionLocal()
+    init_default_settings(db)
+    db.add_all(models.Player(name=f"Joueur {i}") for i in range(args.players))
+    db.commit()
+    ids = [p.id for p in db.query(models.Player.id)]
+    rng = random.Random(42)
+    elo_calc = EloCalculator(db)
+    for _ in range(args.matches):
+        fmt, size = rng.choice([("1v1", 1), ("2v2", 2)])
+        picked = rng.sample(ids, 2 * size)
+        insert_match(db, elo_calc, schemas.MatchCreate(
+            format=fmt, players_a=picked[:size], players_b=picked[size:],
+            winner_side=rng.choice("AB"), balls_remaining=rng.randint(0, 7)
+        ))
+    db.commit()
+    rebuild_ratings(db)
+    db.close()
+    print(f"Base synthétique : {args.players} joueurs, {args.matches} matchs")
+
+    def legacy_history(db):
+        matches = db.query(models.Match).order_by(models.Match.played_at.desc()).limit(args.rows).all()
+        results = []
+        for match in matches:
+            result = schemas.MatchResponse(
+                id=match.id, format=match.format, played_at=match.played_at,
+                balls_remaining=match.balls_remaining, winner_side=match.winner_side,
+                foul_black=match.foul_black, ranked=match.ranked,
+                players_a=[mp.player for mp in match.players if mp.side == "A"],
+                players_b=[mp.player for mp in match.players if mp.side == "B"]
+            )
+            if match.team_id_a:
+                result.team_a = match.team_a
+            if match.team_id_b:
+                result.team_b = match.team_b
+            results.append(result)
+        return json.dumps(jsonable_encoder({"total": len(results), "matches": results})).encode()
+
+    def legacy_leaderboard(db):
+        ratings = db.query(models.Rating).filter_by(format="1v1").order_by(models.Rating.rating.desc()).limit(args.players).all()
+        entries = [
+            schemas.LeaderboardEntry(
+                rank=idx, entity_name=r.player.name, entity_id=r.player.id, entity_type="player",
+                rating=r.rating, games=r.games, wins=r.wins, losses=r.losses,
+                win_rate=(r.wins / r.games * 100) if r.games > 0 else 0,
+                streak=r.streak, last_played=r.last_played
+            )
+            for idx, r in enumerate(ratings, 1)
+        ]
+        return json.dumps(jsonable_encoder(entries)).encode()
+
+    def history(fields=None):
+        request = Request({"type": "http", "headers": []})
+        return lambda db: get_match_history(request, limit=args.rows, fields=fields, db=db).body
+
+    def leaderboard(fields=None):
+        return lambda db: get_leaderboard("1v1", limit=args.players, fields=fields, db=db).body
+
+    def measure(label, func):
+        sizes, cpu = [], []
+        for _ in range(args.repeat):
+            # Nouvelle session à chaque requête, comme get_read_db
+            session = database.ReadSessionLocal()
+            start = time.process_time()
+            body = func(session)
+            cpu.append(time.process_time() - start)
+            session.close()
+            sizes.append(len(body))
+        cpu.sort()
+        print(f"  {label:44} CPU médian {cpu[len(cpu) // 2] * 1000:7.1f} ms   {sizes[0] / 1024:7.1f} Ko")
+
+    print(f"\nHistorique, page de {args.rows} matchs :")
+    measure("avant (Pydantic + jsonable_encoder)", legacy_history)
+    measure("après (tuples + orjson)", history())
+    measure("après, fields=id,played_at,players_*.name", history("id,played_at,winner_side,players_a.name,players_b.name"))
+
+    print(f"\nClassement 1v1, {args.players} joueurs :")
+    measure("avant (Pydantic + jsonable_encoder)", legacy_leaderboard)
+    measure("après (tuples + orjson)", leaderboard())
+    measure("après, fields=entity_name,rating", leaderboard("entity_name,rating"))
+
+
+if __name__ == "__main__":
+    main()
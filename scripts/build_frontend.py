@@ -0,0 +1,124 @@
+"""Construit frontend/dist/ : ressources à nom haché et précompressées, servies par Nginx.
+
+- le CSS et le JS inline de index.html sont extraits dans assets/app.<hash>.css|js,
+  servis avec un cache d'un an (immutable) : toute modification change le nom ;
+- index.html, manifest.json et service-worker.js gardent leur nom et sont revalidés
+  à chaque chargement ; le cache du service worker porte le hash du build, ce qui
+  purge l'ancien cache au déploiement suivant ;
+- chaque fichier texte reçoit une version .gz (gzip -9) et, si le module `brotli`
+  est installé, .br : Nginx les sert tels quels (gzip_static / brotli_static) au
+  lieu de recompresser à chaque requête.
+
+Usage : python scripts/build_frontend.py [--src frontend] [--out frontend/dist]
+"""
+import argparse
+import gzip
+import hashlib
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # optionnel : sans lui, seules les versions .gz sont produites
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPRESSIBLE = (".html", ".css", ".js", ".json", ".svg", ".txt", ".webmanifest")
+MIN_COMPRESS_SIZE = 256
+STYLE_RE = re.compile(r"<style>(.*?)</style>", re.S)
+SCRIPT_RE = re.compile(r"<script>(.*?)</script>", re.S)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def write_asset(out: str, stem: str, ext: str, text: str) -> str:
+    """Écrit assets/<stem>.<hash><ext> et renvoie son URL"""
+    data = text.encode("utf-8")
+    name = f"{stem}.{content_hash(data)}{ext}"
+    with open(os.path.join(out, "assets", name), "wb") as f:
+        f.write(data)
+    return f"/assets/{name}"
+
+
+def compress_tree(out: str) -> int:
+    count = 0
+    for directory, _, files in os.walk(out):
+        for name in files:
+            path = os.path.join(directory, name)
+            if not name.endswith(COMPRESSIBLE) or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, "rb") as f:
+                data = f.read()
+            # mtime=0 : même entrée, même .gz (builds reproductibles)
+            with open(path + ".gz", "wb") as f:
+                f.write(gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli:
+                with open(path + ".br", "wb") as f:
+                    f.write(brotli.compress(data, quality=11))
+            count += 1
+    return count
+
+
+def build(src: str, out: str) -> str:
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    # Fichiers annexes (manifest, icônes...) copiés tels quels
+    shutil.copytree(src, tmp, ignore=shutil.ignore_patterns(
+        "dist", "*.tmp", "*.old", os.path.basename(out), "index.html", "service-worker.js"
+    ))
+    os.makedirs(os.path.join(tmp, "assets"), exist_ok=True)
+
+    with open(os.path.join(src, "index.html"), encoding="utf-8") as f:
+        html = f.read()
+    assets = []
+    style = STYLE_RE.search(html)
+    if style:
+        url = write_asset(tmp, "app", ".css", style.group(1))
+        html = html[:style.start()] + f'<link rel="stylesheet" href="{url}">' + html[style.end():]
+        assets.append(url)
+    script = SCRIPT_RE.search(html)
+    if script:
+        url = write_asset(tmp, "app", ".js", script.group(1))
+        html = html[:script.start()] + f'<script src="{url}"></script>' + html[script.end():]
+        assets.append(url)
+    with open(os.path.join(tmp, "index.html"), "w", encoding="utf-8") as f:
+        f.write(html)
+
+    build_id = content_hash(html.encode("utf-8"))
+    with open(os.path.join(src, "service-worker.js"), encoding="utf-8") as f:
+        worker = f.read()
+    worker = re.sub(r"const CACHE_NAME = '[^']*';", f"const CACHE_NAME = 'billiard-tracker-{build_id}';", worker)
+    worker = worker.replace("const urlsToCache = [", "const urlsToCache = [" + "".join(
+        f"\n  '{url}'," for url in assets
+    ), 1)
+    with open(os.path.join(tmp, "service-worker.js"), "w", encoding="utf-8") as f:
+        f.write(worker)
+
+    compressed = compress_tree(tmp)
+
+    # Remplacement du build précédent d'un seul coup
+    old = out + ".old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(out):
+        os.rename(out, old)
+    os.rename(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"[build] {out} : build {build_id}, {len(assets)} ressource(s) hachée(s), "
+          f"{compressed} fichier(s) précompressé(s) (gzip{', brotli' if brotli else ''})")
+    return build_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--src", default=os.path.join(ROOT, "frontend"))
+    parser.add_argument("--out", default=os.path.join(ROOT, "frontend", "dist"))
+    args = parser.parse_args()
+    build(os.path.abspath(args.src), os.path.abspath(args.out))
+
+
+if __name__ == "__main__":
+    main()
@@ -34,9 +34,13 @@ uvicorn[standard]==0.24.0
 sqlalchemy==2.0.23
 python-multipart==0.0.6
 aiofiles==23.2.1
+numpy>=1.24
+orjson>=3.8
 EOF
 
 pip install -r requirements.txt
+# Optionnel : versions .br des ressources statiques (scripts/build_frontend.py)
+pip install brotli || true
 
 # Copie des fichiers de l'application
 echo "Copie des fichiers de l'application..."
@@ -62,23 +66,46 @@ RestartSec=10
 WantedBy=multi-user.target
 EOF
 
+# Ressources statiques : noms hachés et versions précompressées dans frontend/dist
+if [ -f frontend/index.html ]; then
+    echo "Construction du frontend..."
+    python scripts/build_frontend.py
+fi
+
 # Configuration de Nginx
 echo "Configuration de Nginx..."
+# brotli_static seulement si le module est disponible pour ce Nginx
+if sudo apt install -y libnginx-mod-http-brotli-static; then
+    echo "brotli_static on;" | sudo tee /etc/nginx/snippets/billiard-brotli.conf > /dev/null
+else
+    echo "# module brotli indisponible : gzip_static seul" | sudo tee /etc/nginx/snippets/billiard-brotli.conf > /dev/null
+fi
+
 sudo tee /etc/nginx/sites-available/billiard-tracker > /dev/null << 'EOF'
 server {
     listen 80;
     server_name billiard.local;
-    
-    root /home/pi/billiard-tracker/frontend;
+
+    root /home/pi/billiard-tracker/frontend/dist;
     index index.html;
-    
+
+    # Fichiers .gz / .br produits par scripts/build_frontend.py
+    gzip_static on;
+    include /etc/nginx/snippets/billiard-brotli.conf;
+
+    # Ressources à nom haché : jamais modifiées, cache d'un an
+    location /assets/ {
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        try_files $uri =404;
+    }
+
     # Frontend PWA
     location / {
         try_files $uri $uri/ /index.html;
         add_header Cache-Control "no-cache";
     }
     
-    # API Backend
+    # API Backend (compression JSON et ETag faits par l'application)
     location /api/ {
         proxy_pass http://127.0.0.1:8000/;
         proxy_http_version 1.1;
@@ -130,23 +157,19 @@ echo "Configuration des sauvegardes..."
 cat > /home/pi/billiard-tracker/scripts/backup.sh << 'EOF'
 #!/bin/bash
 # Script de sauvegarde quotidienne
+# Sauvegarde à chaud (API de sauvegarde SQLite) : un simple cp d'une base en WAL
+# pendant que le service écrit peut produire une copie incohérente.
 
-BACKUP_DIR="/home/pi/billiard-tracker/data/backups"
-DB_FILE="/home/pi/billiard-tracker/data/billiard.db"
-DATE=$(date +%Y-%m-%d)
-BACKUP_FILE="$BACKUP_DIR/billiard-$DATE.db"
-
-# Créer le répertoire de sauvegarde s'il n'existe pas
-mkdir -p $BACKUP_DIR
+cd /home/pi/billiard-tracker
+DB_FILE="data/billiard.db"
 
-# Copier la base de données
 if [ -f "$DB_FILE" ]; then
-    cp $DB_FILE $BACKUP_FILE
-    echo "Sauvegarde créée: $BACKUP_FILE"
-    
-    # Supprimer les sauvegardes de plus de 30 jours
-    find $BACKUP_DIR -name "billiard-*.db" -mtime +30 -delete
-    echo "Anciennes sauvegardes supprimées"
+    # Crée data/backups/billiard-AAAA-MM-JJ-HHMMSS.db et supprime celles de plus de 30 jours
+    venv/bin/python -m backend.app.cli backup --keep-days 30
+    # Statistiques de l'optimiseur SQLite à jour (rapide)
+    venv/bin/python -m backend.app.cli analyze
+    # Intervalles de confiance des ratings (sans effet s'il n'y a pas eu de match)
+    venv/bin/python -m backend.app.cli intervals --workers 2
 else
     echo "Base de données non trouvée!"
 fi
@@ -0,0 +1,334 @@
+"""Générateur de charge : une soirée de championnat sur un seul Raspberry Pi.
+
+Crée une base synthétique dans un répertoire temporaire, lance `backend.app.main:app`
+sous uvicorn, puis rejoue pendant quelques minutes un mélange réaliste de trafic :
+
+- tablettes : pendant la saisie d'un match, quelques consultations head-to-head,
+  puis l'enregistrement (POST /matches) ; les tablettes envoient leurs matchs à la
+  fin de chaque manche, donc par rafales ;
+- écrans spectateurs : rafraîchissement du classement et de l'historique ;
+- admin : de temps en temps, suppression d'un match, qui déclenche rebuild_ratings
+  (la durée de la tâche de fond est mesurée jusqu'à sa fin).
+
+Le rapport donne le débit, les latences p50/p95/p99 par route et les taux d'erreurs
+et de verrous SQLite (« database is locked »). `--save` garde le résultat en JSON,
+`--compare` le compare à un résultat précédent (code retour 1 en cas de régression).
+
+Usage : python scripts/load_test.py [--tablets 6] [--screens 12] [--seconds 60]
+            [--players 60] [--matches 3000] [--save run.json] [--compare base.json]
+        python scripts/load_test.py --url http://billard.local:8000   (serveur existant)
+
+Dépendances : httpx et uvicorn (pip install httpx "uvicorn[standard]").
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORMATS = {"1v1": (1, 1), "2v2": (2, 2)}
+ADMIN_PIN = "1234"
+# Une régression de latence n'est signalée qu'au-delà de ce plancher (bruit de mesure)
+NOISE_FLOOR_MS = 5.0
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class Stats:
+    """Latences et erreurs par route"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.locks = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool, locked: bool = False):
+        self.latencies[route].append(seconds)
+        if not ok:
+            self.errors[route] += 1
+        if locked:
+            self.locks[route] += 1
+
+    def summary(self, duration: float) -> dict:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            routes[route] = {
+                "count": len(values),
+                "rps": len(values) / duration,
+                "p50_ms": statistics.median(values) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "error_rate": self.errors[route] / len(values),
+                "lock_rate": self.locks[route] / len(values),
+            }
+        requests = sum(r["count"] for name, r in routes.items() if not name.startswith("job "))
+        return {"duration": duration, "throughput": requests / duration, "routes": routes}
+
+
+def build_database(args):
+    """Base synthétique dans le répertoire courant (./data/billiard.db)"""
+    from backend.app import database, models, schemas
+    from backend.app.elo import EloCalculator
+    from backend.app.main import insert_match
+    from backend.app.migrations import run_migrations
+    from backend.app.ratings import init_default_settings, rebuild_ratings
+
+    run_migrations(database.engine)
+    db = database.SessionLocal()
+    init_default_settings(db)
+    db.add_all(models.Player(name=f"Joueur {i}") for i in range(args.players))
+    db.commit()
+    ids = [p.id for p in db.query(models.Player.id)]
+    rng = random.Random(42)
+    elo_calc = EloCalculator(db)  # crée les équipes des matchs 2v2
+    start = datetime.utcnow() - timedelta(days=365)
+    for i in range(args.matches):
+        fmt = rng.choice(list(FORMATS))
+        size_a, size_b = FORMATS[fmt]
+        picked = rng.sample(ids, size_a + size_b)
+        insert_match(db, elo_calc, schemas.MatchCreate(
+            format=fmt, players_a=picked[:size_a], players_b=picked[size_a:],
+            winner_side=rng.choice("AB"), balls_remaining=rng.randint(0, 7),
+            played_at=start + timedelta(days=365 * i / args.matches)
+        ))
+    db.commit()
+    rebuild_ratings(db)
+    db.close()
+    database.engine.dispose()
+    database.read_engine.dispose()
+    return ids
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(client, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Le serveur ne répond pas")
+
+
+async def run_load(client, args, player_ids) -> dict:
+    import httpx
+
+    stats = Stats()
+    rng = random.Random(7)
+    stop = time.monotonic() + args.seconds
+    round_end = asyncio.Event()
+
+    async def call(route: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TimeoutException:
+            stats.record(route, time.perf_counter() - start, ok=False)
+            return None
+        except httpx.HTTPError:
+            stats.record(route, time.perf_counter() - start, ok=False)
+            return None
+        elapsed = time.perf_counter() - start
+        ok = response.status_code < 400
+        locked = not ok and "locked" in response.text
+        stats.record(route, elapsed, ok, locked)
+        return response if ok else None
+
+    async def pause(low: float, high: float):
+        await asyncio.sleep(rng.uniform(low, high) / args.speed)
+
+    async def rounds():
+        # Fin de manche : toutes les tablettes envoient leur match en même temps
+        while time.monotonic() < stop:
+            await asyncio.sleep(args.round / args.speed)
+            round_end.set()
+            round_end.clear()
+        round_end.set()  # libère les tablettes encore en attente
+
+    async def tablet():
+        while time.monotonic() < stop:
+            fmt = rng.choice(list(FORMATS))
+            size_a, size_b = FORMATS[fmt]
+            picked = rng.sample(player_ids, size_a + size_b)
+            players_a, players_b = picked[:size_a], picked[size_a:]
+            # Saisie du formulaire : le head-to-head se met à jour à chaque joueur ajouté
+            for _ in range(rng.randint(1, 3)):
+                await pause(0.5, 2.0)
+                await call("POST /head-to-head", "POST", "/head-to-head",
+                           json={"format": fmt, "players_a": players_a, "players_b": players_b})
+            await round_end.wait()
+            if time.monotonic() >= stop:
+                break
+            await pause(0.0, 0.3)
+            await call("POST /matches", "POST", "/matches", json={
+                "format": fmt, "players_a": players_a, "players_b": players_b,
+                "winner_side": rng.choice("AB"), "balls_remaining": rng.randint(0, 7),
+            })
+
+    async def screen():
+        await pause(0.0, args.poll)
+        while time.monotonic() < stop:
+            fmt = rng.choice(list(FORMATS))
+            await call("GET /leaderboard/{format}", "GET", f"/leaderboard/{fmt}")
+            await call("GET /history", "GET", "/history", params={"limit": 20})
+            await pause(args.poll * 0.8, args.poll * 1.2)
+
+    async def admin():
+        response = await client.post("/admin/login", json={"pin": ADMIN_PIN})
+        token = response.json()["token"]
+        while time.monotonic() < stop:
+            await pause(args.admin_every * 0.5, args.admin_every * 1.5)
+            if time.monotonic() >= stop:
+                break
+            history = await call("GET /history", "GET", "/history", params={"limit": 20})
+            if not history or not history.json()["matches"]:
+                continue
+            match_id = rng.choice(history.json()["matches"])["id"]
+            started = time.perf_counter()
+            deleted = await call("DELETE /admin/matches/{id}", "DELETE", f"/admin/matches/{match_id}",
+                                 params={"token": token})
+            if not deleted:
+                continue
+            job_id = deleted.json()["job_id"]
+            # Durée de la tâche de fond, suppression comprise
+            while True:
+                job = await client.get(f"/admin/jobs/{job_id}", params={"token": token})
+                state = job.json().get("status") if job.status_code == 200 else "failed"
+                if state in ("done", "failed"):
+                    stats.record("job rebuild_ratings", time.perf_counter() - started, state == "done")
+                    break
+                await asyncio.sleep(0.1)
+
+    started = time.monotonic()
+    tasks = [rounds(), admin()]
+    tasks += [tablet() for _ in range(args.tablets)]
+    tasks += [screen() for _ in range(args.screens)]
+    await asyncio.gather(*tasks)
+    return stats.summary(time.monotonic() - started)
+
+
+def print_report(result: dict):
+    print(f"\nDurée {result['duration']:.1f} s, débit {result['throughput']:.1f} req/s")
+    print(f"{'route':32} {'nb':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>6} {'lock %':>6}")
+    for route, r in result["routes"].items():
+        print(f"{route:32} {r['count']:6d} {r['rps']:7.2f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+              f"{r['p99_ms']:8.1f} {r['error_rate'] * 100:6.1f} {r['lock_rate'] * 100:6.1f}")
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """Affiche les écarts avec un résultat précédent ; True si une régression est détectée"""
+    regressed = False
+    print(f"\nComparaison (tolérance {tolerance:.0%}) :")
+    old_tp, new_tp = baseline["throughput"], result["throughput"]
+    flag = new_tp < old_tp * (1 - tolerance)
+    regressed |= flag
+    print(f"  débit {old_tp:.1f} -> {new_tp:.1f} req/s" + ("  << RÉGRESSION" if flag else ""))
+    for route, new in result["routes"].items():
+        old = baseline["routes"].get(route)
+        if not old:
+            continue
+        flags = []
+        for key in ("p95_ms", "p99_ms"):
+            if new[key] > old[key] * (1 + tolerance) and new[key] - old[key] > NOISE_FLOOR_MS:
+                flags.append(key[:3])
+        for key in ("error_rate", "lock_rate"):
+            if new[key] - old[key] > 0.01:
+                flags.append(key.split("_")[0])
+        regressed |= bool(flags)
+        delta = (new["p95_ms"] / old["p95_ms"] - 1) if old["p95_ms"] else 0.0
+        print(f"  {route:32} p95 {old['p95_ms']:7.1f} -> {new['p95_ms']:7.1f} ms ({delta:+.0%})"
+              + (f"  << RÉGRESSION ({', '.join(flags)})" if flags else ""))
+    return regressed
+
+
+async def main_async(args) -> dict:
+    import httpx
+
+    player_ids = None
+    server = None
+    url = args.url
+    if not url:
+        # database.py crée ./data : on se place dans un répertoire jetable avant l'import
+        os.chdir(tempfile.mkdtemp(prefix="billiard-load-"))
+        sys.path.insert(0, ROOT)
+        player_ids = build_database(args)
+        print(f"Base synthétique : {args.players} joueurs, {args.matches} matchs ({os.getcwd()})")
+        server = start_server(args.port)
+        url = f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=args.tablets + args.screens + 4)
+    try:
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            await wait_ready(client)
+            if player_ids is None:
+                player_ids = [p["id"] for p in (await client.get("/players")).json()]
+            print(f"Charge : {args.tablets} tablettes, {args.screens} écrans, {args.seconds:.0f} s sur {url}")
+            return await run_load(client, args, player_ids)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tablets", type=int, default=6, help="tablettes de saisie")
+    parser.add_argument("--screens", type=int, default=12, help="écrans spectateurs")
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--players", type=int, default=60)
+    parser.add_argument("--matches", type=int, default=3000)
+    parser.add_argument("--round", type=float, default=20.0, help="durée d'une manche (s)")
+    parser.add_argument("--poll", type=float, default=5.0, help="rafraîchissement des écrans (s)")
+    parser.add_argument("--admin-every", type=float, default=30.0, help="intervalle moyen des suppressions (s)")
+    parser.add_argument("--speed", type=float, default=1.0, help="accélère toutes les pauses (x2, x10...)")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="viser un serveur déjà lancé (aucune base synthétique)")
+    parser.add_argument("--save", help="enregistrer le résultat en JSON")
+    parser.add_argument("--compare", help="comparer à un résultat enregistré")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="écart toléré avant régression")
+    args = parser.parse_args()
+
+    # Chemins relatifs à l'appelant, avant le changement de répertoire
+    save = os.path.abspath(args.save) if args.save else None
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    result = asyncio.run(main_async(args))
+    print_report(result)
+    if save:
+        with open(save, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nRésultat enregistré : {save}")
+    if baseline and compare(result, baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()